@@ -20,10 +20,18 @@ CREATE TABLE IF NOT EXISTS emm_permutation (
     is_populated BOOLEAN,                           -- if the schema has been populated with data
     is_permutation BOOLEAN,                         -- if the schema represents a permutation
     permutation_code TEXT,                          -- The permutation id if it is a permutation
+    original_table_name TEXT NOT NULL,              -- The table of the project it is a permutation of
+    is_logged BOOLEAN NOT NULL DEFAULT TRUE,        -- if the table is LOGGED, rather than UNLOGGED
     created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,    -- Timestamp column for creation time, defaults to current time
     schema_id SERIAL REFERENCES emm_project (id)     -- FK on schema
 );
 
+CREATE TABLE IF NOT EXISTS emm_permutation_equivalence (
+    id SERIAL PRIMARY KEY,
+    permutation_id INTEGER NOT NULL REFERENCES emm_permutation (id) ON DELETE CASCADE, -- FK on the representative
+    permutation_code TEXT NOT NULL                  -- Permutation with the same on-disk layout as the representative
+);
+
 CREATE TABLE IF NOT EXISTS emm_analysis (
     id SERIAL PRIMARY KEY,
     name TEXT NOT NULL,                             -- For convenience, we keep the name as well
@@ -38,9 +46,12 @@ CREATE TABLE IF NOT EXISTS emm_analysis_report (
     analysis_id SERIAL REFERENCES emm_analysis (id) NOT NULL,     -- FK on schema
     metric TEXT NOT NULL,                                        -- For convenience, we keep the name as well
     best_permutation_name TEXT NOT NULL,                         -- The name of the best permutation
-    improvement_percentage_over_baseline NUMERIC(4, 2) NOT NULL, -- Improvement percentage over the baseline
+    improvement_percentage_over_baseline NUMERIC(10, 2) NOT NULL, -- Improvement percentage over the baseline
     original_metric_value NUMERIC(20, 2) NOT NULL,                -- Size of the table, for validation purposes
     permutation_metric_value NUMERIC(20, 2) NOT NULL,             -- Size of the table, for validation purposes
+    confidence_interval_low NUMERIC(10, 2),                       -- Confidence interval of the improvement percentage,
+    confidence_interval_high NUMERIC(10, 2),                      -- when measured over repeated trials
+    is_significant BOOLEAN,                                       -- Whether the interval excludes no improvement
     created TIMESTAMP DEFAULT CURRENT_TIMESTAMP                  -- Timestamp column for creation time, defaults to current time
 );
 
@@ -57,6 +68,7 @@ CREATE TABLE IF NOT EXISTS emm_raw_performance (
 
 COMMENT ON TABLE emm_project IS 'Keep the project that were loaded in emm.';
 COMMENT ON TABLE emm_permutation IS 'Keep all the schema being generated.';
+COMMENT ON TABLE emm_permutation_equivalence IS 'Keep the permutations not created because physically identical to another one.';
 COMMENT ON TABLE emm_analysis IS 'Hold type of analysis ran on schemas.';
 COMMENT ON TABLE emm_analysis_report IS 'Keep the report for each analysis.';
 COMMENT ON TABLE emm_raw_performance IS 'Keep the raw data for the analysis, per permutation based.';
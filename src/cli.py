@@ -4,17 +4,44 @@ from functools import partial, wraps
 import click
 from tabulate import tabulate
 
-from src.emm.engine.data import BenchmarkRequest, PermutationRequest
+from src.emm.engine.data import (
+    BenchmarkRequest,
+    DataGenerationSettings,
+    PermutationRequest,
+    PermutationSampling,
+    PopulationMethod,
+    ValueDistribution,
+)
+from src.emm.engine.workload import DEFAULT_SELECTIVITY
+from src.emm.models.performance import AnalysisReport
 from src.emm.models.schema import Schema
+from src.emm.operations.constants import (
+    DEFAULT_LOAD_CLIENTS,
+    DEFAULT_LOAD_DURATION,
+    DEFAULT_MIX_RATE,
+    DEFAULT_MIX_READ_RATIO,
+    DEFAULT_TRIALS,
+    DEFAULT_WARMUP_ITERATIONS,
+)
 from src.emm.operations.perfomances import benchmark_schema, load_analysis_for_schema
-from src.emm.operations.permutations import generate_permutations_for_project
-from src.emm.operations.population import populate_schema
+from src.emm.operations.permutations import (
+    generate_permutations_for_project,
+    get_permutation_column_names,
+    load_contexts_for_project,
+)
+from src.emm.operations.population import (
+    load_population_status,
+    normalize_schema,
+    populate_schema,
+    set_schema_logged,
+)
 from src.emm.operations.schemas import (
     delete_schema,
     find_schema_by_name,
     initialize_schema,
     load_schemas,
 )
+from src.emm.operations.search import search_permutations_for_project
 from src.emm.operations.validators import validate_sql_folder
 
 log = logging.getLogger(__name__)
@@ -103,10 +130,79 @@ def init_schema(sql_folder_path: str) -> None:
 @click.option(
     "--permutation-logic",
     default=None,
-    help="Type of permutation to compute. Possible options are: all, type. Defaults to all",
+    help="Type of permutation to compute. Possible options are: all, type, magic, genetic. Defaults to all",
+)
+@click.option(
+    "--top-k",
+    default=None,
+    type=int,
+    help="Only create the k permutations with the narrowest predicted row width",
+)
+@click.option(
+    "--max-padding",
+    default=None,
+    type=int,
+    help="Only create the permutations wasting at most this many bytes in alignment padding per row",
+)
+@click.option(
+    "--sampling",
+    default=None,
+    help="Only draw a sample of all the permutations. Possible options are: random, latin, layout",
+)
+@click.option(
+    "--sample-size",
+    default=None,
+    type=int,
+    help="How many permutations to draw when sampling",
+)
+@click.option(
+    "--seed", default=None, type=int, help="Seed of the random generator for sampling"
+)
+@click.option(
+    "--dedupe-layouts",
+    is_flag=True,
+    default=False,
+    help="Only create one table per distinct on-disk layout",
+)
+@click.option(
+    "--jobs",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Number of permutation chunks created in parallel, each one on its own connection",
+)
+@click.option(
+    "--generation-size",
+    default=10,
+    type=int,
+    help="Genetic search only: number of layouts created and measured at every generation",
+)
+@click.option(
+    "--max-tables",
+    default=100,
+    type=int,
+    help="Genetic search only: maximum number of tables created",
+)
+@click.option(
+    "--max-seconds",
+    default=3600,
+    type=float,
+    help="Genetic search only: no new generation is started after this many seconds",
 )
 @catch_exception(handle=Exception)
-def permutations(schema_name: str, permutation_logic: str | None) -> None:
+def permutations(
+    schema_name: str,
+    permutation_logic: str | None,
+    top_k: int | None,
+    max_padding: int | None,
+    sampling: str | None,
+    sample_size: int | None,
+    seed: int | None,
+    dedupe_layouts: bool,
+    jobs: int,
+    generation_size: int,
+    max_tables: int,
+    max_seconds: float,
+) -> None:
     """
     Init the schema based on the file sql/init/*.sql
     """
@@ -115,8 +211,32 @@ def permutations(schema_name: str, permutation_logic: str | None) -> None:
 
     permutation_request = get_permutation_request_from_argument(permutation_logic)
 
+    if permutation_request == PermutationRequest.GENETIC:
+        search_permutations_for_project(
+            project_name=schema_name,
+            generation_size=generation_size,
+            max_tables=max_tables,
+            max_seconds=max_seconds,
+            seed=seed,
+            jobs=jobs,
+            progress=lambda created, best: click.echo(
+                f"{created} permutations created, best table size {best}"
+            ),
+        )
+        click.echo("Permutations generated")
+        return
+
     generate_permutations_for_project(
-        project_name=schema_name, permutation_request=permutation_request
+        project_name=schema_name,
+        permutation_request=permutation_request,
+        top_k=top_k,
+        max_padding=max_padding,
+        sampling=PermutationSampling(sampling.lower()) if sampling else None,
+        sample_size=sample_size,
+        seed=seed,
+        dedupe_layouts=dedupe_layouts,
+        progress=lambda created: click.echo(f"{created} permutations created"),
+        jobs=jobs,
     )
     click.echo("Permutations generated")
 
@@ -124,18 +244,175 @@ def permutations(schema_name: str, permutation_logic: str | None) -> None:
 @cli.command(name="populate")
 @click.option("--schema-name", default=None, help="Schema name to populate")
 @click.option("--only-original", default=False, help="Schema name to populate")
-def insert_into_schema(schema_name: str, only_original: bool) -> None:
+@click.option(
+    "--jobs",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Number of tables populated in parallel, each one on its own connection",
+)
+@click.option(
+    "--method",
+    default=PopulationMethod.COPY.value,
+    help="How to load the permutations. Possible options are: insert, copy, fanout. Defaults to copy",
+)
+@click.option(
+    "--generate-rows",
+    default=None,
+    type=int,
+    help="Fill the original tables with this many synthetic rows, instead of the data file",
+)
+@click.option(
+    "--null-fraction",
+    default=0.1,
+    type=float,
+    help="Generated data only: share of NULL values in the nullable columns",
+)
+@click.option(
+    "--distribution",
+    default=ValueDistribution.UNIFORM.value,
+    help="Generated data only: spread of the values. Possible options are: uniform, normal, skewed",
+)
+@click.option(
+    "--min-string-length",
+    default=5,
+    type=int,
+    help="Generated data only: minimum length of the strings",
+)
+@click.option(
+    "--max-string-length",
+    default=30,
+    type=int,
+    help="Generated data only: maximum length of the strings",
+)
+@click.option(
+    "--seed", default=None, type=int, help="Seed of the random generator for the data"
+)
+@click.option(
+    "--force",
+    is_flag=True,
+    default=False,
+    help="Load every table again, even the ones already populated",
+)
+@click.option(
+    "--unlogged",
+    is_flag=True,
+    default=False,
+    help="Switch the tables to UNLOGGED and build their indexes after the load",
+)
+def insert_into_schema(
+    schema_name: str,
+    only_original: bool,
+    jobs: int,
+    method: str,
+    generate_rows: int | None,
+    null_fraction: float,
+    distribution: str,
+    min_string_length: int,
+    max_string_length: int,
+    seed: int | None,
+    force: bool,
+    unlogged: bool,
+) -> None:
     """
-    Insert data from file sql/data/*.sql into the table
+    Insert data from file sql/data/*.sql into the table, or generate it
     """
     schema: Schema | None = find_schema_by_name(schema_name)
     if schema:
-        populate_schema(schema, only_original)
+        generation = None
+        if generate_rows is not None:
+            generation = DataGenerationSettings(
+                rows=generate_rows,
+                null_fraction=null_fraction,
+                distribution=ValueDistribution(distribution.lower()),
+                min_string_length=min_string_length,
+                max_string_length=max_string_length,
+                seed=seed,
+            )
+        populate_schema(
+            schema,
+            only_original,
+            jobs,
+            PopulationMethod(method.lower()),
+            generation,
+            force,
+            unlogged,
+        )
         click.echo("Schema populated")
     else:
         click.echo(f"Schema {schema_name} not found")
 
 
+@cli.command(name="status")
+@click.option("--schema-name", default=None, help="Schema name to show the status of")
+def print_population_status(schema_name: str) -> None:
+    """
+    Show which tables of the schema are populated and which are left to populate
+    """
+    schema: Schema | None = find_schema_by_name(schema_name)
+    if schema is None:
+        click.echo(f"Schema {schema_name} not found")
+        return
+
+    table_data = [
+        [
+            status.table_name,
+            "yes" if status.is_baseline_populated else "no",
+            status.populated_permutations,
+            status.pending_permutations,
+            status.unlogged_tables,
+        ]
+        for status in load_population_status(schema)
+    ]
+    headers = [
+        "Table",
+        "Baseline populated",
+        "Populated permutations",
+        "Pending",
+        "Unlogged",
+    ]
+    click.echo(tabulate(table_data, headers=headers, tablefmt="github"))
+
+
+@cli.command(name="logged")
+@click.option("--schema-name", default=None, help="Schema name to switch to LOGGED")
+@click.option(
+    "--jobs",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Number of tables switched in parallel, each one on its own connection",
+)
+def set_logged(schema_name: str, jobs: int) -> None:
+    """
+    Switch the UNLOGGED tables of the schema back to LOGGED
+    """
+    schema: Schema | None = find_schema_by_name(schema_name)
+    if schema:
+        set_schema_logged(schema, jobs)
+        click.echo("Tables switched to LOGGED")
+    else:
+        click.echo(f"Schema {schema_name} not found")
+
+
+@cli.command(name="normalize")
+@click.option("--schema-name", default=None, help="Schema name to normalize")
+@click.option(
+    "--jobs",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Number of tables vacuumed in parallel, each one on its own connection",
+)
+def normalize(schema_name: str, jobs: int) -> None:
+    """
+    Vacuum, freeze and analyze the populated tables, then checkpoint
+    """
+    schema: Schema | None = find_schema_by_name(schema_name)
+    if schema:
+        normalize_schema(schema, jobs)
+        click.echo(f"Schema {schema_name} normalized")
+    else:
+        click.echo(f"Schema {schema_name} not found")
+
+
 @cli.command(name="benchmark")
 @click.option("--schema-name", default=None, help="Schema name to run benchmark on")
 @click.option(
@@ -143,8 +420,60 @@ def insert_into_schema(schema_name: str, only_original: bool) -> None:
     default=None,
     help="The kind of benchamrk to run. Possible options are: all, size. Defaults to all",
 )
+@click.option(
+    "--selectivity",
+    default=DEFAULT_SELECTIVITY,
+    type=float,
+    help="Share of the rows read by the filters of the read-only workload",
+)
+@click.option(
+    "--clients",
+    default=DEFAULT_LOAD_CLIENTS,
+    type=click.IntRange(min=1),
+    help="Concurrent clients of the load and mixed benchmarks",
+)
+@click.option(
+    "--duration",
+    default=DEFAULT_LOAD_DURATION,
+    type=click.FloatRange(min=0, min_open=True),
+    help="Seconds the load and mixed benchmarks run against every table",
+)
+@click.option(
+    "--read-ratio",
+    default=DEFAULT_MIX_READ_RATIO,
+    type=click.FloatRange(min=0, max=1),
+    help="Share of reads of the mixed workload",
+)
+@click.option(
+    "--rate",
+    default=DEFAULT_MIX_RATE,
+    type=click.FloatRange(min=0, min_open=True),
+    help="Operations per second the mixed workload issues, whether the previous ones completed or not",
+)
+@click.option(
+    "--trials",
+    default=DEFAULT_TRIALS,
+    type=click.IntRange(min=1),
+    help="Independent trials of the read-only workload on every table",
+)
+@click.option(
+    "--warmup",
+    default=DEFAULT_WARMUP_ITERATIONS,
+    type=click.IntRange(min=0),
+    help="Runs of every query of the read-only workload before it is measured, in every trial",
+)
 @catch_exception(handle=Exception)
-def benchmark_schemas(schema_name: str, benchmark_logic: str) -> None:
+def benchmark_schemas(
+    schema_name: str,
+    benchmark_logic: str,
+    selectivity: float,
+    clients: int,
+    duration: float,
+    read_ratio: float,
+    rate: float,
+    trials: int,
+    warmup: int,
+) -> None:
     """
     Run benchmarks
     """
@@ -152,7 +481,17 @@ def benchmark_schemas(schema_name: str, benchmark_logic: str) -> None:
     benchmark_request = get_benchmark_request_from_argument(benchmark_logic)
 
     if schema:
-        benchmark_schema(schema, benchmark_request)
+        benchmark_schema(
+            schema,
+            benchmark_request,
+            selectivity,
+            clients,
+            duration,
+            read_ratio,
+            rate,
+            trials,
+            warmup,
+        )
         click.echo(f"Schema {schema_name} benchmark finished.")
     else:
         click.echo(f"Schema {schema_name} not found")
@@ -175,6 +514,34 @@ def print_schema_analysis(schema_name: str) -> None:
         click.echo(f"Schema {schema_name} not found")
         return
 
+    contexts_by_table = {
+        context.table_name: context
+        for context in load_contexts_for_project(schema.name)
+    }
+    permutations_by_name = {
+        permutation.name: permutation for permutation in schema.permutations
+    }
+
+    def _column_order(permutation_name: str) -> str:
+        permutation = permutations_by_name.get(permutation_name)
+        if (
+            permutation is None
+            or permutation.original_table_name not in contexts_by_table
+        ):
+            return ""
+        return ", ".join(
+            get_permutation_column_names(
+                contexts_by_table[permutation.original_table_name],
+                permutation.permutation_code,
+            )
+        )
+
+    def _confidence_interval(report: AnalysisReport) -> str:
+        if report.is_significant is None:
+            return ""
+        interval = f"[{report.confidence_interval_low:.2f}, {report.confidence_interval_high:.2f}]"
+        return interval if report.is_significant else f"{interval} not significant"
+
     for analysis in load_analysis_for_schema(schema):
         click.echo(f"Analysis {analysis.name}")
         # Prepare data for the Markdown table
@@ -183,8 +550,10 @@ def print_schema_analysis(schema_name: str) -> None:
                 report.metric,
                 report.best_permutation_name,
                 f"{report.improvement_percentage_over_baseline:.2f}%",
+                _confidence_interval(report),
                 report.original_metric_value,
                 report.permutation_metric_value,
+                _column_order(report.best_permutation_name),
             ]
             for report in analysis.reports
         ]
@@ -192,8 +561,10 @@ def print_schema_analysis(schema_name: str) -> None:
             "Metric",
             "Best Permutation",
             "Improvement (%)",
+            "95% CI (%)",
             "Baseline value",
             "Permutation value",
+            "Column order",
         ]
 
         # Print Markdown table using tabulate
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any
+
+from src.emm.engine.data import DDLTableColumn, DDLTableContext
+
+log = logging.getLogger(__name__)
+
+# Bump it whenever the parser or the serialized context change, so that stale entries are ignored
+CACHE_VERSION = 4
+
+DEFAULT_CACHE_DIR = ".emm_cache"
+
+# Contexts parsed by this process, by content hash
+_memo: dict[str, list[dict[str, Any]]] = {}
+
+
+def _get_cache_dir() -> str:
+    return os.getenv("EMM_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+
+def compute_ddl_hash(ddl: str) -> str:
+    """
+    Key of the cache: the hash of the DDL content, and of the cache version.
+    """
+    return hashlib.sha256(f"{CACHE_VERSION}\n{ddl}".encode()).hexdigest()
+
+
+def context_to_dict(context: DDLTableContext) -> dict[str, Any]:
+    return {
+        "table_name": context.table_name,
+        "columns": [
+            {
+                "name": column.name,
+                "type": column.type,
+                "original_definition": column.original_definition,
+                "typlen": column.typlen,
+                "typalign": column.typalign,
+                "is_not_null": column.is_not_null,
+                "default": column.default,
+            }
+            for column in context.columns
+        ],
+        "constraints": context.constraints,
+        "indexes": context.indexes,
+    }
+
+
+def context_from_dict(project_name: str, data: dict[str, Any]) -> DDLTableContext:
+    context = DDLTableContext(project_name=project_name)
+    context.table_name = data["table_name"]
+    for column in data["columns"]:
+        context.add_column(
+            DDLTableColumn(
+                name=column["name"],
+                column_type=column["type"],
+                original_definition=column["original_definition"],
+                typlen=column["typlen"],
+                typalign=column["typalign"],
+                is_not_null=column["is_not_null"],
+                default=column["default"],
+            )
+        )
+    for constraint in data["constraints"]:
+        context.add_constraint(constraint)
+    for index in data["indexes"]:
+        context.add_index(index)
+    return context
+
+
+def load_cached_contexts(project_name: str, ddl: str) -> list[DDLTableContext] | None:
+    """
+    Returns the contexts previously parsed from the very same DDL, if any: first from memory,
+    then from the cache directory. Fresh objects are returned every time.
+    """
+    ddl_hash = compute_ddl_hash(ddl)
+    if ddl_hash not in _memo:
+        cache_file_path = os.path.join(_get_cache_dir(), f"{ddl_hash}.json")
+        if not os.path.isfile(cache_file_path):
+            return None
+        try:
+            with open(cache_file_path, "r") as file:
+                _memo[ddl_hash] = json.load(file)
+        except (OSError, ValueError):
+            log.warning(f"Cache entry {cache_file_path} unreadable. Ignoring it")
+            return None
+
+    log.debug(f"Found parsed DDL for project {project_name} in the cache")
+    return [context_from_dict(project_name, data) for data in _memo[ddl_hash]]
+
+
+def save_cached_contexts(ddl: str, contexts: list[DDLTableContext]) -> None:
+    """
+    Store the contexts parsed from the DDL in memory and in the cache directory.
+    Failing to write the cache is not an error.
+    """
+    ddl_hash = compute_ddl_hash(ddl)
+    _memo[ddl_hash] = [context_to_dict(context) for context in contexts]
+
+    cache_dir = _get_cache_dir()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(os.path.join(cache_dir, f"{ddl_hash}.json"), "w") as file:
+            json.dump(_memo[ddl_hash], file)
+    except OSError as e:
+        log.warning(f"Could not write the parse cache in {cache_dir}: {e}")
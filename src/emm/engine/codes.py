@@ -0,0 +1,103 @@
+import hashlib
+import math
+
+# Lowercase, so that codes can be part of unquoted PostgreSQL identifiers
+BASE36_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+# NAMEDATALEN - 1: longer identifiers are truncated by PostgreSQL
+MAX_IDENTIFIER_LENGTH = 63
+
+
+def encode_permutation(indices: list[int]) -> str:
+    """
+    Compact and reversible code of a permutation of range(len(indices)).
+    The permutation is ranked through its Lehmer code and the rank is written in base 36,
+    e.g. the identity is always "0", whatever the number of columns.
+    """
+    size = len(indices)
+    if sorted(indices) != list(range(size)):
+        raise ValueError(f"{indices} is not a permutation")
+
+    rank = 0
+    for position, index in enumerate(indices):
+        following = position + 1
+        smaller_after = sum(1 for other in indices[following:] if other < index)
+        rank += smaller_after * math.factorial(size - 1 - position)
+
+    return _to_base36(rank)
+
+
+def decode_permutation(code: str, size: int) -> list[int]:
+    """
+    Inverse of encode_permutation: the original indices of the columns, in the order of the permutation.
+    """
+    rank = _from_base36(code)
+    if rank < 0 or rank >= math.factorial(size):
+        raise ValueError(f"Code {code} is not a permutation of {size} elements")
+
+    remaining = list(range(size))
+    indices = []
+    for position in range(size):
+        digit, rank = divmod(rank, math.factorial(size - 1 - position))
+        indices.append(remaining.pop(digit))
+
+    return indices
+
+
+def make_permutation_table_name(table_name: str, permutation_code: str) -> str:
+    """
+    Name of the table of the permutation, prefixed by the name of the original table.
+    If it does not fit in a PostgreSQL identifier, the code is replaced by a digest of it:
+    the code itself is kept in emm_permutation.
+    """
+    permutation_table_name = f"{table_name}_{permutation_code}"
+    if len(permutation_table_name) <= MAX_IDENTIFIER_LENGTH:
+        return permutation_table_name
+
+    code_hash = hashlib.sha1(permutation_code.encode(), usedforsecurity=False)
+    digest = code_hash.hexdigest()[:16]
+    return f"{table_name[:MAX_IDENTIFIER_LENGTH - len(digest) - 1]}_{digest}"
+
+
+def _is_quoted(identifier: str) -> bool:
+    return (
+        len(identifier) > 1 and identifier.startswith('"') and identifier.endswith('"')
+    )
+
+
+def unquote_identifier(identifier: str) -> str:
+    """
+    The name an identifier stands for: quoted ones as they are, without the quotes.
+    """
+    if _is_quoted(identifier):
+        return identifier[1:-1].replace('""', '"')
+    return identifier
+
+
+def make_permutation_object_name(object_name: str, permutation_code: str) -> str:
+    """
+    Name of an index or of a constraint of the permutation table, derived from the original one.
+    A quoted name gives a quoted name, so that its case and characters are kept.
+    """
+    if not _is_quoted(object_name):
+        return make_permutation_table_name(object_name, permutation_code)
+    name = make_permutation_table_name(
+        unquote_identifier(object_name), permutation_code
+    )
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _to_base36(number: int) -> str:
+    digits = []
+    while True:
+        number, digit = divmod(number, len(BASE36_DIGITS))
+        digits.append(BASE36_DIGITS[digit])
+        if number == 0:
+            return "".join(reversed(digits))
+
+
+def _from_base36(code: str) -> int:
+    try:
+        return int(code, len(BASE36_DIGITS))
+    except ValueError:
+        raise ValueError(f"Code {code} is not a valid permutation code")
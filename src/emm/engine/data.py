@@ -4,44 +4,70 @@ from sqlparse.tokens import Token
 
 
 class ParsingContext:
-    tokens: list[Token] = []
+    tokens: list[Token]
     in_create: bool = False
     in_create_table: bool = False
     in_columns: bool = False
-    current_column_definition: list[str] = []
+    current_column_definition: list[str]
 
     def __init__(self, tokens: list[Token]) -> None:
         self.tokens = tokens
+        self.current_column_definition = []
 
 
 class DDLTableColumn:
     """
     A small data structure carrying the name of a column and the original string representation of its definition.
+    When read from the catalog, it also carries the exact storage information of the type (typlen, typalign),
+    whether the column is NOT NULL and its default expression.
     """
 
     name: str
     type: str
     original_definition: str
+    typlen: int | None
+    typalign: str | None
+    is_not_null: bool | None
+    default: str | None
 
-    def __init__(self, name: str, column_type: str, original_definition: str) -> None:
+    def __init__(
+        self,
+        name: str,
+        column_type: str,
+        original_definition: str,
+        typlen: int | None = None,
+        typalign: str | None = None,
+        is_not_null: bool | None = None,
+        default: str | None = None,
+    ) -> None:
         self.name = name
         self.type = column_type
         self.original_definition = original_definition
+        self.typlen = typlen
+        self.typalign = typalign
+        self.is_not_null = is_not_null
+        self.default = default
 
 
 class DDLTableContext:
     """
-    Context for DDL statements
+    Context for DDL statements.
+    Besides the columns, it keeps the table constraints (PRIMARY KEY, UNIQUE, CHECK, ...) as written
+    in the CREATE TABLE list and the CREATE INDEX statements on the table.
     """
 
     project_name: str
     _table_name: str
     _columns: list[DDLTableColumn]
+    _constraints: list[str]
+    _indexes: list[str]
 
     def __init__(self, project_name: str) -> None:
         self.project_name = project_name
         self._table_name = ""
         self._columns = []
+        self._constraints = []
+        self._indexes = []
 
     @property
     def table_name(self):
@@ -59,6 +85,20 @@ class DDLTableContext:
     def add_column(self, column_identifier: DDLTableColumn) -> None:
         self._columns.append(column_identifier)
 
+    @property
+    def constraints(self):
+        return self._constraints
+
+    def add_constraint(self, constraint_definition: str) -> None:
+        self._constraints.append(constraint_definition)
+
+    @property
+    def indexes(self):
+        return self._indexes
+
+    def add_index(self, index_statement: str) -> None:
+        self._indexes.append(index_statement)
+
 
 class PermutationRequest(Enum):
     """
@@ -68,6 +108,17 @@ class PermutationRequest(Enum):
     ALL = "all"
     CLUSTER_BY_TYPE = "type"
     MAGIC = "magic"
+    GENETIC = "genetic"
+
+
+class PermutationSampling(Enum):
+    """
+    How to pick a subset of all the permutations, when there are too many to create them all
+    """
+
+    RANDOM = "random"
+    LATIN_SQUARE = "latin"
+    DISTINCT_LAYOUT = "layout"
 
 
 class PermutationSettings:
@@ -87,6 +138,90 @@ class PermutationSettings:
         self.permutation_dict = permutation_dict
 
 
+class PopulationMethod(Enum):
+    """
+    How to load the data into the permutation tables
+    """
+
+    INSERT = "insert"
+    COPY = "copy"
+    FAN_OUT = "fanout"
+
+
+class PopulationStatus:
+    """
+    Data structure describing how far the population of one table of a project went
+    """
+
+    table_name: str
+    is_baseline_populated: bool
+    populated_permutations: int
+    pending_permutations: int
+    unlogged_tables: int
+
+    def __init__(self, table_name: str) -> None:
+        self.table_name = table_name
+        self.is_baseline_populated = False
+        self.populated_permutations = 0
+        self.pending_permutations = 0
+        self.unlogged_tables = 0
+
+
+class ValueDistribution(Enum):
+    """
+    How the generated values are spread over their range
+    """
+
+    UNIFORM = "uniform"
+    NORMAL = "normal"
+    SKEWED = "skewed"
+
+
+class DataGenerationSettings:
+    """
+    Data structure describing the synthetic rows to generate for every table of a project
+    """
+
+    rows: int
+    null_fraction: float
+    distribution: ValueDistribution
+    min_string_length: int
+    max_string_length: int
+    seed: int | None
+
+    def __init__(
+        self,
+        rows: int,
+        null_fraction: float = 0.1,
+        distribution: ValueDistribution = ValueDistribution.UNIFORM,
+        min_string_length: int = 5,
+        max_string_length: int = 30,
+        seed: int | None = None,
+    ) -> None:
+        self.rows = rows
+        self.null_fraction = null_fraction
+        self.distribution = distribution
+        self.min_string_length = min_string_length
+        self.max_string_length = max_string_length
+        self.seed = seed
+
+
+class ForeignKeyValues:
+    """
+    Data structure describing a foreign key of a table, and the values of the key it references, one tuple
+    per referenced row, for the generated rows to draw from
+    """
+
+    column_names: list[str]
+    rows: list[tuple[str | None, ...]]
+
+    def __init__(
+        self, column_names: list[str], rows: list[tuple[str | None, ...]]
+    ) -> None:
+        self.column_names = column_names
+        self.rows = rows
+
+
 class BenchmarkRequest(Enum):
     """
     Specify what kind of benchmark to run
@@ -97,6 +232,89 @@ class BenchmarkRequest(Enum):
     FLASK_RO = "ro"
     FLASK_RW = "rw"
     FLASK_MIX = "rw_ro_mix"
+    LOAD = "load"
+
+
+class LatencySummary:
+    """
+    Data structure describing the latencies of the queries of a load, as seen by the clients
+    """
+
+    count: int
+    p50: float
+    p95: float
+    p99: float
+    maximum: float
+    queries_per_second: float
+
+    def __init__(
+        self,
+        count: int,
+        p50: float,
+        p95: float,
+        p99: float,
+        maximum: float,
+        queries_per_second: float,
+    ) -> None:
+        self.count = count
+        self.p50 = p50
+        self.p95 = p95
+        self.p99 = p99
+        self.maximum = maximum
+        self.queries_per_second = queries_per_second
+
+    def as_metrics(self) -> dict[str, float]:
+        """
+        The summary by metric name, latencies in ms
+        """
+        return {
+            "latency_p50_ms": self.p50,
+            "latency_p95_ms": self.p95,
+            "latency_p99_ms": self.p99,
+            "latency_max_ms": self.maximum,
+            "queries_per_second": self.queries_per_second,
+        }
+
+
+class ScheduledOperation:
+    """
+    Data structure describing an operation of an open-loop workload: the statement to run, and when,
+    in seconds from the start of the workload
+    """
+
+    at: float
+    operation: str
+    statement: str
+
+    def __init__(self, at: float, operation: str, statement: str) -> None:
+        self.at = at
+        self.operation = operation
+        self.statement = statement
+
+
+class OpenLoopResult:
+    """
+    Data structure describing the outcome of an open-loop workload: the latencies in ms of the operations
+    completed, by operation, how long the workload took, in seconds, and how many operations failed
+    """
+
+    latencies_by_operation: dict[str, list[float]]
+    elapsed: float
+    failures: int
+
+    def __init__(
+        self,
+        latencies_by_operation: dict[str, list[float]],
+        elapsed: float,
+        failures: int,
+    ) -> None:
+        self.latencies_by_operation = latencies_by_operation
+        self.elapsed = elapsed
+        self.failures = failures
+
+    @property
+    def completed(self) -> int:
+        return sum(len(latencies) for latencies in self.latencies_by_operation.values())
 
 
 class ReadOnlyWorkloadType(Enum):
@@ -136,3 +354,26 @@ class ReadOnlyWorkloadType(Enum):
     READ_ORDER_BY = "read_order_by"
     READ_RANGE_FILTER = "read_range_filter"
     READ_PAGINATION = "read_pagination"
+
+
+class WriteWorkloadType(Enum):
+    """
+    Specify the type of transaction the read-write workload is gonna use.
+    Examples of transactions are:
+    # WRITE_INSERT_BATCH
+    "INSERT INTO original_table (id, name) VALUES (1001, 'a'), (1002, 'b') ON CONFLICT DO NOTHING;",
+
+    # WRITE_UPDATE_FIXED_WIDTH
+    "UPDATE original_table SET amount = 42 WHERE id = 500;",
+
+    # WRITE_UPDATE_VARLENA
+    "UPDATE original_table SET name = 'abc' WHERE id = 500;",
+
+    # WRITE_DELETE
+    "DELETE FROM original_table WHERE id = 501;",
+    """
+
+    WRITE_INSERT_BATCH = "write_insert_batch"
+    WRITE_UPDATE_FIXED_WIDTH = "write_update_fixed_width"
+    WRITE_UPDATE_VARLENA = "write_update_varlena"
+    WRITE_DELETE = "write_delete"
@@ -0,0 +1,146 @@
+import re
+
+from src.emm.engine.codes import make_permutation_object_name, unquote_identifier
+
+# An identifier, either plain or quoted, as quote_ident writes them
+_identifier = r'(?:"(?:[^"]|"")+"|\w+)'
+
+# CREATE INDEX statements, as written in a DDL file or as returned by pg_get_indexdef
+_create_index_re = re.compile(
+    r"(?:\s|--[^\n]*|/\*.*?\*/)*"
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?"
+    rf"(?:(?P<index_name>{_identifier})\s+)?ON\s+(?:ONLY\s+)?"
+    rf"(?P<qualified_table_name>(?:{_identifier}\.)?(?P<table_name>{_identifier}))",
+    re.I | re.S,
+)
+_alter_table_add_constraint_re = re.compile(
+    r"(?:\s|--[^\n]*|/\*.*?\*/)*"
+    rf"ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?(?:{_identifier}\.)?(?P<table_name>{_identifier})\s+ADD\s+"
+    rf"(?P<constraint>(?:CONSTRAINT\s+{_identifier}\s+)?(?:PRIMARY\s+KEY|UNIQUE|CHECK|EXCLUDE|FOREIGN\s+KEY)\b.*?)"
+    r"\s*;?\s*$",
+    re.I | re.S,
+)
+_table_constraint_re = re.compile(
+    rf"(?:CONSTRAINT\s+{_identifier}\s+)?(?:PRIMARY\s+KEY|UNIQUE|CHECK|EXCLUDE|FOREIGN\s+KEY)\b",
+    re.I,
+)
+_foreign_key_re = re.compile(
+    rf"(?:CONSTRAINT\s+{_identifier}\s+)?FOREIGN\s+KEY\b", re.I
+)
+# Inline foreign key of a column definition, with its name and options
+_column_references_re = re.compile(
+    rf"(?:\s+CONSTRAINT\s+{_identifier})?\s+REFERENCES\s+(?:{_identifier}\.)?{_identifier}(?:\s*\([^)]*\))?"
+    r"(?:\s+MATCH\s+(?:FULL|PARTIAL|SIMPLE)"
+    r"|\s+ON\s+(?:DELETE|UPDATE)\s+(?:NO\s+ACTION|RESTRICT|CASCADE|SET\s+NULL|SET\s+DEFAULT)(?:\s*\([^)]*\))?"
+    r"|\s+(?:NOT\s+)?DEFERRABLE"
+    r"|\s+INITIALLY\s+(?:DEFERRED|IMMEDIATE))*",
+    re.I,
+)
+_constraint_name_re = re.compile(
+    rf"\bCONSTRAINT\s+(?P<constraint_name>{_identifier})", re.I
+)
+
+
+def make_column_definition(
+    column_name: str,
+    column_type: str,
+    is_not_null: bool,
+    default: str | None,
+    identity: str = "",
+    generated: str = "",
+) -> str:
+    """
+    The definition of a column from its pg_attribute flags: identity is attidentity ('a' for ALWAYS,
+    'd' for BY DEFAULT) and generated is attgenerated ('s' for STORED). The expression of a generated
+    column comes as its default, from pg_attrdef, but it is not a default: columns cannot be referenced
+    in a DEFAULT.
+    """
+    definition = f"{column_name} {column_type}"
+    if identity:
+        definition += (
+            f" GENERATED {'ALWAYS' if identity == 'a' else 'BY DEFAULT'} AS IDENTITY"
+        )
+    elif generated:
+        definition += f" GENERATED ALWAYS AS ({default}) STORED"
+    elif default is not None:
+        definition += f" DEFAULT {default}"
+    if is_not_null:
+        definition += " NOT NULL"
+    return definition
+
+
+def is_table_constraint(definition: str) -> bool:
+    """
+    Check if an element of the CREATE TABLE list is a table constraint, rather than a column.
+    """
+    return _table_constraint_re.match(definition.strip()) is not None
+
+
+def is_foreign_key_constraint(definition: str) -> bool:
+    return _foreign_key_re.match(definition.strip()) is not None
+
+
+def strip_column_references(definition: str) -> str:
+    """
+    The column definition without its inline foreign key (REFERENCES clause), if any.
+    """
+    return _column_references_re.sub("", definition)
+
+
+def parse_index_table_name(statement: str) -> str | None:
+    """
+    Name of the table a CREATE INDEX statement is on, None if the statement is not a CREATE INDEX.
+    """
+    match = _create_index_re.match(statement)
+    return unquote_identifier(match.group("table_name")) if match else None
+
+
+def parse_added_constraint(statement: str) -> tuple[str, str] | None:
+    """
+    (table name, constraint definition) of an ALTER TABLE ... ADD constraint statement, as pg_dump writes them.
+    None for any other statement.
+    """
+    match = _alter_table_add_constraint_re.match(statement)
+    if match is None:
+        return None
+    return unquote_identifier(match.group("table_name")), match.group("constraint")
+
+
+def rename_constraints(definition: str, permutation_code: str) -> str:
+    """
+    Give the named constraints of the definition a name of their own for the permutation.
+    Constraint names backed by an index must be unique in the schema, like the index names.
+    Unnamed constraints are left as they are: PostgreSQL names them after the table.
+    """
+    return _constraint_name_re.sub(
+        lambda match: "CONSTRAINT "
+        + make_permutation_object_name(
+            match.group("constraint_name"), permutation_code
+        ),
+        definition,
+    )
+
+
+def rewrite_index_statement(
+    statement: str, permutation_table_name: str, permutation_code: str
+) -> str:
+    """
+    Point a CREATE INDEX statement to the table of the permutation, with an index name of its own.
+    The table is left unqualified, so that it is created in the schema of the project.
+    """
+    match = _create_index_re.match(statement)
+    if match is None:
+        raise ValueError(f"Not a CREATE INDEX statement: {statement}")
+
+    table_start, table_end = match.span("qualified_table_name")
+    rewritten = statement[:table_start] + permutation_table_name + statement[table_end:]
+
+    if match.group("index_name") is not None:
+        name_start, name_end = match.span("index_name")
+        rewritten = (
+            rewritten[:name_start]
+            + make_permutation_object_name(match.group("index_name"), permutation_code)
+            + rewritten[name_end:]
+        )
+
+    return rewritten.strip().rstrip(";")
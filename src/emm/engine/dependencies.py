@@ -0,0 +1,32 @@
+import logging
+
+log = logging.getLogger(__name__)
+
+
+def order_by_dependencies(
+    table_names: list[str], references: list[tuple[str, str]]
+) -> list[list[str]]:
+    """
+    Split the tables in groups to load one after the other, so that every table comes after the tables
+    its foreign keys reference: the tables of a group only reference tables of the groups before.
+    references are (table, referenced table) pairs. References to tables not listed, or to the table itself,
+    are ignored. Tables in a cycle of references cannot be ordered, and end up together in the last group.
+    Names are compared case-insensitively, and returned as given.
+    """
+    pending = {table_name.lower(): table_name for table_name in table_names}
+    dependencies: dict[str, set[str]] = {key: set() for key in pending}
+    for table_name, referenced_table_name in references:
+        key, referenced_key = table_name.lower(), referenced_table_name.lower()
+        if key in dependencies and referenced_key in pending and key != referenced_key:
+            dependencies[key].add(referenced_key)
+
+    groups: list[list[str]] = []
+    while pending:
+        ready = [key for key in pending if not dependencies[key] & pending.keys()]
+        if not ready:
+            log.warning(
+                f"Tables {sorted(pending.values())} reference each other. They are loaded together"
+            )
+            ready = list(pending)
+        groups.append([pending.pop(key) for key in ready])
+    return groups
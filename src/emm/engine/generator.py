@@ -0,0 +1,577 @@
+import datetime
+import logging
+import random
+import re
+import string
+import uuid
+from typing import Callable, Iterator
+
+from src.emm.engine.data import (
+    DataGenerationSettings,
+    DDLTableColumn,
+    DDLTableContext,
+    ForeignKeyValues,
+    ValueDistribution,
+)
+from src.emm.engine.layout import is_column_nullable, normalize_type_name
+
+log = logging.getLogger(__name__)
+
+# Rows generated at once, one column at a time
+GENERATION_BATCH_SIZE = 10_000
+
+# Generated numbers fall in [0, VALUE_RANGE), unless the type is smaller
+VALUE_RANGE = 1_000_000
+
+# With the skewed distribution, about half of the values fall in the lowest 6% of the range
+SKEW_EXPONENT = 4
+
+# Dates and timestamps are spread over 25 years from this one
+BASE_DATE = datetime.date(2000, 1, 1)
+DATE_RANGE_DAYS = 25 * 365
+
+ALPHABET = string.ascii_letters + string.digits
+
+# NULL in the COPY text format
+COPY_NULL = "\\N"
+
+_INTEGER_MAXIMUMS = {"int2": 2**15 - 1, "int4": 2**31 - 1, "int8": 2**63 - 1}
+_type_length_re = re.compile(r"\(\s*(\d+)")
+_numeric_typmod_re = re.compile(r"\(\s*(\d+)\s*(?:,\s*(-?\d+)\s*)?\)")
+_filled_by_the_database_re = re.compile(
+    r"\bGENERATED\s+(?:ALWAYS|BY\s+DEFAULT)\s+AS\b", re.I
+)
+_stored_generated_re = re.compile(r"\bGENERATED\s+ALWAYS\s+AS\s*\(", re.I)
+_serial_types = {
+    "serial",
+    "serial2",
+    "serial4",
+    "serial8",
+    "smallserial",
+    "bigserial",
+}
+# Types distinct values can be generated for, from the number of the row
+_unique_types = set(_INTEGER_MAXIMUMS) | {
+    "float4",
+    "float8",
+    "numeric",
+    "money",
+    "text",
+    "varchar",
+    "bpchar",
+    "char",
+    "name",
+    "date",
+    "timestamp",
+    "timestamptz",
+    "uuid",
+}
+_inline_unique_re = re.compile(r"\bPRIMARY\s+KEY\b|\bUNIQUE\b", re.I)
+_unique_constraint_re = re.compile(
+    r"(?:PRIMARY\s+KEY|UNIQUE)\s*\(\s*(?P<first_column_name>\w+)", re.I
+)
+
+# Returns count values, as written in the COPY text format, for the rows from first_row on
+ValuesGenerator = Callable[[random.Random, int, int], list[str]]
+
+
+def is_filled_by_the_database(column: DDLTableColumn) -> bool:
+    """
+    Serial, identity and generated columns are left to the database, so that their values stay consistent.
+    """
+    if column.default is not None and column.default.startswith("nextval("):
+        return True
+    if column.type.strip().lower() in _serial_types:
+        return True
+    return _filled_by_the_database_re.search(column.original_definition) is not None
+
+
+def is_computed_by_the_database(column: DDLTableColumn) -> bool:
+    """
+    Generated columns are computed from the other columns of the row: no value can be written into them,
+    not even by COPY.
+    """
+    return _stored_generated_re.search(column.original_definition) is not None
+
+
+def get_generated_columns(context: DDLTableContext) -> list[DDLTableColumn]:
+    """
+    The columns of the table the generator provides values for, in the table order.
+    """
+    return [
+        column for column in context.columns if not is_filled_by_the_database(column)
+    ]
+
+
+def get_unique_column_names(context: DDLTableContext) -> set[str]:
+    """
+    Columns that get distinct values: the ones declared PRIMARY KEY or UNIQUE, and the first column
+    of every PRIMARY KEY or UNIQUE constraint, which is enough to make the whole key unique.
+    """
+    unique_column_names = {
+        column.name
+        for column in context.columns
+        if _inline_unique_re.search(column.original_definition)
+    }
+    for constraint in context.constraints:
+        if match := _unique_constraint_re.search(constraint):
+            unique_column_names.add(match.group("first_column_name"))
+    return unique_column_names
+
+
+def _draw(
+    rng: random.Random, distribution: ValueDistribution, count: int, upper: int
+) -> list[int]:
+    """
+    count integers in [0, upper), spread according to the distribution.
+    """
+    if distribution == ValueDistribution.NORMAL:
+        mean, deviation = upper / 2, upper / 6
+        return [
+            min(upper - 1, max(0, int(rng.gauss(mean, deviation))))
+            for _ in range(count)
+        ]
+    if distribution == ValueDistribution.SKEWED:
+        return [int(upper * rng.random() ** SKEW_EXPONENT) for _ in range(count)]
+    return [int(upper * rng.random()) for _ in range(count)]
+
+
+def _get_type_length(column_type: str) -> int | None:
+    """
+    The n of varchar(n), char(n) or bit(n), if any.
+    """
+    match = _type_length_re.search(column_type)
+    return int(match.group(1)) if match else None
+
+
+def _get_numeric_typmod(column_type: str) -> tuple[int, int] | None:
+    """
+    The precision and the scale of numeric(p, s), the scale being 0 if omitted. None for a plain numeric.
+    """
+    match = _numeric_typmod_re.search(column_type)
+    if match is None:
+        return None
+    return int(match.group(1)), int(match.group(2) or 0)
+
+
+def _format_scaled(units: int, scale: int) -> str:
+    """
+    The number units * 10 ** -scale, written with scale decimals.
+    """
+    if scale <= 0:
+        return str(units * 10**-scale)
+    integer_part, decimal_part = divmod(units, 10**scale)
+    return f"{integer_part}.{decimal_part:0{scale}d}"
+
+
+def _make_numeric_generator(
+    column: DDLTableColumn,
+    precision: int,
+    scale: int,
+    is_unique: bool,
+    distribution: ValueDistribution,
+) -> ValuesGenerator:
+    """
+    The generator of the values of a numeric(precision, scale) column: they must have at most
+    precision - scale digits before the decimal point, or the COPY fails with a numeric field overflow.
+    Unique values are the row numbers, with no decimals.
+    """
+    if is_unique:
+        capacity = 10 ** (precision - max(scale, 0)) - 1
+
+        def _unique_numerics(
+            rng: random.Random, first_row: int, count: int
+        ) -> list[str]:
+            _check_capacity(column, first_row + count, capacity)
+            return [
+                _format_scaled(row, min(scale, 0))
+                for row in range(first_row + 1, first_row + count + 1)
+            ]
+
+        return _unique_numerics
+
+    # In units of the last digit, 10 ** -scale
+    upper = min(
+        10**precision,
+        max(
+            1, VALUE_RANGE * 10**scale if scale >= 0 else VALUE_RANGE // 10**-scale
+        ),
+    )
+    return lambda rng, first_row, count: [
+        _format_scaled(units, scale) for units in _draw(rng, distribution, count, upper)
+    ]
+
+
+def _encode_row_number(row: int) -> str:
+    """
+    The row number in base 62, written with the characters of the alphabet.
+    """
+    digits = []
+    while True:
+        row, digit = divmod(row, len(ALPHABET))
+        digits.append(ALPHABET[digit])
+        if row == 0:
+            return "".join(reversed(digits))
+
+
+def _check_capacity(column: DDLTableColumn, last_row: int, capacity: int) -> None:
+    if last_row > capacity:
+        raise ValueError(
+            f"Column {column.name} of type {column.type} cannot hold {last_row} distinct values"
+        )
+
+
+def make_values_generator(
+    column: DDLTableColumn, is_unique: bool, settings: DataGenerationSettings
+) -> ValuesGenerator | None:
+    """
+    The generator of the values of the column, None if its type is not supported.
+    Unique values are derived from the number of the row: generating more rows than the type can hold
+    distinct values fails.
+    """
+    type_name = normalize_type_name(column.type)
+    distribution = settings.distribution
+
+    if is_unique and type_name not in _unique_types:
+        return None
+
+    if type_name in _INTEGER_MAXIMUMS:
+        maximum = _INTEGER_MAXIMUMS[type_name]
+        upper = min(VALUE_RANGE, maximum)
+        if is_unique:
+
+            def _unique_integers(
+                rng: random.Random, first_row: int, count: int
+            ) -> list[str]:
+                _check_capacity(column, first_row + count, maximum)
+                return [str(row) for row in range(first_row + 1, first_row + count + 1)]
+
+            return _unique_integers
+        return lambda rng, first_row, count: [
+            str(value) for value in _draw(rng, distribution, count, upper)
+        ]
+
+    if type_name == "numeric" and (typmod := _get_numeric_typmod(column.type)):
+        precision, scale = typmod
+        return _make_numeric_generator(
+            column, precision, scale, is_unique, distribution
+        )
+
+    if type_name in ("float4", "float8", "numeric", "money"):
+        if is_unique:
+            return lambda rng, first_row, count: [
+                str(row) for row in range(first_row + 1, first_row + count + 1)
+            ]
+        return lambda rng, first_row, count: [
+            f"{value + rng.random():.2f}"
+            for value in _draw(rng, distribution, count, VALUE_RANGE)
+        ]
+
+    if type_name in ("text", "varchar", "bpchar", "char", "name"):
+        type_length = _get_type_length(column.type)
+        # char without a length is char(1), and "char" holds a single byte
+        if type_name == "char" or column.type.strip().lower() in ("char", "character"):
+            type_length = 1
+        max_length = min(settings.max_string_length, type_length or 63)
+        min_length = min(settings.min_string_length, max_length)
+
+        def _strings(rng: random.Random, first_row: int, count: int) -> list[str]:
+            values = [
+                "".join(rng.choices(ALPHABET, k=rng.randint(min_length, max_length)))
+                for _ in range(count)
+            ]
+            if is_unique:
+                _check_capacity(
+                    column, first_row + count, len(ALPHABET) ** max_length - 1
+                )
+                # The separator is not in the alphabet, so that no row number is the prefix of another
+                values = [
+                    f"{_encode_row_number(row)}-{value}"[:max_length]
+                    for row, value in enumerate(values, start=first_row + 1)
+                ]
+            return values
+
+        return _strings
+
+    if type_name == "bool":
+        return lambda rng, first_row, count: [
+            "t" if rng.random() < 0.5 else "f" for _ in range(count)
+        ]
+
+    if type_name == "date":
+        if is_unique:
+
+            def _unique_dates(
+                rng: random.Random, first_row: int, count: int
+            ) -> list[str]:
+                _check_capacity(
+                    column, first_row + count, (datetime.date.max - BASE_DATE).days
+                )
+                return [
+                    (BASE_DATE + datetime.timedelta(days=row)).isoformat()
+                    for row in range(first_row + 1, first_row + count + 1)
+                ]
+
+            return _unique_dates
+        return lambda rng, first_row, count: [
+            (BASE_DATE + datetime.timedelta(days=days)).isoformat()
+            for days in _draw(rng, distribution, count, DATE_RANGE_DAYS)
+        ]
+
+    if type_name in ("timestamp", "timestamptz"):
+        suffix = "+00" if type_name == "timestamptz" else ""
+        base = datetime.datetime.combine(BASE_DATE, datetime.time())
+        if is_unique:
+            return lambda rng, first_row, count: [
+                (base + datetime.timedelta(seconds=row)).isoformat(sep=" ") + suffix
+                for row in range(first_row + 1, first_row + count + 1)
+            ]
+        return lambda rng, first_row, count: [
+            (base + datetime.timedelta(seconds=seconds)).isoformat(sep=" ") + suffix
+            for seconds in _draw(rng, distribution, count, DATE_RANGE_DAYS * 86400)
+        ]
+
+    if type_name in ("time", "timetz"):
+        suffix = "+00" if type_name == "timetz" else ""
+        return lambda rng, first_row, count: [
+            f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}{suffix}"
+            for seconds in _draw(rng, distribution, count, 86400)
+        ]
+
+    if type_name == "interval":
+        return lambda rng, first_row, count: [
+            f"{seconds} seconds"
+            for seconds in _draw(rng, distribution, count, VALUE_RANGE)
+        ]
+
+    if type_name == "uuid":
+        return lambda rng, first_row, count: [
+            str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(count)
+        ]
+
+    if type_name in ("json", "jsonb"):
+        return lambda rng, first_row, count: [
+            f'{{"value": {value}}}'
+            for value in _draw(rng, distribution, count, VALUE_RANGE)
+        ]
+
+    if type_name == "bytea":
+        max_length = settings.max_string_length
+        min_length = min(settings.min_string_length, max_length)
+        # The backslash of the hex format is escaped, as the COPY text format wants
+        return lambda rng, first_row, count: [
+            "\\\\x" + rng.randbytes(rng.randint(min_length, max_length)).hex()
+            for _ in range(count)
+        ]
+
+    if type_name == "inet":
+        return lambda rng, first_row, count: [
+            f"10.{value >> 16}.{value >> 8 & 255}.{value & 255}"
+            for value in _draw(rng, distribution, count, 2**24)
+        ]
+
+    if type_name == "cidr":
+        return lambda rng, first_row, count: [
+            f"10.{value >> 8}.{value & 255}.0/24"
+            for value in _draw(rng, distribution, count, 2**16)
+        ]
+
+    if type_name in ("bit", "varbit"):
+        bit_length = _get_type_length(column.type) or 8
+        return lambda rng, first_row, count: [
+            format(rng.getrandbits(bit_length), f"0{bit_length}b") for _ in range(count)
+        ]
+
+    return None
+
+
+def normalize_column_name(column_name: str) -> str:
+    """
+    The name of the column as PostgreSQL stores it, for names written with or without quotes.
+    """
+    if column_name.startswith('"') and column_name.endswith('"'):
+        return column_name[1:-1].replace('""', '"')
+    return column_name.lower()
+
+
+def escape_copy_value(value: str | None) -> str:
+    """
+    The value as written in the COPY text format.
+    """
+    if value is None:
+        return COPY_NULL
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def is_foreign_key_unique(
+    context: DDLTableContext, foreign_key: ForeignKeyValues
+) -> bool:
+    """
+    Whether the generated rows need distinct values of the foreign key, as it includes a unique column.
+    """
+    unique_column_names = {
+        normalize_column_name(column_name)
+        for column_name in get_unique_column_names(context)
+    }
+    return any(
+        normalize_column_name(column_name) in unique_column_names
+        for column_name in foreign_key.column_names
+    )
+
+
+def _pick_referenced_rows(
+    foreign_key: ForeignKeyValues,
+    is_unique: bool,
+    rng: random.Random,
+    distribution: ValueDistribution,
+    first_row: int,
+    count: int,
+) -> list[tuple[str | None, ...] | None]:
+    """
+    The referenced rows the generated rows point to, None where there is none to point to.
+    Distinct rows are taken in order, the others are drawn according to the distribution.
+    """
+    if not foreign_key.rows:
+        return [None] * count
+    if is_unique:
+        if first_row + count > len(foreign_key.rows):
+            raise ValueError(
+                f"The foreign key on {', '.join(foreign_key.column_names)} needs {first_row + count} "
+                f"distinct referenced rows, only {len(foreign_key.rows)} are available"
+            )
+        return foreign_key.rows[first_row:][:count]
+    return [
+        foreign_key.rows[index]
+        for index in _draw(rng, distribution, count, len(foreign_key.rows))
+    ]
+
+
+def iter_copy_data(
+    context: DDLTableContext,
+    settings: DataGenerationSettings,
+    first_row: int = 0,
+    foreign_keys: list[ForeignKeyValues] | None = None,
+) -> Iterator[str]:
+    """
+    Lazily generate settings.rows rows for the generated columns of the table, in the COPY text format,
+    one chunk of GENERATION_BATCH_SIZE rows at a time. Values are generated a column at a time.
+    Unique values are derived from the number of the row, so rows numbered from first_row on do not
+    collide with the first_row rows generated before.
+    The columns of the foreign_keys take their values from the rows they reference, all the columns of a key
+    from the same row. Without referenced rows, they are left NULL, or make the generation fail if they are
+    NOT NULL: the referenced tables have to be filled first.
+    NOT NULL columns never get a NULL, the others get one with probability settings.null_fraction.
+    Columns of unsupported types are left NULL, or make the generation fail if they are NOT NULL.
+    """
+    seed = None if settings.seed is None else f"{settings.seed}:{context.table_name}"
+    rng = random.Random(seed)
+    unique_column_names = get_unique_column_names(context)
+
+    foreign_keys = foreign_keys or []
+    is_unique_by_foreign_key = [
+        is_foreign_key_unique(context, foreign_key) for foreign_key in foreign_keys
+    ]
+    foreign_key_positions: dict[str, tuple[int, int]] = {}
+    for index, foreign_key in enumerate(foreign_keys):
+        for position, column_name in enumerate(foreign_key.column_names):
+            foreign_key_positions[normalize_column_name(column_name)] = (
+                index,
+                position,
+            )
+
+    generators: list[tuple[ValuesGenerator | None, tuple[int, int] | None, bool]] = []
+    for column in get_generated_columns(context):
+        is_nullable = is_column_nullable(column) and column.name not in (
+            unique_column_names
+        )
+        foreign_key_position = foreign_key_positions.get(
+            normalize_column_name(column.name)
+        )
+        if foreign_key_position is not None:
+            if not foreign_keys[foreign_key_position[0]].rows and not is_nullable:
+                raise ValueError(
+                    f"No rows to reference for the foreign key column {column.name}: "
+                    "fill the referenced table first"
+                )
+            generators.append((None, foreign_key_position, is_nullable))
+            continue
+
+        generator = make_values_generator(
+            column, column.name in unique_column_names, settings
+        )
+        if generator is None:
+            if column.name in unique_column_names:
+                raise ValueError(
+                    f"Cannot generate distinct values of type {column.type} for column {column.name}"
+                )
+            if not is_nullable:
+                raise ValueError(
+                    f"Cannot generate values of type {column.type} for column {column.name}"
+                )
+            log.warning(
+                f"Cannot generate values of type {column.type}. Column {column.name} is left NULL"
+            )
+        generators.append((generator, None, is_nullable))
+
+    for batch_start in range(0, settings.rows, GENERATION_BATCH_SIZE):
+        count = min(GENERATION_BATCH_SIZE, settings.rows - batch_start)
+        referenced_rows = [
+            _pick_referenced_rows(
+                foreign_key,
+                is_unique,
+                rng,
+                settings.distribution,
+                first_row + batch_start,
+                count,
+            )
+            for foreign_key, is_unique in zip(foreign_keys, is_unique_by_foreign_key)
+        ]
+        columns = []
+        for generator, foreign_key_position, is_nullable in generators:
+            if foreign_key_position is not None:
+                index, position = foreign_key_position
+                values = [
+                    COPY_NULL if row is None else escape_copy_value(row[position])
+                    for row in referenced_rows[index]
+                ]
+            elif generator is None:
+                columns.append([COPY_NULL] * count)
+                continue
+            else:
+                values = generator(rng, first_row + batch_start, count)
+            if is_nullable and settings.null_fraction > 0:
+                values = [
+                    COPY_NULL if rng.random() < settings.null_fraction else value
+                    for value in values
+                ]
+            columns.append(values)
+
+        yield "".join("\t".join(row) + "\n" for row in zip(*columns))
+
+
+class CopyDataReader:
+    """
+    File-like view of the chunks of a COPY stream, as expected by the driver's COPY FROM support.
+    """
+
+    def __init__(self, chunks: Iterator[str]) -> None:
+        self._chunks = chunks
+        self._buffer = b""
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk.encode()
+
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
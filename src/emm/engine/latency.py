@@ -0,0 +1,28 @@
+import math
+
+from src.emm.engine.data import LatencySummary
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of values sorted in ascending order, 0 if there are none.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize_latencies(latencies: list[float], duration: float) -> LatencySummary:
+    """
+    Percentiles and maximum of the latencies, and the throughput over the duration of the load, in seconds.
+    """
+    ordered = sorted(latencies)
+    return LatencySummary(
+        count=len(ordered),
+        p50=percentile(ordered, 0.5),
+        p95=percentile(ordered, 0.95),
+        p99=percentile(ordered, 0.99),
+        maximum=ordered[-1] if ordered else 0.0,
+        queries_per_second=len(ordered) / duration if duration > 0 else 0.0,
+    )
@@ -0,0 +1,239 @@
+import logging
+import re
+
+from src.emm.engine.data import DDLTableColumn
+
+log = logging.getLogger(__name__)
+
+# PostgreSQL aligns every tuple (and the start of the user data) to MAXALIGN,
+# which is 8 bytes on all the 64-bit platforms we care about.
+MAXIMUM_ALIGNOF = 8
+
+# Size of HeapTupleHeaderData, before the null bitmap
+HEAP_TUPLE_HEADER_SIZE = 23
+
+# typalign codes as found in pg_type, mapped to the number of bytes.
+ALIGNMENT_BYTES: dict[str, int] = {"c": 1, "s": 2, "i": 4, "d": 8}
+
+# Variable length types (typlen = -1) are stored after a varlena header.
+VARLENA_LENGTH = -1
+
+# (typlen, typalign) as found in pg_type for the built-in types.
+PG_TYPE_LAYOUTS: dict[str, tuple[int, str]] = {
+    "bool": (1, "c"),
+    "char": (1, "c"),
+    "int2": (2, "s"),
+    "int4": (4, "i"),
+    "int8": (8, "d"),
+    "float4": (4, "i"),
+    "float8": (8, "d"),
+    "oid": (4, "i"),
+    "xid": (4, "i"),
+    "cid": (4, "i"),
+    "tid": (6, "s"),
+    "money": (8, "d"),
+    "pg_lsn": (8, "d"),
+    "date": (4, "i"),
+    "time": (8, "d"),
+    "timetz": (12, "d"),
+    "timestamp": (8, "d"),
+    "timestamptz": (8, "d"),
+    "interval": (16, "d"),
+    "uuid": (16, "c"),
+    "macaddr": (6, "i"),
+    "macaddr8": (8, "i"),
+    "point": (16, "d"),
+    "line": (24, "d"),
+    "lseg": (32, "d"),
+    "box": (32, "d"),
+    "circle": (24, "d"),
+    "name": (64, "c"),
+    "text": (VARLENA_LENGTH, "i"),
+    "varchar": (VARLENA_LENGTH, "i"),
+    "bpchar": (VARLENA_LENGTH, "i"),
+    "numeric": (VARLENA_LENGTH, "i"),
+    "bytea": (VARLENA_LENGTH, "i"),
+    "json": (VARLENA_LENGTH, "i"),
+    "jsonb": (VARLENA_LENGTH, "i"),
+    "xml": (VARLENA_LENGTH, "i"),
+    "inet": (VARLENA_LENGTH, "i"),
+    "cidr": (VARLENA_LENGTH, "i"),
+    "bit": (VARLENA_LENGTH, "i"),
+    "varbit": (VARLENA_LENGTH, "i"),
+    "tsvector": (VARLENA_LENGTH, "i"),
+    "tsquery": (VARLENA_LENGTH, "i"),
+}
+
+# SQL spellings and pseudo types mapped to the pg_type name.
+PG_TYPE_ALIASES: dict[str, str] = {
+    "boolean": "bool",
+    '"char"': "char",
+    "smallint": "int2",
+    "smallserial": "int2",
+    "serial2": "int2",
+    "int": "int4",
+    "integer": "int4",
+    "serial": "int4",
+    "serial4": "int4",
+    "bigint": "int8",
+    "bigserial": "int8",
+    "serial8": "int8",
+    "real": "float4",
+    "float": "float8",
+    "double precision": "float8",
+    "decimal": "numeric",
+    "character": "bpchar",
+    "char": "bpchar",
+    "character varying": "varchar",
+    "bit varying": "varbit",
+    "time without time zone": "time",
+    "time with time zone": "timetz",
+    "timestamp without time zone": "timestamp",
+    "timestamp with time zone": "timestamptz",
+}
+
+_type_parameters_re = re.compile(r"\(([^)]*)\)")
+_whitespaces_re = re.compile(r"\s+")
+_not_null_re = re.compile(r"\bNOT\s+NULL\b|\bPRIMARY\s+KEY\b", re.I)
+
+
+def normalize_type_name(column_type: str) -> str:
+    """
+    Turn the type as written in the DDL into the name used in pg_type.
+    Type modifiers (e.g. varchar(20)) are dropped, arrays are reported as `_<type>`.
+    """
+    type_name = column_type.strip().lower()
+    is_array = type_name.endswith("]") or type_name.startswith("_")
+    type_name = re.sub(r"\[\s*\d*\s*\]", "", type_name).lstrip("_")
+
+    parameters = _type_parameters_re.search(type_name)
+    type_name = _whitespaces_re.sub(" ", _type_parameters_re.sub("", type_name)).strip()
+
+    if type_name == "float" and parameters and parameters.group(1).strip().isdigit():
+        # float(p) is a real up to 24 bits of precision, a double precision otherwise
+        type_name = "float4" if int(parameters.group(1)) <= 24 else "float8"
+
+    type_name = PG_TYPE_ALIASES.get(type_name, type_name)
+
+    return f"_{type_name}" if is_array else type_name
+
+
+def get_type_layout(column_type: str) -> tuple[int, str]:
+    """
+    Returns the (typlen, typalign) pair for the type.
+    Arrays and unknown types are treated as varlena, so they never take part in the alignment puzzle.
+    """
+    type_name = normalize_type_name(column_type)
+    if type_name.startswith("_"):
+        return VARLENA_LENGTH, "i"
+
+    if type_name not in PG_TYPE_LAYOUTS:
+        log.warning(f"Unknown type {column_type}. Considering it a varlena.")
+        return VARLENA_LENGTH, "i"
+
+    return PG_TYPE_LAYOUTS[type_name]
+
+
+def get_column_layout(column: DDLTableColumn) -> tuple[int, str]:
+    """
+    Returns the (typlen, typalign) pair for the column.
+    The one read from the catalog is preferred, if any.
+    """
+    if column.typlen is not None and column.typalign is not None:
+        # typlen -2 (C strings) are variable length too
+        return max(column.typlen, VARLENA_LENGTH), column.typalign
+    return get_type_layout(column.type)
+
+
+def layout_signature(columns: list[DDLTableColumn]) -> tuple[tuple[int, str], ...]:
+    """
+    Canonical description of the on-disk layout: the sequence of (typlen, typalign) of the columns.
+    Two column orders with the same signature are physically identical, e.g. when two int4 are swapped.
+    """
+    return tuple(get_column_layout(column) for column in columns)
+
+
+def is_varlena(layout: tuple[int, str]) -> bool:
+    return layout[0] < 0
+
+
+def align_offset(offset: int, typalign: str) -> int:
+    """
+    Round the offset up to the next multiple of the alignment, like TYPEALIGN does.
+    """
+    alignment = ALIGNMENT_BYTES[typalign]
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def compute_padding(layouts: list[tuple[int, str]]) -> int:
+    """
+    Bytes wasted in alignment padding by the fixed length columns, in the given order.
+    Varlena values are assumed to be short (1-byte header), hence unaligned, but their length is unknown:
+    the first fixed length column following them is charged the worst case padding.
+    """
+    offset: int | None = 0
+    padding = 0
+    for typlen, typalign in layouts:
+        if typlen < 0:
+            offset = None
+            continue
+        if offset is None:
+            padding += ALIGNMENT_BYTES[typalign] - 1
+            offset = typlen
+            continue
+        aligned_offset = align_offset(offset, typalign)
+        padding += aligned_offset - offset
+        offset = aligned_offset + typlen
+
+    return padding
+
+
+class TupleWidthEstimate:
+    """
+    Predicted on-disk width of a row, split in tuple header, data and alignment padding.
+    Varlena values are counted with their 1-byte header only, so data is a lower bound:
+    what matters to compare two layouts of the same table is the padding.
+    """
+
+    header: int
+    data: int
+    padding: int
+
+    def __init__(self, header: int, data: int, padding: int) -> None:
+        self.header = header
+        self.data = data
+        self.padding = padding
+
+    @property
+    def width(self) -> int:
+        return self.header + self.data + self.padding
+
+
+def is_column_nullable(column: DDLTableColumn) -> bool:
+    """
+    A column is nullable unless declared NOT NULL or PRIMARY KEY.
+    """
+    if column.is_not_null is not None:
+        return not column.is_not_null
+    return _not_null_re.search(column.original_definition) is None
+
+
+def estimate_tuple_width(columns: list[DDLTableColumn]) -> TupleWidthEstimate:
+    """
+    Predict the width of a row where every value is present, for the columns in the given order.
+    The null bitmap is only there if at least one column is nullable, and it is part of the header.
+    """
+    header = HEAP_TUPLE_HEADER_SIZE
+    if any(is_column_nullable(column) for column in columns):
+        header += (len(columns) + 7) // 8
+    header = align_offset(header, "d")
+
+    layouts = [get_column_layout(column) for column in columns]
+    data = sum(1 if is_varlena(layout) else layout[0] for layout in layouts)
+    padding = compute_padding(layouts)
+
+    if not any(is_varlena(layout) for layout in layouts):
+        # The whole tuple is MAXALIGNed too
+        padding += align_offset(data + padding, "d") - (data + padding)
+
+    return TupleWidthEstimate(header=header, data=data, padding=padding)
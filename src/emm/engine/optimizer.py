@@ -0,0 +1,170 @@
+import heapq
+import itertools
+import logging
+from collections import defaultdict
+
+from src.emm.engine.data import DDLTableColumn
+from src.emm.engine.layout import (
+    ALIGNMENT_BYTES,
+    MAXIMUM_ALIGNOF,
+    align_offset,
+    get_column_layout,
+    is_varlena,
+)
+
+log = logging.getLogger(__name__)
+
+# How many layouts the MAGIC permutation returns: the optimum and the runner-ups.
+DEFAULT_CANDIDATES = 5
+
+
+def _group_columns_by_layout(
+    columns: list[DDLTableColumn],
+) -> tuple[dict[tuple[int, str], list[DDLTableColumn]], list[DDLTableColumn]]:
+    """
+    Split the columns in fixed length ones, grouped by (typlen, typalign), and varlena ones.
+    Columns keep their original relative order.
+    """
+    fixed_columns_by_layout: dict[tuple[int, str], list[DDLTableColumn]] = defaultdict(
+        list
+    )
+    varlena_columns: list[DDLTableColumn] = []
+    for column in columns:
+        layout = get_column_layout(column)
+        if is_varlena(layout):
+            varlena_columns.append(column)
+        else:
+            fixed_columns_by_layout[layout].append(column)
+
+    return fixed_columns_by_layout, varlena_columns
+
+
+def find_optimal_permutations(
+    columns: list[DDLTableColumn], candidates: int = DEFAULT_CANDIDATES
+) -> list[tuple[DDLTableColumn, ...]]:
+    """
+    Compute the column orders wasting the least bytes in alignment padding, best first.
+
+    Columns sharing the same (typlen, typalign) are interchangeable on disk, so the search
+    runs on the sequence of layout classes rather than on the columns. The exact padding still
+    needed to place the remaining columns only depends on what is left and on the current
+    offset modulo MAXALIGN: it is computed once with dynamic programming and used as the
+    (exact) heuristic of a best-first search, which then pops complete layouts in order of padding.
+    Columns whose length is a multiple of MAXALIGN never cost anything when placed first and do not
+    move the offset, so they are kept out of the search and lead the layout.
+    Varlena columns go last, in their original order.
+    The original order is never returned, since it is already the baseline.
+    """
+    fixed_columns_by_layout, varlena_columns = _group_columns_by_layout(columns)
+
+    # Largest alignment first, so that ties are broken towards the classic ordering
+    sorted_layouts = sorted(
+        fixed_columns_by_layout,
+        key=lambda layout: (ALIGNMENT_BYTES[layout[1]], layout[0]),
+        reverse=True,
+    )
+    leading_columns = tuple(
+        column
+        for layout in sorted_layouts
+        if layout[0] % MAXIMUM_ALIGNOF == 0
+        for column in fixed_columns_by_layout[layout]
+    )
+    layouts = [layout for layout in sorted_layouts if layout[0] % MAXIMUM_ALIGNOF != 0]
+    initial_counts = tuple(len(fixed_columns_by_layout[layout]) for layout in layouts)
+
+    padding_to_go: dict[tuple[tuple[int, ...], int], int] = {}
+
+    def _padding_to_go(counts: tuple[int, ...], offset: int) -> int:
+        """
+        Minimum padding needed to place the remaining columns, starting at offset (modulo MAXALIGN).
+        """
+        key = (counts, offset)
+        if key in padding_to_go:
+            return padding_to_go[key]
+
+        best = 0
+        if any(counts):
+            best = min(
+                _step_padding(offset, index)
+                + _padding_to_go(_decrement(counts, index), _next_offset(offset, index))
+                for index, count in enumerate(counts)
+                if count
+            )
+        padding_to_go[key] = best
+        return best
+
+    def _step_padding(offset: int, index: int) -> int:
+        return align_offset(offset, layouts[index][1]) - offset
+
+    def _next_offset(offset: int, index: int) -> int:
+        typlen, typalign = layouts[index]
+        return (align_offset(offset, typalign) + typlen) % MAXIMUM_ALIGNOF
+
+    def _decrement(counts: tuple[int, ...], index: int) -> tuple[int, ...]:
+        decremented = list(counts)
+        decremented[index] -= 1
+        return tuple(decremented)
+
+    original_order = tuple(columns)
+    results: list[tuple[DDLTableColumn, ...]] = []
+
+    # Best first: lowest estimated padding, then deepest node, then insertion order
+    counter = itertools.count()
+    heap: list[tuple[int, int, int, tuple[int, ...], int, int, tuple[int, ...]]] = [
+        (
+            _padding_to_go(initial_counts, 0),
+            0,
+            next(counter),
+            initial_counts,
+            0,
+            0,
+            (),
+        )
+    ]
+    while heap and len(results) < candidates:
+        _, negative_depth, _, counts, offset, padding, sequence = heapq.heappop(heap)
+
+        if not any(counts):
+            permutation = leading_columns + _materialize(
+                sequence, layouts, fixed_columns_by_layout, varlena_columns
+            )
+            if permutation == original_order:
+                log.info("The original column order is already among the best ones")
+                continue
+            log.debug(f"Found layout with {padding} bytes of padding")
+            results.append(permutation)
+            continue
+
+        for index, count in enumerate(counts):
+            if not count:
+                continue
+            next_counts = _decrement(counts, index)
+            next_offset = _next_offset(offset, index)
+            next_padding = padding + _step_padding(offset, index)
+            heapq.heappush(
+                heap,
+                (
+                    next_padding + _padding_to_go(next_counts, next_offset),
+                    negative_depth - 1,
+                    next(counter),
+                    next_counts,
+                    next_offset,
+                    next_padding,
+                    sequence + (index,),
+                ),
+            )
+
+    return results
+
+
+def _materialize(
+    sequence: tuple[int, ...],
+    layouts: list[tuple[int, str]],
+    fixed_columns_by_layout: dict[tuple[int, str], list[DDLTableColumn]],
+    varlena_columns: list[DDLTableColumn],
+) -> tuple[DDLTableColumn, ...]:
+    """
+    Turn a sequence of layout classes into columns, picking them in their original order.
+    """
+    iterators = [iter(fixed_columns_by_layout[layout]) for layout in layouts]
+    return tuple(next(iterators[index]) for index in sequence) + tuple(varlena_columns)
@@ -1,21 +1,66 @@
 import logging
 import os
 import re
+from typing import Iterable, Iterator
 
 import sqlparse
 from sqlparse.sql import Identifier, Parenthesis, Statement
 from sqlparse.tokens import DDL, Keyword, Name, Punctuation
 
+from src.emm.engine.cache import load_cached_contexts, save_cached_contexts
 from src.emm.engine.data import DDLTableColumn, DDLTableContext, ParsingContext
+from src.emm.engine.ddl import (
+    is_table_constraint,
+    parse_added_constraint,
+    parse_index_table_name,
+)
 
 log = logging.getLogger(__name__)
 
+# Characters of the data file read at once
+READ_CHUNK_SIZE = 1024 * 1024
+
+# The parts of a script that may contain a semicolon, and the semicolons themselves.
+# A part left open at the end of the text runs to its end: it may be closed in the next chunk.
+_statement_parts_re = re.compile(
+    r"""
+    '[^']*(?:''[^']*)*(?:'|\Z)
+    | "[^"]*(?:""[^"]*)*(?:"|\Z)
+    | --[^\n]*
+    | /\*.*?(?:\*/|\Z)
+    | \$(?P<tag>(?:[A-Za-z_]\w*)?)\$.*?(?:\$(?P=tag)\$|\Z)
+    | ;
+    """,
+    re.S | re.X,
+)
+_create_table_re = re.compile(
+    r"(?:\s|--[^\n]*|/\*.*?\*/)*"
+    r"CREATE\s+(?:(?:GLOBAL|LOCAL)\s+)?(?:(?:TEMP|TEMPORARY|UNLOGGED)\s+)?TABLE\b",
+    re.I | re.S,
+)
+# The parts of a CREATE TABLE list that matter to split it into its elements
+_table_element_parts_re = re.compile(
+    r"""
+    '[^']*(?:''[^']*)*'
+    | "[^"]*(?:""[^"]*)*"
+    | --[^\n]*
+    | /\*.*?\*/
+    | [(),]
+    """,
+    re.S | re.X,
+)
+_insert_into_re = re.compile(
+    r"(?:\s|--[^\n]*|/\*.*?\*/)*INSERT\s+INTO\s+(?P<table_name>[a-zA-Z0-9_]+)",
+    re.I | re.S,
+)
+
 
 def read_ddl_for_project(project_name: str) -> str:
     """
-    Returns the DDL associated with the main table of the specified project
+    Returns the DDL associated with the main table of the specified project.
+    Once the project is initialized, prefer reading the table definition from the catalog
+    (see src.emm.operations.catalog).
     """
-    # FIXME Instead of just reading the file, get the DDL from the table from the DB
     return read_sql_file(project_name, "schema")
 
 
@@ -26,13 +71,60 @@ def read_data_for_project(project_name: str) -> str:
     return read_sql_file(project_name, "data")
 
 
+def iter_data_for_project(project_name: str) -> Iterator[tuple[str, str]]:
+    """
+    Lazily read the data file of the project, and yield its INSERT statements with the (lower case)
+    table they insert into. Only a chunk of the file and the statement being read are in memory at once.
+    Statements other than INSERT are dropped.
+    """
+    for statement in iter_statements(iter_sql_file(project_name, "data")):
+        match = _insert_into_re.match(statement)
+        if match is None:
+            log.debug("Skipping a statement of the data file that is not an INSERT")
+            continue
+        # Unquoted identifiers are case insensitive
+        yield match.group("table_name").lower(), statement
+
+
+def find_tables_with_data(project_name: str) -> set[str]:
+    """
+    The (lower case) names of the tables the data file of the project inserts into.
+    """
+    return {table_name for table_name, _ in iter_data_for_project(project_name)}
+
+
+def rewrite_insert_table_name(statement: str, table_name: str) -> str:
+    """
+    Point an INSERT statement to another table. Only the table name is touched, not the values.
+    """
+    match = _insert_into_re.match(statement)
+    if match is None:
+        raise ValueError(f"Not an INSERT statement: {statement[:100]}")
+    start, end = match.span("table_name")
+    return statement[:start] + table_name + statement[end:]
+
+
+def _get_sql_file_path(project_name: str, filename_to_load: str) -> str:
+    return os.path.join("sql", "projects", project_name, f"{filename_to_load}.sql")
+
+
+def iter_sql_file(project_name: str, filename_to_load: str) -> Iterator[str]:
+    """
+    Lazily read the specified file in the project folder, READ_CHUNK_SIZE characters at a time
+    """
+    file_path = _get_sql_file_path(project_name, filename_to_load)
+    log.debug(f"Streaming file for project {project_name} at location {file_path}")
+
+    with open(file_path, "r") as file:
+        while chunk := file.read(READ_CHUNK_SIZE):
+            yield chunk
+
+
 def read_sql_file(project_name: str, filename_to_load: str) -> str:
     """
     Access the specified file in the project folder and return it as a string
     """
-    schema_file_path = os.path.join(
-        "sql", "projects", project_name, f"{filename_to_load}.sql"
-    )
+    schema_file_path = _get_sql_file_path(project_name, filename_to_load)
     content: str
 
     log.debug(f"Loading DDL for project {project_name} at location {schema_file_path}")
@@ -43,44 +135,83 @@ def read_sql_file(project_name: str, filename_to_load: str) -> str:
         return content
 
 
-def parse_all_statements(ddl: str) -> list[Statement]:
+def split_statements(ddl: str) -> Iterator[str]:
     """
-    Parse all statements present int he file.
+    Lazily split the DDL into statements, without tokenizing them: sqlparse builds a whole token tree
+    for every statement, which is only needed for the CREATE TABLE ones.
+    Semicolons inside literals, quoted identifiers, comments and dollar quoted bodies are not boundaries.
     """
-    parsed_statements: list[Statement] = sqlparse.parse(ddl)
+    return iter_statements([ddl])
+
 
-    log.debug(f"Found {len(parsed_statements)} statements")
+def iter_statements(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Split a script, given as consecutive chunks of text, into statements, as soon as they are complete.
+    Only the statement being read is kept from one chunk to the next.
+    """
+    buffer = ""
+    # Where the next part starts, from the beginning of the buffer
+    scan_start = 0
+    chunks = iter(chunks)
+    while True:
+        chunk = next(chunks, None)
+        is_last_chunk = chunk is None
+        if chunk is not None:
+            buffer += chunk
+
+        start = 0
+        for match in _statement_parts_re.finditer(buffer, scan_start):
+            if not is_last_chunk and match.end() == len(buffer):
+                # The part may go on in the next chunk
+                break
+            scan_start = match.end()
+            if match.group() != ";":
+                continue
+            statement = buffer[start:scan_start]
+            start = scan_start
+            if statement.strip():
+                yield statement
 
-    return parsed_statements
+        buffer = buffer[start:]
+        scan_start -= start
+        if is_last_chunk:
+            break
 
+    if buffer.strip():
+        yield buffer
 
-def is_statement_create_table(statement: Statement) -> bool:
+
+def is_statement_create_table(statement: str) -> bool:
+    """
+    Check if the statement under evaluation is a create table one, skipping the comments before it.
+    """
+    return _create_table_re.match(statement) is not None
+
+
+def iter_create_table_statements(ddl: str) -> Iterator[Statement]:
     """
-    Check if the statement under evaluation is a create table one. It relies on re.
+    Yields the CREATE TABLE statements of the DDL, parsed, in order.
     """
-    create_table_re = re.compile(r".*CREATE\s+TABLE", re.I | re.M | re.S)
-    return create_table_re.match(statement.value) is not None
+    for statement in split_statements(ddl):
+        if is_statement_create_table(statement):
+            yield sqlparse.parse(statement)[0]
 
 
 def extract_create_statement(ddl: str) -> Statement:
     """
     Parse the str representing the DDL and returns the first create table statement
     """
-    parsed_statements = parse_all_statements(ddl)
-    create_table_statements: list[Statement] = [
-        statement
-        for statement in parsed_statements
-        if is_statement_create_table(statement)
-    ]
+    create_table_statements = iter_create_table_statements(ddl)
+    create_table_statement = next(create_table_statements, None)
 
-    if len(create_table_statements) == 0:
+    if create_table_statement is None:
         raise ValueError("No `CREATE TABLE` statement found.")
-    elif len(create_table_statements) > 1:
+    elif next(create_table_statements, None) is not None:
         log.info(
             "Found more CREATE STATEMENT in the file, considering the first and discarding the others."
         )
 
-    return create_table_statements[0]
+    return create_table_statement
 
 
 def parse_create_statement(project_name: str, statement: Statement) -> DDLTableContext:
@@ -93,9 +224,96 @@ def parse_create_statement(project_name: str, statement: Statement) -> DDLTableC
 
     _parse_create(parsing_context, context)
 
+    for element in _split_table_elements(str(statement)):
+        if is_table_constraint(element):
+            context.add_constraint(element)
+
     return context
 
 
+def _split_table_elements(statement: str) -> list[str]:
+    """
+    Split the list between the outer parentheses of a CREATE TABLE into its elements, columns and
+    table constraints, at the commas not nested in parentheses. Comments are dropped.
+    """
+    elements: list[str] = []
+    current_element: list[str] = []
+    depth = 0
+    position = 0
+    for match in _table_element_parts_re.finditer(statement):
+        part, start = match.group(), match.start()
+        if depth > 0:
+            current_element.append(statement[position:start])
+        position = match.end()
+
+        if part.startswith(("--", "/*")):
+            continue
+        if part == "(":
+            depth += 1
+            if depth == 1:
+                continue
+        elif part == ")":
+            depth -= 1
+            if depth == 0:
+                elements.append("".join(current_element))
+                break
+        elif part == "," and depth == 1:
+            elements.append("".join(current_element))
+            current_element = []
+            continue
+
+        if depth > 0:
+            current_element.append(part)
+
+    return [element.strip() for element in elements if element.strip()]
+
+
+def parse_project_ddl(project_name: str, ddl: str) -> list[DDLTableContext]:
+    """
+    Parse every CREATE TABLE statement of the project DDL, in order: one context per table.
+    CREATE INDEX statements and constraints added with ALTER TABLE are attached to the context of their table.
+    Results are cached by content hash, so unchanged projects are only parsed once.
+    """
+    contexts = load_cached_contexts(project_name, ddl)
+    if contexts is not None:
+        return contexts
+
+    contexts = []
+    contexts_by_table: dict[str, DDLTableContext] = {}
+    for statement in split_statements(ddl):
+        if is_statement_create_table(statement):
+            context = parse_create_statement(
+                project_name=project_name, statement=sqlparse.parse(statement)[0]
+            )
+            contexts.append(context)
+            contexts_by_table[context.table_name.lower()] = context
+            continue
+
+        if (index_table_name := parse_index_table_name(statement)) is not None:
+            if index_table_name.lower() not in contexts_by_table:
+                log.warning(f"Index on unknown table {index_table_name}. Skipping it")
+                continue
+            contexts_by_table[index_table_name.lower()].add_index(
+                statement.strip().rstrip(";")
+            )
+            continue
+
+        if (added_constraint := parse_added_constraint(statement)) is not None:
+            constraint_table_name, constraint = added_constraint
+            if constraint_table_name.lower() not in contexts_by_table:
+                log.warning(
+                    f"Constraint on unknown table {constraint_table_name}. Skipping it"
+                )
+                continue
+            contexts_by_table[constraint_table_name.lower()].add_constraint(constraint)
+
+    if not contexts:
+        raise ValueError("No `CREATE TABLE` statement found.")
+    save_cached_contexts(ddl, contexts)
+
+    return contexts
+
+
 def _parse_create(parsing_context: ParsingContext, context: DDLTableContext) -> None:
     """
     A tiny and simple parser that keep the state of the parsing and fill the context with the columns found.
@@ -132,7 +350,7 @@ def _parse_create(parsing_context: ParsingContext, context: DDLTableContext) ->
                         column_type=current_identifier_type,
                         original_definition="".join(
                             parsing_context.current_column_definition
-                        ),
+                        ).strip(),
                     )
                 )
                 has_found_identifier = False
@@ -0,0 +1,125 @@
+import math
+import random
+from typing import Iterator
+
+from src.emm.engine.data import DDLTableColumn, PermutationSampling
+from src.emm.engine.layout import get_column_layout
+
+
+def sample_permutations(
+    columns: list[DDLTableColumn],
+    sampling: PermutationSampling,
+    sample_size: int | None = None,
+    seed: int | None = None,
+) -> Iterator[tuple[DDLTableColumn, ...]]:
+    """
+    Lazily draw permutations of the columns according to the sampling strategy.
+    The original order is never returned. Memory only depends on the sample size.
+    """
+    rng = random.Random(seed)
+    if sampling == PermutationSampling.RANDOM:
+        if sample_size is None:
+            raise ValueError("Random sampling needs a sample size")
+        return _sample_uniform(columns, rng, sample_size)
+    elif sampling == PermutationSampling.LATIN_SQUARE:
+        return _sample_latin_square(columns, rng, sample_size)
+    elif sampling == PermutationSampling.DISTINCT_LAYOUT:
+        return _iter_distinct_layouts(columns, sample_size)
+    else:
+        raise ValueError(f"Sampling {sampling} not valid")
+
+
+def _sample_uniform(
+    columns: list[DDLTableColumn], rng: random.Random, sample_size: int
+) -> Iterator[tuple[DDLTableColumn, ...]]:
+    """
+    Uniformly random permutations, without repetitions.
+    """
+    sample_size = min(sample_size, math.factorial(len(columns)) - 1)
+
+    original_order = tuple(columns)
+    seen: set[tuple[DDLTableColumn, ...]] = {original_order}
+    while len(seen) <= sample_size:
+        permutation = tuple(rng.sample(columns, len(columns)))
+        if permutation in seen:
+            continue
+        seen.add(permutation)
+        yield permutation
+
+
+def _sample_latin_square(
+    columns: list[DDLTableColumn], rng: random.Random, sample_size: int | None
+) -> Iterator[tuple[DDLTableColumn, ...]]:
+    """
+    Rows of randomized Latin squares: within a square, every column appears exactly once in every position.
+    Without a sample size, a single square is returned.
+    """
+    original_order = tuple(columns)
+    sample_size = len(columns) if sample_size is None else sample_size
+    seen: set[tuple[DDLTableColumn, ...]] = {original_order}
+    attempts = 0
+    while len(seen) <= sample_size and attempts < sample_size * 10:
+        symbols = rng.sample(columns, len(columns))
+        rows = list(range(len(columns)))
+        rng.shuffle(rows)
+        for row in rows:
+            attempts += 1
+            permutation = tuple(
+                symbols[(row + position) % len(columns)]
+                for position in range(len(columns))
+            )
+            if permutation in seen:
+                continue
+            seen.add(permutation)
+            yield permutation
+            if len(seen) > sample_size:
+                return
+
+
+def _iter_distinct_layouts(
+    columns: list[DDLTableColumn], sample_size: int | None
+) -> Iterator[tuple[DDLTableColumn, ...]]:
+    """
+    One permutation per distinct sequence of (typlen, typalign), in lexicographic order.
+    Columns sharing the same layout keep their original relative order.
+    """
+    layouts = [get_column_layout(column) for column in columns]
+    layout_ids = {layout: index for index, layout in enumerate(dict.fromkeys(layouts))}
+    columns_by_layout_id: dict[int, list[DDLTableColumn]] = {}
+    for column, layout in zip(columns, layouts):
+        columns_by_layout_id.setdefault(layout_ids[layout], []).append(column)
+
+    original_sequence = [layout_ids[layout] for layout in layouts]
+    sequence = sorted(original_sequence)
+    produced = 0
+    while sample_size is None or produced < sample_size:
+        if sequence != original_sequence:
+            iterators = {
+                layout_id: iter(layout_columns)
+                for layout_id, layout_columns in columns_by_layout_id.items()
+            }
+            yield tuple(next(iterators[layout_id]) for layout_id in sequence)
+            produced += 1
+
+        if not _next_permutation(sequence):
+            return
+
+
+def _next_permutation(sequence: list[int]) -> bool:
+    """
+    Rearrange the sequence in place into the next one in lexicographic order, skipping repetitions.
+    Returns False when the sequence was already the last one.
+    """
+    pivot = len(sequence) - 2
+    while pivot >= 0 and sequence[pivot] >= sequence[pivot + 1]:
+        pivot -= 1
+    if pivot < 0:
+        return False
+
+    successor = len(sequence) - 1
+    while sequence[successor] <= sequence[pivot]:
+        successor -= 1
+    sequence[pivot], sequence[successor] = sequence[successor], sequence[pivot]
+    suffix = pivot + 1
+    sequence[suffix:] = reversed(sequence[suffix:])
+    return True
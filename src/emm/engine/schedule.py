@@ -0,0 +1,72 @@
+import random
+from itertools import cycle
+
+from src.emm.engine.data import (
+    ReadOnlyWorkloadType,
+    ScheduledOperation,
+    WriteWorkloadType,
+)
+
+
+def poisson_arrivals(rate: float, duration: float, rng: random.Random) -> list[float]:
+    """
+    Arrival times, in seconds from the start, of a Poisson process of rate arrivals per second,
+    over duration seconds: the time between two arrivals follows an exponential distribution.
+    """
+    arrivals: list[float] = []
+    arrival = rng.expovariate(rate)
+    while arrival < duration:
+        arrivals.append(arrival)
+        arrival += rng.expovariate(rate)
+    return arrivals
+
+
+def interleave_writes(
+    writes: dict[WriteWorkloadType, list[str]]
+) -> list[tuple[WriteWorkloadType, str]]:
+    """
+    The write transactions, the types taking turns, so that each type gets its share whatever the number
+    of writes actually run.
+    """
+    interleaved: list[tuple[WriteWorkloadType, str]] = []
+    for index in range(
+        max((len(statements) for statements in writes.values()), default=0)
+    ):
+        interleaved.extend(
+            (workload_type, statements[index])
+            for workload_type, statements in writes.items()
+            if index < len(statements)
+        )
+    return interleaved
+
+
+def make_mixed_schedule(
+    reads: dict[ReadOnlyWorkloadType, str],
+    writes: dict[WriteWorkloadType, list[str]],
+    read_ratio: float,
+    rate: float,
+    duration: float,
+    seed: int | None = None,
+) -> list[ScheduledOperation]:
+    """
+    Open-loop schedule of a mixed workload: operations arrive at rate per second on average (Poisson arrivals),
+    whether the previous ones completed or not, for duration seconds.
+    Every arrival is a read with probability read_ratio, picked at random among the reads, else the next
+    write (see interleave_writes). Writes start over once all of them have been scheduled.
+    """
+    rng = random.Random(seed)
+    read_operations = list(reads.items())
+    interleaved_writes = interleave_writes(writes)
+    write_operations = cycle(interleaved_writes)
+
+    schedule = []
+    for at in poisson_arrivals(rate, duration, rng):
+        is_read = rng.random() < read_ratio
+        if read_operations and (is_read or not interleaved_writes):
+            workload_type, statement = rng.choice(read_operations)
+        elif interleaved_writes:
+            workload_type, statement = next(write_operations)
+        else:
+            break
+        schedule.append(ScheduledOperation(at, workload_type.value, statement))
+    return schedule
@@ -0,0 +1,93 @@
+import random
+
+# Probability for a child to get two of its columns swapped
+DEFAULT_MUTATION_RATE = 0.3
+
+
+def order_crossover(
+    first_parent: list[int], second_parent: list[int], rng: random.Random
+) -> list[int]:
+    """
+    Order crossover (OX1): the child keeps a random slice of the first parent, in place,
+    and the remaining columns in the order they have in the second parent.
+    """
+    size = len(first_parent)
+    start, end = sorted(rng.sample(range(size + 1), 2))
+    kept = set(first_parent[start:end])
+    remaining = iter(index for index in second_parent if index not in kept)
+
+    return [
+        first_parent[position] if start <= position < end else next(remaining)
+        for position in range(size)
+    ]
+
+
+def swap_mutation(
+    indices: list[int], rng: random.Random, mutation_rate: float
+) -> list[int]:
+    """
+    With probability mutation_rate, swap two random columns.
+    """
+    mutated = list(indices)
+    if len(mutated) > 1 and rng.random() < mutation_rate:
+        first, second = rng.sample(range(len(mutated)), 2)
+        mutated[first], mutated[second] = mutated[second], mutated[first]
+    return mutated
+
+
+def random_generation(
+    size: int,
+    generation_size: int,
+    rng: random.Random,
+    excluded: set[tuple[int, ...]],
+) -> list[list[int]]:
+    """
+    Random permutations of range(size), none of them in excluded.
+    """
+    generation: list[list[int]] = []
+    seen = set(excluded)
+    attempts = 0
+    while len(generation) < generation_size and attempts < generation_size * 20:
+        attempts += 1
+        indices = rng.sample(range(size), size)
+        if tuple(indices) in seen:
+            continue
+        seen.add(tuple(indices))
+        generation.append(indices)
+
+    return generation
+
+
+def breed_generation(
+    ranked_population: list[list[int]],
+    generation_size: int,
+    rng: random.Random,
+    excluded: set[tuple[int, ...]],
+    mutation_rate: float = DEFAULT_MUTATION_RATE,
+) -> list[list[int]]:
+    """
+    Breed the next generation from the population measured so far, best first.
+    Parents are picked among the best half, children are never in excluded (e.g. already measured).
+    If breeding keeps producing known permutations, fresh random ones fill the generation.
+    """
+    if not ranked_population:
+        return []
+
+    parents = ranked_population[: max(2, len(ranked_population) // 2)]
+    generation: list[list[int]] = []
+    seen = set(excluded)
+    attempts = 0
+    while len(generation) < generation_size and attempts < generation_size * 20:
+        attempts += 1
+        first_parent, second_parent = rng.choice(parents), rng.choice(parents)
+        child = swap_mutation(
+            order_crossover(first_parent, second_parent, rng), rng, mutation_rate
+        )
+        if tuple(child) in seen:
+            continue
+        seen.add(tuple(child))
+        generation.append(child)
+
+    return generation + random_generation(
+        len(ranked_population[0]), generation_size - len(generation), rng, seen
+    )
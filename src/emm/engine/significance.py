@@ -0,0 +1,118 @@
+import random
+import statistics
+from typing import Hashable, TypeVar
+
+from src.emm.engine.latency import percentile
+
+# Resamples of the bootstrap, and confidence of its intervals
+BOOTSTRAP_RESAMPLES = 2000
+CONFIDENCE_LEVEL = 0.95
+
+# Samples farther than this many interquartile ranges from the quartiles are outliers (Tukey's fences)
+OUTLIER_FENCE = 1.5
+
+CandidateKey = TypeVar("CandidateKey", bound=Hashable)
+
+
+def remove_outliers(values: list[float], fence: float = OUTLIER_FENCE) -> list[float]:
+    """
+    The values within Tukey's fences: a trial disturbed by a checkpoint or autovacuum, say, would
+    otherwise drag the mean. Fewer than 4 values are too few to tell, and are kept as they are.
+    """
+    if len(values) < 4:
+        return list(values)
+    first_quartile, _, third_quartile = statistics.quantiles(values, n=4)
+    margin = fence * (third_quartile - first_quartile)
+    return [
+        value
+        for value in values
+        if first_quartile - margin <= value <= third_quartile + margin
+    ]
+
+
+def improvement_percentage(
+    baseline_value: float, value: float, higher_is_better: bool = False
+) -> float:
+    """
+    How much better the value is than the one of the baseline, in percentage of the latter.
+    Lower is better, unless higher_is_better is set.
+    """
+    if baseline_value == 0:
+        return 0.0
+    difference = value - baseline_value if higher_is_better else baseline_value - value
+    return difference / baseline_value * 100
+
+
+def _expand_spread(values: list[float]) -> list[float]:
+    """
+    The values moved away from their mean by sqrt(n / (n - 1)): resampling a few values underestimates
+    their spread by that factor, and gives intervals too narrow for the handful of trials of a benchmark.
+    """
+    mean = statistics.fmean(values)
+    factor = (len(values) / (len(values) - 1)) ** 0.5
+    return [mean + (value - mean) * factor for value in values]
+
+
+def bootstrap_improvement_interval(
+    baseline_values: list[float],
+    values: list[float],
+    higher_is_better: bool = False,
+    confidence: float = CONFIDENCE_LEVEL,
+    resamples: int = BOOTSTRAP_RESAMPLES,
+    seed: int | None = None,
+) -> tuple[float, float] | None:
+    """
+    Percentile bootstrap confidence interval of the improvement percentage of the mean of values over
+    the mean of baseline_values, both being resampled. None if either has fewer than 2 values.
+    """
+    if len(baseline_values) < 2 or len(values) < 2:
+        return None
+
+    rng = random.Random(seed)
+    baseline_values = _expand_spread(baseline_values)
+    values = _expand_spread(values)
+    improvements = sorted(
+        improvement_percentage(
+            statistics.fmean(rng.choices(baseline_values, k=len(baseline_values))),
+            statistics.fmean(rng.choices(values, k=len(values))),
+            higher_is_better,
+        )
+        for _ in range(resamples)
+    )
+    tail = (1 - confidence) / 2
+    return percentile(improvements, tail), percentile(improvements, 1 - tail)
+
+
+def simultaneous_improvement_intervals(
+    baseline_values: list[float],
+    values_by_candidate: dict[CandidateKey, list[float]],
+    higher_is_better: bool = False,
+    confidence: float = CONFIDENCE_LEVEL,
+    resamples: int = BOOTSTRAP_RESAMPLES,
+    seed: int | None = None,
+) -> dict[CandidateKey, tuple[float, float] | None]:
+    """
+    Bootstrap confidence interval of the improvement of every candidate over the baseline, all of them
+    holding at once with the given confidence (Bonferroni correction): among many candidates, the best
+    one is otherwise bound to look significant by chance, the noise alone picking it as the best.
+    """
+    corrected_confidence = 1 - (1 - confidence) / max(len(values_by_candidate), 1)
+    return {
+        candidate: bootstrap_improvement_interval(
+            baseline_values,
+            values,
+            higher_is_better,
+            corrected_confidence,
+            resamples,
+            seed,
+        )
+        for candidate, values in values_by_candidate.items()
+    }
+
+
+def is_significant(interval: tuple[float, float]) -> bool:
+    """
+    Whether the difference is significant, i.e. the confidence interval of the improvement excludes 0.
+    """
+    low, high = interval
+    return low > 0 or high < 0
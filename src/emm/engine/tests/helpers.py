@@ -0,0 +1,21 @@
+from src.emm.engine.data import DDLTableColumn, DDLTableContext
+
+
+def make_columns(*column_types: str) -> list[DDLTableColumn]:
+    return [
+        DDLTableColumn(
+            name=f"column_{index}",
+            column_type=column_type,
+            original_definition=f"column_{index} {column_type}",
+        )
+        for index, column_type in enumerate(column_types)
+    ]
+
+
+def make_context(*column_definitions: str) -> DDLTableContext:
+    context = DDLTableContext("project")
+    context.table_name = "original_table"
+    for column_definition in column_definitions:
+        name, column_type = column_definition.split(" ")[:2]
+        context.add_column(DDLTableColumn(name, column_type, column_definition))
+    return context
@@ -0,0 +1,56 @@
+import pytest
+
+from src.emm.engine import cache
+from src.emm.engine.parser import parse_project_ddl
+
+DDL = """
+CREATE TABLE original_table (
+    id integer,
+    amount bigint,
+    name text
+);
+"""
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMM_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(cache, "_memo", {})
+    return tmp_path
+
+
+def test_parse_project_ddl_is_cached_on_disk(cache_dir, monkeypatch):
+    [context] = parse_project_ddl("first_project", DDL)
+
+    assert len(list(cache_dir.iterdir())) == 1
+
+    # A new process only has the cache directory
+    monkeypatch.setattr(cache, "_memo", {})
+    monkeypatch.setattr(
+        "src.emm.engine.parser.iter_create_table_statements",
+        lambda ddl: pytest.fail("The DDL should not be parsed again"),
+    )
+    [cached_context] = parse_project_ddl("second_project", DDL)
+
+    assert cached_context is not context
+    assert cached_context.project_name == "second_project"
+    assert cached_context.table_name == context.table_name
+    assert [(column.name, column.type) for column in cached_context.columns] == [
+        (column.name, column.type) for column in context.columns
+    ]
+
+
+def test_changed_ddl_is_parsed_again(cache_dir):
+    parse_project_ddl("project", DDL)
+    [context] = parse_project_ddl("project", DDL.replace("name text", "label varchar"))
+
+    assert len(list(cache_dir.iterdir())) == 2
+    assert [column.name for column in context.columns] == ["id", "amount", "label"]
+
+
+def test_corrupted_cache_entry_is_ignored(cache_dir):
+    (cache_dir / f"{cache.compute_ddl_hash(DDL)}.json").write_text("{not json")
+
+    [context] = parse_project_ddl("project", DDL)
+
+    assert [column.name for column in context.columns] == ["id", "amount", "name"]
@@ -0,0 +1,60 @@
+import itertools
+
+import pytest
+
+from src.emm.engine.codes import (
+    MAX_IDENTIFIER_LENGTH,
+    decode_permutation,
+    encode_permutation,
+    make_permutation_object_name,
+    make_permutation_table_name,
+    unquote_identifier,
+)
+
+
+def test_encode_decode_permutation_round_trip():
+    codes = set()
+    for permutation in itertools.permutations(range(5)):
+        code = encode_permutation(list(permutation))
+        codes.add(code)
+        assert decode_permutation(code, 5) == list(permutation)
+
+    assert len(codes) == 120
+    assert encode_permutation(list(range(5))) == "0"
+
+
+def test_encode_permutation_wide_table():
+    permutation = list(reversed(range(60)))
+
+    code = encode_permutation(permutation)
+
+    assert len(code) <= 53
+    assert decode_permutation(code, 60) == permutation
+
+
+@pytest.mark.parametrize("code,size", [("-1", 3), ("6", 3), ("not valid", 3)])
+def test_decode_permutation_invalid_code(code: str, size: int):
+    with pytest.raises(ValueError):
+        decode_permutation(code, size)
+
+
+def test_make_permutation_table_name():
+    assert make_permutation_table_name("raf_emm", "1z") == "raf_emm_1z"
+
+    long_code = encode_permutation(list(reversed(range(60))))
+    table_name = make_permutation_table_name("raf_emm", long_code)
+
+    assert len(table_name) <= MAX_IDENTIFIER_LENGTH
+    assert table_name.startswith("raf_emm_")
+    assert table_name != make_permutation_table_name("raf_emm", long_code[:-1])
+
+
+def test_make_permutation_object_name_keeps_quoted_names_quoted():
+    assert make_permutation_object_name("users_pkey", "1z") == "users_pkey_1z"
+    assert make_permutation_object_name('"Users_pkey"', "1z") == '"Users_pkey_1z"'
+    assert make_permutation_object_name('"A""b"', "1z") == '"A""b_1z"'
+
+
+def test_unquote_identifier():
+    assert unquote_identifier("users") == "users"
+    assert unquote_identifier('"My ""Users"""') == 'My "Users"'
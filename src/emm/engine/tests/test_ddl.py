@@ -0,0 +1,141 @@
+import pytest
+
+from src.emm.engine.ddl import (
+    is_foreign_key_constraint,
+    is_table_constraint,
+    make_column_definition,
+    parse_added_constraint,
+    parse_index_table_name,
+    rename_constraints,
+    rewrite_index_statement,
+    strip_column_references,
+)
+
+
+@pytest.mark.parametrize(
+    "definition,is_constraint",
+    [
+        ("PRIMARY KEY (id)", True),
+        ("CONSTRAINT users_name_key UNIQUE (name)", True),
+        ("check (amount > 0)", True),
+        ('CONSTRAINT "Orders_pk" PRIMARY KEY (id)', True),
+        ("FOREIGN KEY (user_id) REFERENCES users (id)", True),
+        ("id integer PRIMARY KEY", False),
+        ("unique_code text", False),
+    ],
+)
+def test_is_table_constraint(definition: str, is_constraint: bool):
+    assert is_table_constraint(definition) is is_constraint
+
+
+@pytest.mark.parametrize(
+    "catalog_row,definition",
+    [
+        (("id", "integer", True, None, "", ""), "id integer NOT NULL"),
+        (
+            ("amount", "numeric(10,2)", False, "0", "", ""),
+            "amount numeric(10,2) DEFAULT 0",
+        ),
+        (
+            ("id", "bigint", True, None, "a", ""),
+            "id bigint GENERATED ALWAYS AS IDENTITY NOT NULL",
+        ),
+        (
+            ("id", "integer", True, None, "d", ""),
+            "id integer GENERATED BY DEFAULT AS IDENTITY NOT NULL",
+        ),
+        (
+            ("total", "numeric", False, "(price * qty)", "", "s"),
+            "total numeric GENERATED ALWAYS AS ((price * qty)) STORED",
+        ),
+    ],
+)
+def test_make_column_definition_from_the_catalog(catalog_row: tuple, definition: str):
+    assert make_column_definition(*catalog_row) == definition
+
+
+def test_is_foreign_key_constraint():
+    assert is_foreign_key_constraint(
+        "CONSTRAINT orders_user_fk FOREIGN KEY (user_id) REFERENCES users (id)"
+    )
+    assert is_foreign_key_constraint(
+        'CONSTRAINT "Orders_User_fk" FOREIGN KEY (user_id) REFERENCES "Users" (id)'
+    )
+    assert not is_foreign_key_constraint("CONSTRAINT users_pkey PRIMARY KEY (id)")
+
+
+@pytest.mark.parametrize(
+    "statement,table_name",
+    [
+        ("CREATE INDEX users_name ON users (name);", "users"),
+        (
+            "-- by name\nCREATE UNIQUE INDEX IF NOT EXISTS users_name ON ONLY public.users USING btree (name)",
+            "users",
+        ),
+        ("CREATE INDEX ON users (name)", "users"),
+        ('CREATE INDEX "Idx" ON public."Orders" USING btree (id)', "Orders"),
+        ("CREATE TABLE users (id int)", None),
+    ],
+)
+def test_parse_index_table_name(statement: str, table_name: str | None):
+    assert parse_index_table_name(statement) == table_name
+
+
+def test_parse_added_constraint():
+    assert parse_added_constraint(
+        "ALTER TABLE ONLY public.users\n    ADD CONSTRAINT users_pkey PRIMARY KEY (id);\n"
+    ) == ("users", "CONSTRAINT users_pkey PRIMARY KEY (id)")
+    assert parse_added_constraint(
+        'ALTER TABLE ONLY "Sales"."Orders" ADD CONSTRAINT "Orders_pk" PRIMARY KEY (id);'
+    ) == ("Orders", 'CONSTRAINT "Orders_pk" PRIMARY KEY (id)')
+    assert parse_added_constraint("ALTER TABLE users ADD COLUMN age int;") is None
+
+
+@pytest.mark.parametrize(
+    "definition,stripped",
+    [
+        ("user_id integer REFERENCES users (id)", "user_id integer"),
+        (
+            "user_id integer NOT NULL REFERENCES public.users(id) ON DELETE CASCADE DEFAULT 1",
+            "user_id integer NOT NULL DEFAULT 1",
+        ),
+        (
+            'owner_id bigint CONSTRAINT owner_fk REFERENCES "Users" MATCH FULL '
+            "ON UPDATE SET NULL (owner_id) DEFERRABLE INITIALLY DEFERRED UNIQUE",
+            "owner_id bigint UNIQUE",
+        ),
+        ("referenced_at timestamp NOT NULL", "referenced_at timestamp NOT NULL"),
+    ],
+)
+def test_strip_column_references(definition: str, stripped: str):
+    assert strip_column_references(definition) == stripped
+
+
+def test_rename_constraints():
+    assert (
+        rename_constraints("id integer CONSTRAINT users_pkey PRIMARY KEY", "1z")
+        == "id integer CONSTRAINT users_pkey_1z PRIMARY KEY"
+    )
+    assert (
+        rename_constraints('CONSTRAINT "Orders_pk" PRIMARY KEY (id)', "1z")
+        == 'CONSTRAINT "Orders_pk_1z" PRIMARY KEY (id)'
+    )
+    assert rename_constraints("UNIQUE (name)", "1z") == "UNIQUE (name)"
+
+
+@pytest.mark.parametrize(
+    "statement,rewritten",
+    [
+        (
+            "CREATE INDEX users_name ON public.users USING btree (name);",
+            "CREATE INDEX users_name_1z ON users_1z USING btree (name)",
+        ),
+        ("CREATE INDEX ON users (name)", "CREATE INDEX ON users_1z (name)"),
+        (
+            'CREATE INDEX "Idx" ON public.orders USING btree (id)',
+            'CREATE INDEX "Idx_1z" ON users_1z USING btree (id)',
+        ),
+    ],
+)
+def test_rewrite_index_statement(statement: str, rewritten: str):
+    assert rewrite_index_statement(statement, "users_1z", "1z") == rewritten
@@ -0,0 +1,35 @@
+from src.emm.engine.dependencies import order_by_dependencies
+
+
+def test_parents_come_before_children():
+    groups = order_by_dependencies(
+        ["order_lines", "orders", "users", "products", "permutation"],
+        [
+            ("orders", "users"),
+            ("order_lines", "orders"),
+            ("order_lines", "products"),
+        ],
+    )
+
+    assert groups == [
+        ["users", "products", "permutation"],
+        ["orders"],
+        ["order_lines"],
+    ]
+
+
+def test_references_to_other_tables_and_self_are_ignored():
+    groups = order_by_dependencies(
+        ["Orders", "employees"],
+        [("orders", "users"), ("employees", "employees")],
+    )
+
+    assert groups == [["Orders", "employees"]]
+
+
+def test_cycles_are_loaded_together():
+    groups = order_by_dependencies(
+        ["a", "b", "c"], [("a", "b"), ("b", "a"), ("c", "a")]
+    )
+
+    assert groups == [["a", "b", "c"]]
@@ -0,0 +1,320 @@
+from decimal import Decimal
+
+import pytest
+
+from src.emm.engine.data import (
+    DataGenerationSettings,
+    ForeignKeyValues,
+    ValueDistribution,
+)
+from src.emm.engine.generator import (
+    COPY_NULL,
+    GENERATION_BATCH_SIZE,
+    CopyDataReader,
+    get_generated_columns,
+    is_computed_by_the_database,
+    iter_copy_data,
+)
+from src.emm.engine.tests.helpers import make_context
+
+COLUMN_DEFINITIONS = [
+    "id serial",
+    "code integer PRIMARY KEY",
+    "amount bigint",
+    "price numeric",
+    "label varchar(8)",
+    "created_at timestamp",
+    "reference uuid",
+]
+
+
+@pytest.fixture
+def context():
+    return make_context(*COLUMN_DEFINITIONS)
+
+
+def _rows(context, settings) -> list[list[str]]:
+    data = "".join(iter_copy_data(context, settings))
+    return [line.split("\t") for line in data.splitlines()]
+
+
+def test_serial_columns_are_left_to_the_database(context):
+    assert [column.name for column in get_generated_columns(context)] == [
+        "code",
+        "amount",
+        "price",
+        "label",
+        "created_at",
+        "reference",
+    ]
+
+
+def test_identity_and_generated_columns_of_the_catalog_are_left_to_the_database():
+    context = make_context(
+        "id bigint GENERATED ALWAYS AS IDENTITY NOT NULL",
+        "price numeric",
+        "qty integer",
+        "total numeric GENERATED ALWAYS AS ((price * qty)) STORED",
+    )
+
+    assert [column.name for column in get_generated_columns(context)] == [
+        "price",
+        "qty",
+    ]
+    assert [
+        column.name for column in context.columns if is_computed_by_the_database(column)
+    ] == ["total"]
+
+
+def test_iter_copy_data_generates_the_requested_rows(context):
+    rows = _rows(context, DataGenerationSettings(rows=GENERATION_BATCH_SIZE + 5))
+
+    assert len(rows) == GENERATION_BATCH_SIZE + 5
+    assert all(len(row) == 6 for row in rows)
+
+
+def test_iter_copy_data_is_lazy(context):
+    chunks = iter_copy_data(
+        context, DataGenerationSettings(rows=10 * GENERATION_BATCH_SIZE)
+    )
+
+    assert next(chunks).count("\n") == GENERATION_BATCH_SIZE
+
+
+def test_iter_copy_data_respects_the_column_types(context):
+    rows = _rows(
+        context,
+        DataGenerationSettings(
+            rows=1000, null_fraction=0, min_string_length=4, max_string_length=20
+        ),
+    )
+
+    for code, amount, price, label, created_at, reference in rows:
+        int(amount)
+        float(price)
+        assert 4 <= len(label) <= 8
+        assert created_at[:2] in ("20", "19")
+        assert len(reference) == 36
+
+
+def test_primary_key_values_are_unique_and_never_null(context):
+    rows = _rows(context, DataGenerationSettings(rows=1000, null_fraction=0.5))
+    codes = [row[0] for row in rows]
+
+    assert COPY_NULL not in codes
+    assert len(set(codes)) == len(codes)
+
+
+def test_first_column_of_a_primary_key_constraint_is_unique():
+    context = make_context("tenant integer", "code integer", "amount integer")
+    context.add_constraint("CONSTRAINT pk PRIMARY KEY (code, tenant)")
+    rows = _rows(context, DataGenerationSettings(rows=1000, null_fraction=0.5))
+    codes = [row[1] for row in rows]
+
+    assert len(set(codes)) == len(codes)
+
+
+def test_unique_text_values_fit_the_type():
+    context = make_context("code varchar(3) UNIQUE", "amount integer")
+    codes = [
+        row[0]
+        for row in _rows(
+            context, DataGenerationSettings(rows=GENERATION_BATCH_SIZE, seed=1)
+        )
+    ]
+
+    assert all(len(code) <= 3 for code in codes)
+    assert len(set(codes)) == len(codes)
+
+
+def test_unique_values_beyond_the_capacity_of_the_type_fail():
+    with pytest.raises(ValueError, match="cannot hold 32768 distinct values"):
+        _rows(
+            make_context("code smallint PRIMARY KEY"),
+            DataGenerationSettings(rows=2**15),
+        )
+    with pytest.raises(ValueError, match="cannot hold"):
+        _rows(make_context("code char UNIQUE"), DataGenerationSettings(rows=100))
+
+
+@pytest.mark.parametrize(
+    "column_type,maximum,decimals",
+    [("numeric(5,2)", Decimal("999.99"), 2), ("numeric(4,0)", Decimal("9999"), 0)],
+)
+def test_numeric_values_fit_the_precision_and_scale(
+    column_type: str, maximum: Decimal, decimals: int
+):
+    for distribution in ValueDistribution:
+        values = [
+            row[0]
+            for row in _rows(
+                make_context(f"amount {column_type} NOT NULL"),
+                DataGenerationSettings(rows=1000, distribution=distribution, seed=1),
+            )
+        ]
+
+        assert all(Decimal(value) <= maximum for value in values)
+        assert all(
+            len(value.partition(".")[2]) == decimals for value in values
+        ), values[:5]
+
+
+def test_unique_numeric_values_fit_the_precision_and_scale():
+    values = [
+        row[0]
+        for row in _rows(
+            make_context("code numeric(5,2) PRIMARY KEY"),
+            DataGenerationSettings(rows=999),
+        )
+    ]
+
+    assert len(set(values)) == 999
+    assert max(Decimal(value) for value in values) == Decimal("999")
+    with pytest.raises(ValueError, match="cannot hold 1000 distinct values"):
+        _rows(
+            make_context("code numeric(5,2) PRIMARY KEY"),
+            DataGenerationSettings(rows=1000),
+        )
+    with pytest.raises(ValueError, match="cannot hold 10000 distinct values"):
+        _rows(
+            make_context("code numeric(4,0) PRIMARY KEY"),
+            DataGenerationSettings(rows=10000),
+        )
+
+
+def test_unique_columns_of_types_without_distinct_values_fail():
+    with pytest.raises(ValueError, match="distinct values of type boolean"):
+        _rows(make_context("flag boolean UNIQUE"), DataGenerationSettings(rows=1))
+
+
+def test_null_fraction(context):
+    rows = _rows(context, DataGenerationSettings(rows=2000, null_fraction=0.25, seed=1))
+    amounts = [row[1] for row in rows]
+
+    assert 0.2 < amounts.count(COPY_NULL) / len(amounts) < 0.3
+    assert not any(
+        COPY_NULL in row
+        for row in _rows(context, DataGenerationSettings(rows=100, null_fraction=0))
+    )
+
+
+def test_seed_makes_the_data_reproducible(context):
+    settings = DataGenerationSettings(rows=100, seed=42)
+
+    assert _rows(context, settings) == _rows(context, settings)
+    assert _rows(context, settings) != _rows(
+        context, DataGenerationSettings(rows=100, seed=43)
+    )
+
+
+def test_skewed_distribution_favours_low_values(context):
+    def _median_amount(distribution):
+        rows = _rows(
+            context,
+            DataGenerationSettings(
+                rows=1000, null_fraction=0, distribution=distribution, seed=3
+            ),
+        )
+        amounts = sorted(int(row[1]) for row in rows)
+        return amounts[len(amounts) // 2]
+
+    assert _median_amount(ValueDistribution.SKEWED) < _median_amount(
+        ValueDistribution.UNIFORM
+    )
+
+
+def test_not_null_columns_of_unsupported_types_fail():
+    context = make_context("id integer", "tags integer[] NOT NULL")
+
+    with pytest.raises(ValueError):
+        list(iter_copy_data(context, DataGenerationSettings(rows=1)))
+
+
+def test_foreign_key_columns_take_the_referenced_values():
+    context = make_context("id integer", "user_id integer NOT NULL", "note text")
+    foreign_key = ForeignKeyValues(["user_id"], [("10",), ("20",), ("30",)])
+
+    rows = [
+        line.split("\t")
+        for line in "".join(
+            iter_copy_data(
+                context, DataGenerationSettings(rows=200), foreign_keys=[foreign_key]
+            )
+        ).splitlines()
+    ]
+
+    assert {row[1] for row in rows} <= {"10", "20", "30"}
+
+
+def test_composite_foreign_keys_reference_a_single_row():
+    context = make_context("id integer", "region text", "code text")
+    foreign_key = ForeignKeyValues(['"Region"', "code"], [("eu", "a\tb"), ("us", "c")])
+    context.columns[1].name = '"Region"'
+
+    data = "".join(
+        iter_copy_data(
+            context,
+            DataGenerationSettings(rows=100, null_fraction=0),
+            foreign_keys=[foreign_key],
+        )
+    )
+
+    assert {tuple(line.split("\t")[1:]) for line in data.splitlines()} <= {
+        ("eu", "a\\tb"),
+        ("us", "c"),
+    }
+
+
+def test_unique_foreign_keys_take_distinct_referenced_values():
+    context = make_context("id integer", "user_id integer UNIQUE")
+    foreign_key = ForeignKeyValues(["user_id"], [(str(i),) for i in range(5)])
+
+    data = "".join(
+        iter_copy_data(
+            context, DataGenerationSettings(rows=5), foreign_keys=[foreign_key]
+        )
+    )
+
+    assert sorted(line.split("\t")[1] for line in data.splitlines()) == [
+        "0",
+        "1",
+        "2",
+        "3",
+        "4",
+    ]
+    with pytest.raises(ValueError):
+        list(
+            iter_copy_data(
+                context, DataGenerationSettings(rows=6), foreign_keys=[foreign_key]
+            )
+        )
+
+
+def test_foreign_keys_without_referenced_rows():
+    foreign_key = ForeignKeyValues(["user_id"], [])
+
+    data = "".join(
+        iter_copy_data(
+            make_context("id integer", "user_id integer"),
+            DataGenerationSettings(rows=3),
+            foreign_keys=[foreign_key],
+        )
+    )
+    assert [line.split("\t")[1] for line in data.splitlines()] == [COPY_NULL] * 3
+
+    with pytest.raises(ValueError):
+        list(
+            iter_copy_data(
+                make_context("id integer", "user_id integer NOT NULL"),
+                DataGenerationSettings(rows=3),
+                foreign_keys=[foreign_key],
+            )
+        )
+
+
+def test_copy_data_reader_reads_across_chunks():
+    reader = CopyDataReader(iter(["1\ta\n", "2\tb\n", "3\tc\n"]))
+
+    assert reader.read(6) == b"1\ta\n2\t"
+    assert reader.read() == b"b\n3\tc\n"
+    assert reader.read(10) == b""
@@ -0,0 +1,34 @@
+import pytest
+
+from src.emm.engine.latency import percentile, summarize_latencies
+
+
+def test_percentile_nearest_rank():
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.95) == 95
+    assert percentile(values, 0.99) == 99
+    assert percentile(values, 1) == 100
+    assert percentile(values, 0) == 1
+    assert percentile([], 0.5) == 0
+
+
+def test_summarize_latencies():
+    latencies = [5.0, 1.0, 3.0, 2.0, 4.0] * 20
+
+    summary = summarize_latencies(latencies, duration=2)
+
+    assert summary.count == 100
+    assert summary.p50 == 3
+    assert summary.p95 == 5
+    assert summary.maximum == 5
+    assert summary.queries_per_second == pytest.approx(50)
+    assert summary.as_metrics()["latency_p99_ms"] == 5
+
+
+def test_summarize_no_latencies():
+    summary = summarize_latencies([], duration=0)
+
+    assert summary.count == 0
+    assert summary.queries_per_second == 0
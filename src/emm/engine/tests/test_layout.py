@@ -0,0 +1,107 @@
+import pytest
+
+from src.emm.engine.data import DDLTableColumn
+from src.emm.engine.layout import (
+    compute_padding,
+    estimate_tuple_width,
+    get_column_layout,
+    get_type_layout,
+    is_column_nullable,
+    layout_signature,
+    normalize_type_name,
+)
+
+
+@pytest.mark.parametrize(
+    "column_type,expected_type_name",
+    [
+        ("INTEGER", "int4"),
+        ("SERIAL", "int4"),
+        ("double precision", "float8"),
+        ("varchar(20)", "varchar"),
+        ("numeric(10, 2)", "numeric"),
+        ("timestamp(3) with time zone", "timestamptz"),
+        ("float(10)", "float4"),
+        ("int[]", "_int4"),
+    ],
+)
+def test_normalize_type_name(column_type: str, expected_type_name: str):
+    assert normalize_type_name(column_type) == expected_type_name
+
+
+@pytest.mark.parametrize(
+    "column_type,expected_layout",
+    [
+        ("bigint", (8, "d")),
+        ("smallint", (2, "s")),
+        ("boolean", (1, "c")),
+        ("uuid", (16, "c")),
+        ("text", (-1, "i")),
+        ("int[]", (-1, "i")),
+        ("my_custom_type", (-1, "i")),
+    ],
+)
+def test_get_type_layout(column_type: str, expected_layout: tuple[int, str]):
+    assert get_type_layout(column_type) == expected_layout
+
+
+@pytest.mark.parametrize(
+    "layouts,expected_padding",
+    [
+        ([(8, "d"), (4, "i"), (2, "s"), (1, "c")], 0),
+        ([(1, "c"), (8, "d")], 7),
+        ([(2, "s"), (4, "i"), (1, "c"), (8, "d")], 9),
+        # The varlena length is unknown: worst case for the next aligned column
+        ([(8, "d"), (-1, "i"), (4, "i")], 3),
+        ([(8, "d"), (4, "i"), (-1, "i")], 0),
+    ],
+)
+def test_compute_padding(layouts: list[tuple[int, str]], expected_padding: int):
+    assert compute_padding(layouts) == expected_padding
+
+
+def test_estimate_tuple_width():
+    columns = [
+        DDLTableColumn("flag", "boolean", "flag boolean"),
+        DDLTableColumn("id", "bigint", "id bigint PRIMARY KEY"),
+        DDLTableColumn("counter", "integer", "counter integer NOT NULL"),
+    ]
+
+    estimate = estimate_tuple_width(columns)
+
+    # 23 bytes of header plus 1 byte of null bitmap
+    assert estimate.header == 24
+    assert estimate.data == 13
+    # 7 bytes before id and 4 bytes to MAXALIGN the tuple
+    assert estimate.padding == 11
+    assert estimate.width == 48
+
+    estimate = estimate_tuple_width([columns[1], columns[2], columns[0]])
+    assert estimate.padding == 3
+
+
+def test_layout_signature():
+    first = DDLTableColumn("first", "integer", "first integer")
+    second = DDLTableColumn("second", "int4", "second int4")
+    flag = DDLTableColumn("flag", "boolean", "flag boolean")
+
+    assert layout_signature([first, second, flag]) == layout_signature(
+        [second, first, flag]
+    )
+    assert layout_signature([first, second, flag]) != layout_signature(
+        [first, flag, second]
+    )
+
+
+def test_get_column_layout_prefers_catalog():
+    column = DDLTableColumn(
+        "status",
+        "status_enum",
+        "status status_enum NOT NULL",
+        typlen=4,
+        typalign="i",
+        is_not_null=True,
+    )
+
+    assert get_column_layout(column) == (4, "i")
+    assert not is_column_nullable(column)
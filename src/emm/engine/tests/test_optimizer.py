@@ -0,0 +1,38 @@
+import itertools
+
+from src.emm.engine.layout import compute_padding, get_column_layout
+from src.emm.engine.optimizer import find_optimal_permutations
+from src.emm.engine.tests.helpers import make_columns
+
+
+def _padding(columns) -> int:
+    return compute_padding([get_column_layout(column) for column in columns])
+
+
+def test_find_optimal_permutations_matches_brute_force():
+    columns = make_columns(
+        "boolean", "bigint", "smallint", "text", "integer", "uuid", "timetz", "macaddr"
+    )
+
+    best_padding = min(
+        _padding(permutation) for permutation in itertools.permutations(columns)
+    )
+    results = find_optimal_permutations(columns, candidates=3)
+
+    assert len(results) == 3
+    assert _padding(results[0]) == best_padding
+    assert [_padding(result) for result in results] == sorted(
+        _padding(result) for result in results
+    )
+    # Varlena columns are kept at the end
+    assert all(result[-1].type == "text" for result in results)
+
+
+def test_find_optimal_permutations_skips_original_order():
+    columns = make_columns("integer", "smallint", "boolean")
+
+    results = find_optimal_permutations(columns, candidates=10)
+
+    assert tuple(columns) not in results
+    assert len(results) == 5
+    assert len(set(results)) == len(results)
@@ -1,6 +1,15 @@
 import pytest
 
-from src.emm.engine.parser import extract_create_statement
+from src.emm.engine.parser import (
+    extract_create_statement,
+    is_statement_create_table,
+    iter_create_table_statements,
+    iter_data_for_project,
+    iter_statements,
+    parse_project_ddl,
+    rewrite_insert_table_name,
+    split_statements,
+)
 
 
 @pytest.mark.parametrize(
@@ -34,3 +43,151 @@ def test_extract_create_statement(sql_str: str, raises_exception: bool):
 def test_extract_create_statement_fails_no_create_statement():
     with pytest.raises(ValueError):
         extract_create_statement("select * from table_name;")
+
+
+@pytest.mark.parametrize(
+    "sql_str,is_create_table",
+    [
+        ("CREATE TABLE t (id int);", True),
+        ("-- the main table\n/* really */ create unlogged table t (id int);", True),
+        ("CREATE TEMPORARY TABLE t (id int);", True),
+        ("CREATE INDEX t_idx ON t (id);", False),
+        ("INSERT INTO t VALUES ('CREATE TABLE');", False),
+        ("COMMENT ON TABLE t IS 'create table';", False),
+    ],
+)
+def test_is_statement_create_table(sql_str: str, is_create_table: bool):
+    statement = next(split_statements(sql_str))
+
+    assert is_statement_create_table(statement) is is_create_table
+
+
+def test_iter_create_table_statements_only_yields_create_tables():
+    ddl = "SET search_path = public;\n" + "\n".join(
+        f"CREATE TABLE t{index} (id int);\nCREATE INDEX i{index} ON t{index} (id);"
+        for index in range(3)
+    )
+
+    statements = list(iter_create_table_statements(ddl))
+
+    assert [str(statement).strip() for statement in statements] == [
+        f"CREATE TABLE t{index} (id int);" for index in range(3)
+    ]
+
+
+def test_split_statements_ignores_quoted_semicolons():
+    ddl = """
+    INSERT INTO t VALUES ('a;b', 'it''s;');
+    CREATE FUNCTION f() RETURNS int AS $body$ SELECT 1; $body$ LANGUAGE sql;
+    -- a comment; with a semicolon
+    SELECT ";" FROM t /* ; */;
+    SELECT 1
+    """
+
+    statements = [statement.strip() for statement in split_statements(ddl)]
+
+    assert len(statements) == 4
+    assert statements[1].endswith("LANGUAGE sql;")
+    assert statements[3] == "SELECT 1"
+
+
+def test_parse_project_ddl_every_table(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMM_CACHE_DIR", str(tmp_path))
+    ddl = """
+    CREATE TABLE users (
+        id integer,
+        name text
+    );
+    CREATE INDEX users_name ON users (name);
+    CREATE TABLE orders (
+        id bigint,
+        user_id integer,
+        amount integer
+    );
+    """
+
+    contexts = parse_project_ddl("project", ddl)
+
+    assert [context.table_name for context in contexts] == ["users", "orders"]
+    assert [column.name for column in contexts[1].columns] == [
+        "id",
+        "user_id",
+        "amount",
+    ]
+    # Nothing is left over from the previous table
+    assert [column.original_definition for column in contexts[1].columns] == [
+        "id bigint",
+        "user_id integer",
+        "amount integer",
+    ]
+
+
+def test_iter_data_for_project(tmp_path, monkeypatch):
+    data_file = tmp_path / "sql" / "projects" / "project" / "data.sql"
+    data_file.parent.mkdir(parents=True)
+    data_file.write_text(
+        """
+    INSERT INTO users (id, name) VALUES (1, 'a;b');
+    insert into Orders VALUES (1, 1, 10);
+    SELECT setval('users_id_seq', 2);
+    INSERT INTO users (id, name) VALUES (2, 'c');
+    """
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("src.emm.engine.parser.READ_CHUNK_SIZE", 7)
+
+    statements = list(iter_data_for_project("project"))
+
+    assert [table_name for table_name, _ in statements] == ["users", "orders", "users"]
+    assert "'a;b'" in statements[0][1]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 8, 1000])
+def test_iter_statements_does_not_depend_on_chunks(chunk_size: int):
+    script = (
+        "INSERT INTO t VALUES ('it''s; fine', \"a;\"); -- a comment; here\n"
+        "/* block; comment */ INSERT INTO t VALUES ($$x;y$$);"
+        "CREATE FUNCTION f() AS $body$ SELECT 1; $body$;\n"
+        "INSERT INTO t VALUES ('');"
+    )
+    chunks = [
+        script[start:][:chunk_size] for start in range(0, len(script), chunk_size)
+    ]
+
+    assert list(iter_statements(chunks)) == list(split_statements(script))
+    assert len(list(split_statements(script))) == 4
+
+
+def test_rewrite_insert_table_name():
+    statement = "\n-- users\nINSERT INTO users (name) VALUES ('INSERT INTO users');"
+
+    assert rewrite_insert_table_name(statement, "users_2a") == (
+        "\n-- users\nINSERT INTO users_2a (name) VALUES ('INSERT INTO users');"
+    )
+
+
+def test_parse_project_ddl_constraints_and_indexes(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMM_CACHE_DIR", str(tmp_path))
+    ddl = """
+    CREATE TABLE users (
+        id integer,
+        name text, -- (not a constraint)
+        amount integer CHECK (amount > 0),
+        PRIMARY KEY (id),
+        CONSTRAINT users_name_key UNIQUE (name),
+        CHECK (amount < 100 AND name <> ',')
+    );
+    CREATE INDEX users_amount ON users (amount);
+    ALTER TABLE ONLY public.users ADD CONSTRAINT users_id_check CHECK (id > 0);
+    """
+
+    [context] = parse_project_ddl("project", ddl)
+
+    assert [column.name for column in context.columns] == ["id", "name", "amount"]
+    assert context.constraints == [
+        "PRIMARY KEY (id)",
+        "CONSTRAINT users_name_key UNIQUE (name)",
+        "CHECK (amount < 100 AND name <> ',')",
+        "CONSTRAINT users_id_check CHECK (id > 0)",
+    ]
+    assert context.indexes == ["CREATE INDEX users_amount ON users (amount)"]
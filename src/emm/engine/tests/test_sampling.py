@@ -0,0 +1,50 @@
+import math
+
+import pytest
+
+from src.emm.engine.data import PermutationSampling
+from src.emm.engine.sampling import sample_permutations
+from src.emm.engine.tests.helpers import make_columns
+
+
+@pytest.mark.parametrize("sample_size", [1, 10, 200])
+def test_sample_permutations_random(sample_size: int):
+    columns = make_columns("bigint", "integer", "boolean", "text", "smallint")
+
+    permutations = list(
+        sample_permutations(columns, PermutationSampling.RANDOM, sample_size, seed=42)
+    )
+
+    assert len(permutations) == min(sample_size, math.factorial(len(columns)) - 1)
+    assert len(set(permutations)) == len(permutations)
+    assert tuple(columns) not in permutations
+
+
+def test_sample_permutations_latin_square():
+    columns = make_columns("bigint", "integer", "boolean", "text", "smallint")
+
+    permutations = list(
+        sample_permutations(columns, PermutationSampling.LATIN_SQUARE, seed=42)
+    )
+
+    assert tuple(columns) not in permutations
+    # A single square, minus the original order if it happened to be one of its rows
+    assert len(permutations) >= len(columns) - 1
+    for position in range(len(columns)):
+        assert len({permutation[position] for permutation in permutations}) >= (
+            len(columns) - 1
+        )
+
+
+def test_sample_permutations_distinct_layout():
+    columns = make_columns("integer", "int", "boolean", "text")
+
+    permutations = list(
+        sample_permutations(columns, PermutationSampling.DISTINCT_LAYOUT)
+    )
+
+    # 4! / 2! sequences of layouts, minus the original one
+    assert len(permutations) == 11
+    for permutation in permutations:
+        # Columns sharing the same layout keep their relative order
+        assert permutation.index(columns[0]) < permutation.index(columns[1])
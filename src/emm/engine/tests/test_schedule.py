@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from src.emm.engine.data import ReadOnlyWorkloadType, WriteWorkloadType
+from src.emm.engine.schedule import (
+    interleave_writes,
+    make_mixed_schedule,
+    poisson_arrivals,
+)
+
+READS = {
+    ReadOnlyWorkloadType.READ_AGGREGATION: "SELECT COUNT(*) FROM {}",
+    ReadOnlyWorkloadType.READ_PRIMARY_KEY_FILTER: "SELECT * FROM {} WHERE id = 1",
+}
+WRITES = {
+    WriteWorkloadType.WRITE_UPDATE_FIXED_WIDTH: ["update 1", "update 2"],
+    WriteWorkloadType.WRITE_DELETE: ["delete 1"],
+}
+
+
+def test_poisson_arrivals():
+    arrivals = poisson_arrivals(1000, 10, random.Random(1))
+
+    assert arrivals == sorted(arrivals)
+    assert 0 < arrivals[0] and arrivals[-1] < 10
+    assert len(arrivals) == pytest.approx(10_000, rel=0.05)
+
+
+def test_interleave_writes():
+    assert interleave_writes(WRITES) == [
+        (WriteWorkloadType.WRITE_UPDATE_FIXED_WIDTH, "update 1"),
+        (WriteWorkloadType.WRITE_DELETE, "delete 1"),
+        (WriteWorkloadType.WRITE_UPDATE_FIXED_WIDTH, "update 2"),
+    ]
+
+
+def test_make_mixed_schedule():
+    schedule = make_mixed_schedule(READS, WRITES, 0.8, 1000, 5, seed=1)
+
+    reads = [
+        operation
+        for operation in schedule
+        if operation.operation in {workload_type.value for workload_type in READS}
+    ]
+    writes = [operation.statement for operation in schedule if operation not in reads]
+    assert len(reads) / len(schedule) == pytest.approx(0.8, abs=0.02)
+    # Writes take turns and start over
+    assert writes[:4] == ["update 1", "delete 1", "update 2", "update 1"]
+    assert [operation.at for operation in schedule] == sorted(
+        operation.at for operation in schedule
+    )
+
+
+def test_make_mixed_schedule_is_reproducible():
+    def describe(schedule):
+        return [(operation.at, operation.statement) for operation in schedule]
+
+    assert describe(make_mixed_schedule(READS, WRITES, 0.5, 100, 1, seed=1)) == (
+        describe(make_mixed_schedule(READS, WRITES, 0.5, 100, 1, seed=1))
+    )
+
+
+def test_make_mixed_schedule_with_one_kind_of_operations():
+    only_reads = make_mixed_schedule(READS, {}, 0.5, 100, 1, seed=1)
+    only_writes = make_mixed_schedule({}, WRITES, 0.5, 100, 1, seed=1)
+
+    assert only_reads and all(
+        operation.statement in READS.values() for operation in only_reads
+    )
+    assert only_writes and all(
+        operation.operation.startswith("write") for operation in only_writes
+    )
+    assert make_mixed_schedule({}, {}, 0.5, 100, 1) == []
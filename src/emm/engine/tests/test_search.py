@@ -0,0 +1,26 @@
+import random
+
+from src.emm.engine.search import breed_generation, order_crossover
+
+
+def test_order_crossover_returns_a_permutation():
+    rng = random.Random(42)
+    for _ in range(100):
+        first_parent = rng.sample(range(8), 8)
+        second_parent = rng.sample(range(8), 8)
+
+        child = order_crossover(first_parent, second_parent, rng)
+
+        assert sorted(child) == list(range(8))
+
+
+def test_breed_generation_skips_excluded():
+    rng = random.Random(42)
+    ranked_population = [rng.sample(range(6), 6) for _ in range(4)]
+    excluded = {tuple(indices) for indices in ranked_population}
+
+    generation = breed_generation(ranked_population, 10, rng, excluded)
+
+    assert len(generation) == 10
+    assert len({tuple(child) for child in generation}) == 10
+    assert not excluded & {tuple(child) for child in generation}
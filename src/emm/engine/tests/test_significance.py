@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from src.emm.engine.significance import (
+    bootstrap_improvement_interval,
+    improvement_percentage,
+    is_significant,
+    remove_outliers,
+    simultaneous_improvement_intervals,
+)
+
+
+def test_remove_outliers():
+    assert remove_outliers([10.0, 11.0, 10.5, 9.5, 10.2, 50.0]) == [
+        10.0,
+        11.0,
+        10.5,
+        9.5,
+        10.2,
+    ]
+    # Too few values to tell
+    assert remove_outliers([10.0, 11.0, 50.0]) == [10.0, 11.0, 50.0]
+
+
+def test_improvement_percentage():
+    assert improvement_percentage(200, 150) == pytest.approx(25)
+    assert improvement_percentage(200, 250, higher_is_better=True) == pytest.approx(25)
+    assert improvement_percentage(200, 250) == pytest.approx(-25)
+    assert improvement_percentage(0, 10) == 0
+
+
+def test_bootstrap_improvement_interval_of_a_clear_improvement():
+    baseline = [10.0, 10.2, 9.8, 10.1, 9.9]
+    values = [8.0, 8.1, 7.9, 8.2, 7.8]
+
+    low, high = bootstrap_improvement_interval(baseline, values, seed=1)
+
+    assert 15 < low <= 20 <= high < 25
+    assert is_significant((low, high))
+
+
+def test_bootstrap_improvement_interval_of_noise():
+    baseline = [10.0, 12.0, 9.0, 11.0, 8.0]
+    values = [9.5, 11.5, 10.5, 8.5, 12.5]
+
+    interval = bootstrap_improvement_interval(baseline, values, seed=1)
+
+    assert interval[0] < 0 < interval[1]
+    assert not is_significant(interval)
+
+
+def test_bootstrap_improvement_interval_needs_repeated_trials():
+    assert bootstrap_improvement_interval([10.0], [8.0, 8.1]) is None
+    assert bootstrap_improvement_interval([10.0, 10.1], [8.0]) is None
+
+
+def test_best_of_candidates_from_the_same_distribution_is_not_significant():
+    rng = random.Random(24)
+    baseline = [rng.gauss(10, 1) for _ in range(10)]
+    values_by_candidate = {
+        candidate: [rng.gauss(10, 1) for _ in range(10)] for candidate in range(20)
+    }
+    best = min(values_by_candidate, key=lambda c: sum(values_by_candidate[c]))
+
+    intervals = simultaneous_improvement_intervals(
+        baseline, values_by_candidate, seed=1
+    )
+
+    assert set(intervals) == set(values_by_candidate)
+    assert not is_significant(intervals[best])
+    # Without the correction, the noise alone makes the best one look significant
+    assert is_significant(
+        bootstrap_improvement_interval(baseline, values_by_candidate[best], seed=1)
+    )
@@ -0,0 +1,135 @@
+import pytest
+
+from src.emm.engine.data import ReadOnlyWorkloadType, WriteWorkloadType
+from src.emm.engine.tests.helpers import make_context
+from src.emm.engine.workload import (
+    INSERT_BATCH_ROWS,
+    find_order_column,
+    find_primary_key_column,
+    find_range_column,
+    find_text_column,
+    find_update_column,
+    generate_ro_workload,
+    generate_rw_workload,
+    get_range_quantiles,
+)
+
+
+@pytest.fixture
+def context():
+    return make_context(
+        "name text",
+        "id bigint PRIMARY KEY",
+        "created timestamp",
+        "amount numeric",
+    )
+
+
+def test_columns_are_found_by_role(context):
+    assert find_primary_key_column(context).name == "id"
+    assert find_range_column(context).name == "id"
+    assert find_text_column(context).name == "name"
+    assert find_order_column(context).name == "created"
+
+
+def test_primary_key_constraint():
+    context = make_context("code text", "tenant integer", "amount integer")
+    context.add_constraint("CONSTRAINT pk PRIMARY KEY (code, tenant)")
+
+    assert find_primary_key_column(context).name == "code"
+    # Range filters need a number
+    assert find_range_column(context).name == "tenant"
+    assert find_order_column(context).name == "code"
+
+
+def test_generate_ro_workload(context):
+    workload = generate_ro_workload(context, [500, 10, 495, 505], "a")
+
+    assert set(workload) == set(ReadOnlyWorkloadType)
+    assert workload[ReadOnlyWorkloadType.READ_PRIMARY_KEY_FILTER] == (
+        "SELECT * FROM {} WHERE id = 500"
+    )
+    assert workload[ReadOnlyWorkloadType.READ_AGGREGATION_FILTER] == (
+        "SELECT COUNT(*) FROM {} WHERE id <= 10"
+    )
+    assert workload[ReadOnlyWorkloadType.READ_RANGE_FILTER] == (
+        "SELECT * FROM {} WHERE id BETWEEN 495 AND 505"
+    )
+    assert workload[ReadOnlyWorkloadType.READ_LIKE] == (
+        "SELECT name FROM {} WHERE name LIKE 'a%'"
+    )
+    assert workload[ReadOnlyWorkloadType.READ_ORDER_BY].format("t") == (
+        "SELECT * FROM t ORDER BY created DESC LIMIT 50"
+    )
+    assert "ORDER BY id" in workload[ReadOnlyWorkloadType.READ_PAGINATION]
+
+
+def test_like_prefix_is_escaped(context):
+    workload = generate_ro_workload(context, None, "{'_")
+
+    assert workload[ReadOnlyWorkloadType.READ_LIKE].format("t") == (
+        "SELECT name FROM t WHERE name LIKE '{''\\_%'"
+    )
+
+
+def test_workloads_without_columns_or_constants_are_left_out():
+    workload = generate_ro_workload(make_context("flag boolean"), None, None)
+
+    assert set(workload) == {
+        ReadOnlyWorkloadType.READ_ALL,
+        ReadOnlyWorkloadType.READ_AGGREGATION,
+    }
+
+
+def test_get_range_quantiles():
+    point, cutoff, low, high = get_range_quantiles(0.1)
+
+    assert point == 0.5
+    assert cutoff == 0.1
+    assert high - low == pytest.approx(0.1)
+    assert (low + high) / 2 == pytest.approx(0.5)
+
+
+def test_find_update_column(context):
+    assert find_update_column(context, varlena=False).name == "created"
+    assert find_update_column(context, varlena=True).name == "name"
+
+
+def test_generate_rw_workload(context):
+    workload = generate_rw_workload(context, [1, 2, 3, 4], 1000, 3, seed=1)
+
+    assert set(workload) == set(WriteWorkloadType)
+    inserts = workload[WriteWorkloadType.WRITE_INSERT_BATCH]
+    assert len(inserts) == 3
+    assert (
+        inserts[0]
+        .format("t")
+        .startswith("INSERT INTO t (name, id, created, amount) VALUES (")
+    )
+    assert inserts[0].endswith(" ON CONFLICT DO NOTHING")
+    assert inserts[0].count("), (") == INSERT_BATCH_ROWS - 1
+    # The keys of the inserted rows follow the existing ones
+    assert ", '1001', " in inserts[0]
+
+    updates = workload[WriteWorkloadType.WRITE_UPDATE_VARLENA]
+    assert [update.format("t").split(" WHERE ")[1] for update in updates] == [
+        "id = 1",
+        "id = 3",
+    ]
+    assert updates[0].startswith("UPDATE {} SET name = '")
+    assert workload[WriteWorkloadType.WRITE_DELETE] == [
+        "DELETE FROM {} WHERE id = 2",
+        "DELETE FROM {} WHERE id = 4",
+    ]
+
+
+def test_generate_rw_workload_is_reproducible(context):
+    assert generate_rw_workload(context, ["a", "b"], 0, 2, seed=1) == (
+        generate_rw_workload(context, ["a", "b"], 0, 2, seed=1)
+    )
+
+
+def test_rw_workload_without_primary_key_only_inserts():
+    workload = generate_rw_workload(make_context("flag boolean"), [1, 2], 0, 1)
+
+    assert set(workload) == {WriteWorkloadType.WRITE_INSERT_BATCH}
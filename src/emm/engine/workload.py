@@ -0,0 +1,281 @@
+import random
+import re
+from decimal import Decimal
+from itertools import islice
+from typing import Any
+
+from src.emm.engine.data import (
+    DataGenerationSettings,
+    DDLTableColumn,
+    DDLTableContext,
+    ReadOnlyWorkloadType,
+    WriteWorkloadType,
+)
+from src.emm.engine.generator import (
+    COPY_NULL,
+    get_generated_columns,
+    get_unique_column_names,
+    iter_copy_data,
+    make_values_generator,
+)
+from src.emm.engine.layout import get_column_layout, is_varlena, normalize_type_name
+
+# Share of the rows the filtered workloads read, by default
+DEFAULT_SELECTIVITY = 0.01
+
+# Rows returned by the ORDER BY and pagination workloads
+PAGE_SIZE = 50
+PAGINATION_OFFSET = 200
+
+# Rows inserted by every transaction of the insert workload
+INSERT_BATCH_ROWS = 100
+
+_inline_primary_key_re = re.compile(r"\bPRIMARY\s+KEY\b", re.I)
+_primary_key_constraint_re = re.compile(
+    r"PRIMARY\s+KEY\s*\(\s*(?P<first_column_name>\w+)", re.I
+)
+_numeric_types = {"int2", "int4", "int8", "numeric", "float4", "float8"}
+_text_types = {"text", "varchar", "bpchar", "name"}
+_temporal_types = {"date", "timestamp", "timestamptz"}
+
+
+def find_primary_key_column(context: DDLTableContext) -> DDLTableColumn | None:
+    """
+    The column declared PRIMARY KEY, or the first column of the PRIMARY KEY constraint, if any.
+    """
+    for column in context.columns:
+        if _inline_primary_key_re.search(column.original_definition):
+            return column
+    for constraint in context.constraints:
+        if match := _primary_key_constraint_re.search(constraint):
+            return _find_column(context, match.group("first_column_name"))
+    return None
+
+
+def find_range_column(context: DDLTableContext) -> DDLTableColumn | None:
+    """
+    The column the range filters are on: the primary key if it is a number, else the first numeric column.
+    """
+    primary_key_column = find_primary_key_column(context)
+    if primary_key_column is not None and _is_numeric(primary_key_column):
+        return primary_key_column
+    return next((column for column in context.columns if _is_numeric(column)), None)
+
+
+def find_text_column(context: DDLTableContext) -> DDLTableColumn | None:
+    """
+    The first text column of the table, for the LIKE workload.
+    """
+    return next(
+        (
+            column
+            for column in context.columns
+            if normalize_type_name(column.type) in _text_types
+        ),
+        None,
+    )
+
+
+def find_order_column(context: DDLTableContext) -> DDLTableColumn | None:
+    """
+    The column the ORDER BY workload sorts on: the first date or timestamp, else the primary key.
+    """
+    return next(
+        (
+            column
+            for column in context.columns
+            if normalize_type_name(column.type) in _temporal_types
+        ),
+        find_primary_key_column(context),
+    )
+
+
+def get_range_quantiles(selectivity: float) -> list[float]:
+    """
+    The quantiles of the range column the filtered workloads need, in the order generate_ro_workload
+    expects their values: the point lookup, the upper bound of the aggregation filter, and the bounds
+    of the range filter, centered on the median.
+    """
+    return [0.5, selectivity, 0.5 - selectivity / 2, 0.5 + selectivity / 2]
+
+
+def generate_ro_workload(
+    context: DDLTableContext,
+    range_values: list[int | float | Decimal] | None,
+    like_prefix: str | None,
+) -> dict[ReadOnlyWorkloadType, str]:
+    """
+    The read-only workload of the table, as query templates where {} stands for the table to query.
+    The columns come from the table definition. The constants come from its data: range_values are the
+    values of the range column at get_range_quantiles, so that the filters read the requested share of
+    the rows, and like_prefix is a prefix of the text column with the requested selectivity.
+    Workloads needing a column the table does not have, or missing constants, are left out.
+    """
+    workload = {
+        ReadOnlyWorkloadType.READ_ALL: "SELECT * FROM {}",
+        ReadOnlyWorkloadType.READ_AGGREGATION: "SELECT COUNT(*) FROM {}",
+    }
+
+    range_column = find_range_column(context)
+    if range_column is not None and range_values:
+        point, cutoff, low, high = (str(value) for value in range_values)
+        name = range_column.name
+        workload[
+            ReadOnlyWorkloadType.READ_PRIMARY_KEY_FILTER
+        ] = f"SELECT * FROM {{}} WHERE {name} = {point}"
+        workload[
+            ReadOnlyWorkloadType.READ_AGGREGATION_FILTER
+        ] = f"SELECT COUNT(*) FROM {{}} WHERE {name} <= {cutoff}"
+        workload[
+            ReadOnlyWorkloadType.READ_RANGE_FILTER
+        ] = f"SELECT * FROM {{}} WHERE {name} BETWEEN {low} AND {high}"
+
+    text_column = find_text_column(context)
+    if text_column is not None and like_prefix is not None:
+        pattern = _quote_literal(_escape_like(like_prefix) + "%")
+        workload[
+            ReadOnlyWorkloadType.READ_LIKE
+        ] = f"SELECT {text_column.name} FROM {{}} WHERE {text_column.name} LIKE {pattern}"
+
+    order_column = find_order_column(context)
+    if order_column is not None:
+        workload[
+            ReadOnlyWorkloadType.READ_ORDER_BY
+        ] = f"SELECT * FROM {{}} ORDER BY {order_column.name} DESC LIMIT {PAGE_SIZE}"
+
+    # Without an order, the page depends on the physical order of the rows, which differs between layouts
+    primary_key_column = find_primary_key_column(context)
+    if primary_key_column is not None:
+        workload[ReadOnlyWorkloadType.READ_PAGINATION] = (
+            f"SELECT * FROM {{}} ORDER BY {primary_key_column.name} "
+            f"LIMIT {PAGE_SIZE} OFFSET {PAGINATION_OFFSET}"
+        )
+
+    return workload
+
+
+def find_update_column(
+    context: DDLTableContext, varlena: bool
+) -> DDLTableColumn | None:
+    """
+    The first column the update workload sets, either a fixed width or a varlena one, since their updates
+    cost differently: one not part of a key, not filled by the database, and of a type values can be
+    generated for.
+    """
+    unique_column_names = get_unique_column_names(context)
+    settings = DataGenerationSettings(rows=0)
+    for column in get_generated_columns(context):
+        if column.name in unique_column_names:
+            continue
+        if is_varlena(get_column_layout(column)) != varlena:
+            continue
+        if make_values_generator(column, False, settings) is not None:
+            return column
+    return None
+
+
+def generate_rw_workload(
+    context: DDLTableContext,
+    keys: list[Any],
+    first_row: int,
+    transactions: int,
+    seed: int | None = None,
+) -> dict[WriteWorkloadType, list[str]]:
+    """
+    The read-write workload of the table, as lists of transactions of one statement each, where {} stands
+    for the table to write to. Every table gets the very same transactions, in the order of the types.
+    The inserted rows are generated (see iter_copy_data), numbered from first_row on, so that their unique
+    values do not collide with the existing rows; the conflicts left are skipped.
+    keys are values of the primary key of existing rows: every other one is updated, the others are deleted.
+    Workloads needing a column the table does not have, or keys, are left out.
+    """
+    rng = random.Random(seed)
+    settings = DataGenerationSettings(rows=transactions * INSERT_BATCH_ROWS, seed=seed)
+    workload: dict[WriteWorkloadType, list[str]] = {}
+
+    if columns := get_generated_columns(context):
+        column_names = ", ".join(column.name for column in columns)
+        rows = (
+            "("
+            + ", ".join(_copy_value_to_literal(value) for value in line.split("\t"))
+            + ")"
+            for chunk in iter_copy_data(context, settings, first_row)
+            for line in chunk.splitlines()
+        )
+        inserts = []
+        while batch := list(islice(rows, INSERT_BATCH_ROWS)):
+            inserts.append(
+                f"INSERT INTO {{}} ({column_names}) VALUES {', '.join(batch)} ON CONFLICT DO NOTHING"
+            )
+        workload[WriteWorkloadType.WRITE_INSERT_BATCH] = inserts
+
+    primary_key_column = find_primary_key_column(context)
+    if primary_key_column is None or not keys:
+        return workload
+
+    key_name = primary_key_column.name
+    updated_keys, deleted_keys = keys[::2], keys[1::2]
+    for workload_type, column in (
+        (
+            WriteWorkloadType.WRITE_UPDATE_FIXED_WIDTH,
+            find_update_column(context, False),
+        ),
+        (WriteWorkloadType.WRITE_UPDATE_VARLENA, find_update_column(context, True)),
+    ):
+        if column is None:
+            continue
+        generator = make_values_generator(column, False, settings)
+        values = generator(rng, 0, len(updated_keys))
+        workload[workload_type] = [
+            f"UPDATE {{}} SET {column.name} = {_copy_value_to_literal(value)} "
+            f"WHERE {key_name} = {_to_literal(key)}"
+            for key, value in zip(updated_keys, values)
+        ]
+
+    workload[WriteWorkloadType.WRITE_DELETE] = [
+        f"DELETE FROM {{}} WHERE {key_name} = {_to_literal(key)}"
+        for key in deleted_keys
+    ]
+    return workload
+
+
+def _find_column(context: DDLTableContext, column_name: str) -> DDLTableColumn | None:
+    return next(
+        (
+            column
+            for column in context.columns
+            if column.name.lower() == column_name.lower()
+        ),
+        None,
+    )
+
+
+def _is_numeric(column: DDLTableColumn) -> bool:
+    return normalize_type_name(column.type) in _numeric_types
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _quote_literal(value: str) -> str:
+    """
+    A SQL string literal, with the braces doubled since the query is a template for str.format.
+    """
+    quoted = "'" + value.replace("'", "''") + "'"
+    return quoted.replace("{", "{{").replace("}", "}}")
+
+
+def _to_literal(value: Any) -> str:
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return str(value)
+    return _quote_literal(str(value))
+
+
+def _copy_value_to_literal(value: str) -> str:
+    """
+    The SQL literal of a value in the COPY text format, where backslashes are escaped.
+    """
+    if value == COPY_NULL:
+        return "NULL"
+    return _quote_literal(value.replace("\\\\", "\\"))
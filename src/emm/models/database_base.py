@@ -1,5 +1,7 @@
 import logging
 from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, TypeVar
 
 from sqlalchemy import MetaData, create_engine
 from sqlalchemy.orm import (
@@ -14,6 +16,12 @@ from src.emm.config.config import Config, config
 
 log = logging.getLogger(__name__)
 
+# Connections kept open in the pool. Workers running in parallel hold one each,
+# more are opened on demand, and closed once released.
+DB_POOL_SIZE = 32
+
+R = TypeVar("R")
+
 
 def _build_db_url(config: Config) -> str:
     conn_str: str = (
@@ -24,7 +32,13 @@ def _build_db_url(config: Config) -> str:
     return conn_str
 
 
-engine = create_engine(url=_build_db_url(config=config), future=True, query_cache_size=0)
+engine = create_engine(
+    url=_build_db_url(config=config),
+    future=True,
+    query_cache_size=0,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=-1,
+)
 metadata = MetaData()
 mapper_registry = registry()
 session_factory = sessionmaker(bind=engine, future=True)
@@ -61,3 +75,30 @@ def context_session():
         raise e
     finally:
         session.commit()
+
+
+@contextmanager
+def autocommit_connection():
+    """
+    Yield a connection of its own, outside of any transaction, for the statements that cannot run
+    in one, like VACUUM. It is safe to use from a worker thread.
+    """
+    with engine.connect() as connection:
+        yield connection.execution_options(isolation_level="AUTOCOMMIT")
+
+
+def in_worker_session(function: Callable[..., R]) -> Callable[..., R]:
+    """
+    Make the function safe to run in a worker thread. The session is scoped to the thread,
+    so each worker gets its own session and pooled connection: they are released once done.
+    ORM objects loaded by another thread must not be passed to the function, only plain values.
+    """
+
+    @wraps(function)
+    def wrapper(*args, **kwargs) -> R:
+        try:
+            return function(*args, **kwargs)
+        finally:
+            Session.remove()
+
+    return wrapper
@@ -51,6 +51,10 @@ class AnalysisReport(SQLBase):
     improvement_percentage_over_baseline: Mapped[Decimal]
     original_metric_value: Mapped[float]
     permutation_metric_value: Mapped[float]
+    # Confidence interval of the improvement, when measured over repeated trials
+    confidence_interval_low: Mapped[Decimal | None] = mapped_column(default=None)
+    confidence_interval_high: Mapped[Decimal | None] = mapped_column(default=None)
+    is_significant: Mapped[bool | None] = mapped_column(default=None)
     created: Mapped[datetime] = mapped_column(
         insert_default=datetime.now(), default=None
     )
@@ -12,6 +12,7 @@ class Schema(SQLBase):
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     name: Mapped[str]
+    # The first table of the project, the others are found in its DDL
     original_table_name: Mapped[str]
     # Define the relationship with cascade delete
     permutations: Mapped[list["Permutation"]] = relationship(
@@ -34,10 +35,36 @@ class Permutation(SQLBase):
     is_populated: Mapped[bool]
     is_permutation: Mapped[bool]
     permutation_code: Mapped[str]
+    # The table of the project this one is a permutation of
+    original_table_name: Mapped[str]
     schema_id: Mapped[int] = mapped_column(
         ForeignKey("public.emm_project.id", ondelete="CASCADE")
     )
     schema: Mapped[Schema] = relationship(Schema, back_populates="permutations")
+    # Other column orders resulting in the very same on-disk layout
+    equivalences: Mapped[list["PermutationEquivalence"]] = relationship(
+        "PermutationEquivalence",
+        back_populates="permutation",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        default_factory=list,
+    )
+    # UNLOGGED tables write no WAL, see populate --unlogged
+    is_logged: Mapped[bool] = mapped_column(default=True)
     created: Mapped[datetime] = mapped_column(
         insert_default=datetime.now(), default=None
     )
+
+
+class PermutationEquivalence(SQLBase):
+    __tablename__ = "emm_permutation_equivalence"
+    __table_args__ = {"schema": "public"}
+
+    id: Mapped[int] = mapped_column(init=False, primary_key=True)
+    permutation_code: Mapped[str]
+    permutation_id: Mapped[int] = mapped_column(
+        ForeignKey("public.emm_permutation.id", ondelete="CASCADE")
+    )
+    permutation: Mapped[Permutation] = relationship(
+        Permutation, back_populates="equivalences", default=None
+    )
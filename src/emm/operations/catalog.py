@@ -0,0 +1,292 @@
+import logging
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from src.emm.engine.data import DDLTableColumn, DDLTableContext, ForeignKeyValues
+from src.emm.engine.ddl import make_column_definition
+from src.emm.models.database_base import context_session
+
+log = logging.getLogger(__name__)
+
+QUERY_FOR_TABLE_COLUMNS = """
+SELECT quote_ident(a.attname) AS column_name
+     , format_type(a.atttypid, a.atttypmod) AS column_type
+     , t.typlen
+     , t.typalign
+     , a.attnotnull
+     , a.attidentity
+     , a.attgenerated
+     , pg_get_expr(d.adbin, d.adrelid) AS column_default
+  FROM pg_attribute a
+  JOIN pg_class c ON c.oid = a.attrelid
+  JOIN pg_namespace n ON n.oid = c.relnamespace
+  JOIN pg_type t ON t.oid = a.atttypid
+  LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+ WHERE n.nspname = :namespace
+   AND c.relname = :table_name
+   AND a.attnum > 0
+   AND NOT a.attisdropped
+ ORDER BY a.attnum
+"""
+
+
+# Table constraints, NOT NULL ones excluded since they are part of the column definitions
+QUERY_FOR_TABLE_CONSTRAINTS = """
+SELECT quote_ident(con.conname) AS constraint_name
+     , pg_get_constraintdef(con.oid) AS constraint_definition
+     , con.contype AS constraint_type
+  FROM pg_constraint con
+  JOIN pg_class c ON c.oid = con.conrelid
+  JOIN pg_namespace n ON n.oid = c.relnamespace
+ WHERE n.nspname = :namespace
+   AND c.relname = :table_name
+   AND con.contype IN ('p', 'u', 'c', 'x', 'f')
+ ORDER BY con.contype, con.conname
+"""
+
+# Indexes not created by a PRIMARY KEY, UNIQUE or EXCLUDE constraint of the table
+QUERY_FOR_TABLE_INDEXES = """
+SELECT pg_get_indexdef(i.indexrelid) AS index_definition
+     , quote_ident(ic.relname) AS index_name
+  FROM pg_index i
+  JOIN pg_class ic ON ic.oid = i.indexrelid
+  JOIN pg_class c ON c.oid = i.indrelid
+  JOIN pg_namespace n ON n.oid = c.relnamespace
+ WHERE n.nspname = :namespace
+   AND c.relname = :table_name
+   AND NOT EXISTS (
+       SELECT 1
+         FROM pg_constraint con
+        WHERE con.conrelid = i.indrelid
+          AND con.conindid = i.indexrelid
+          AND con.contype IN ('p', 'u', 'x')
+   )
+ ORDER BY i.indexrelid
+"""
+
+# Whether a foreign key references the table, or is defined on it
+QUERY_FOR_TABLE_HAS_FOREIGN_KEYS = """
+SELECT EXISTS (
+       SELECT 1
+         FROM pg_constraint con
+         JOIN pg_class c ON c.oid = con.conrelid OR c.oid = con.confrelid
+         JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = :namespace
+          AND c.relname = :table_name
+          AND con.contype = 'f'
+)
+"""
+
+# Whether a foreign key of another table references the table
+QUERY_FOR_TABLE_IS_REFERENCED = """
+SELECT EXISTS (
+       SELECT 1
+         FROM pg_constraint con
+         JOIN pg_class c ON c.oid = con.confrelid
+         JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = :namespace
+          AND c.relname = :table_name
+          AND con.contype = 'f'
+          AND con.conrelid <> con.confrelid
+)
+"""
+
+# (table, referenced table) pairs of the foreign keys between the tables of the namespace
+QUERY_FOR_FOREIGN_KEY_REFERENCES = """
+SELECT c.relname AS table_name
+     , rc.relname AS referenced_table_name
+  FROM pg_constraint con
+  JOIN pg_class c ON c.oid = con.conrelid
+  JOIN pg_class rc ON rc.oid = con.confrelid
+  JOIN pg_namespace n ON n.oid = c.relnamespace
+ WHERE n.nspname = :namespace
+   AND rc.relnamespace = c.relnamespace
+   AND con.contype = 'f'
+"""
+
+# Foreign keys defined on the table: their columns, and the table and columns they reference, in key order
+QUERY_FOR_TABLE_FOREIGN_KEYS = """
+SELECT ARRAY(
+           SELECT quote_ident(a.attname)
+             FROM unnest(con.conkey) WITH ORDINALITY AS k (attnum, position)
+             JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+            ORDER BY k.position
+       ) AS column_names
+     , quote_ident(rn.nspname) || '.' || quote_ident(rc.relname) AS referenced_table_name
+     , ARRAY(
+           SELECT quote_ident(a.attname)
+             FROM unnest(con.confkey) WITH ORDINALITY AS k (attnum, position)
+             JOIN pg_attribute a ON a.attrelid = con.confrelid AND a.attnum = k.attnum
+            ORDER BY k.position
+       ) AS referenced_column_names
+  FROM pg_constraint con
+  JOIN pg_class c ON c.oid = con.conrelid
+  JOIN pg_namespace n ON n.oid = c.relnamespace
+  JOIN pg_class rc ON rc.oid = con.confrelid
+  JOIN pg_namespace rn ON rn.oid = rc.relnamespace
+ WHERE n.nspname = :namespace
+   AND c.relname = :table_name
+   AND con.contype = 'f'
+ ORDER BY con.conname
+"""
+
+
+def load_context_from_catalog(
+    project_name: str, namespace: str, table_name: str
+) -> DDLTableContext:
+    """
+    Builds the DDLTableContext of an existing table straight from pg_attribute and pg_type,
+    with the exact typlen, typalign, NOT NULL, default, identity and generation expression of every column,
+    then its constraints and indexes from pg_constraint and pg_index.
+    The context has no columns if the table does not exist.
+    """
+    context = DDLTableContext(project_name=project_name)
+    context.table_name = table_name
+
+    with context_session() as session:
+        for row in session.execute(
+            text(QUERY_FOR_TABLE_COLUMNS),
+            {"namespace": namespace, "table_name": table_name},
+        ):
+            log.debug(f"Found column {row.column_name} of type {row.column_type}")
+            context.add_column(
+                DDLTableColumn(
+                    name=row.column_name,
+                    column_type=row.column_type,
+                    original_definition=make_column_definition(
+                        row.column_name,
+                        row.column_type,
+                        row.attnotnull,
+                        row.column_default,
+                        row.attidentity,
+                        row.attgenerated,
+                    ),
+                    typlen=row.typlen,
+                    typalign=row.typalign,
+                    is_not_null=row.attnotnull,
+                    default=None if row.attgenerated else row.column_default,
+                )
+            )
+
+        for row in session.execute(
+            text(QUERY_FOR_TABLE_CONSTRAINTS),
+            {"namespace": namespace, "table_name": table_name},
+        ):
+            context.add_constraint(
+                f"CONSTRAINT {row.constraint_name} {row.constraint_definition}"
+            )
+
+        for row in session.execute(
+            text(QUERY_FOR_TABLE_INDEXES),
+            {"namespace": namespace, "table_name": table_name},
+        ):
+            context.add_index(row.index_definition)
+
+    return context
+
+
+def has_foreign_keys(session: Session, namespace: str, table_name: str) -> bool:
+    """
+    Check if the table references another table, or is referenced by one.
+    It runs in the given session, so that it can be part of a larger transaction.
+    """
+    return session.execute(
+        text(QUERY_FOR_TABLE_HAS_FOREIGN_KEYS),
+        {"namespace": namespace, "table_name": table_name},
+    ).scalar()
+
+
+def is_referenced_by_foreign_key(
+    session: Session, namespace: str, table_name: str
+) -> bool:
+    """
+    Check if a foreign key of another table references the table.
+    It runs in the given session, so that it can be part of a larger transaction.
+    """
+    return session.execute(
+        text(QUERY_FOR_TABLE_IS_REFERENCED),
+        {"namespace": namespace, "table_name": table_name},
+    ).scalar()
+
+
+def load_foreign_key_references(namespace: str) -> list[tuple[str, str]]:
+    """
+    The (table, referenced table) pairs of the foreign keys between the tables of the namespace.
+    """
+    with context_session() as session:
+        return [
+            (row.table_name, row.referenced_table_name)
+            for row in session.execute(
+                text(QUERY_FOR_FOREIGN_KEY_REFERENCES), {"namespace": namespace}
+            )
+        ]
+
+
+def load_foreign_key_values(
+    session: Session,
+    namespace: str,
+    table_name: str,
+    limit: Callable[[ForeignKeyValues], int],
+) -> list[ForeignKeyValues]:
+    """
+    The foreign keys defined on the table, each with up to limit(foreign_key) rows of the key it references,
+    as text and in key order.
+    It runs in the given session, so that it can be part of a larger transaction.
+    """
+    foreign_keys = []
+    for row in session.execute(
+        text(QUERY_FOR_TABLE_FOREIGN_KEYS),
+        {"namespace": namespace, "table_name": table_name},
+    ):
+        foreign_key = ForeignKeyValues(list(row.column_names), [])
+        referenced_columns = ", ".join(row.referenced_column_names)
+        casts = ", ".join(
+            f"CAST({column_name} AS text)"
+            for column_name in row.referenced_column_names
+        )
+        not_nulls = " AND ".join(
+            f"{column_name} IS NOT NULL" for column_name in row.referenced_column_names
+        )
+        foreign_key.rows = [
+            tuple(values)
+            for values in session.execute(
+                text(
+                    f"SELECT {casts} FROM {row.referenced_table_name} WHERE {not_nulls} "
+                    f"ORDER BY {referenced_columns} LIMIT :limit"
+                ),
+                {"limit": limit(foreign_key)},
+            )
+        ]
+        foreign_keys.append(foreign_key)
+    return foreign_keys
+
+
+def load_index_statements(
+    session: Session, namespace: str, table_name: str, with_constraints: bool
+) -> tuple[list[str], list[str]]:
+    """
+    The statements dropping the indexes of the table, and the ones creating them again.
+    With with_constraints, the PRIMARY KEY, UNIQUE and EXCLUDE constraints, backed by an index, are included.
+    It runs in the given session, so that it can be part of a larger transaction.
+    """
+    drop_statements, create_statements = [], []
+    parameters = {"namespace": namespace, "table_name": table_name}
+
+    if with_constraints:
+        for row in session.execute(text(QUERY_FOR_TABLE_CONSTRAINTS), parameters):
+            if row.constraint_type not in ("p", "u", "x"):
+                continue
+            drop_statements.append(
+                f"ALTER TABLE {table_name} DROP CONSTRAINT {row.constraint_name}"
+            )
+            create_statements.append(
+                f"ALTER TABLE {table_name} ADD CONSTRAINT {row.constraint_name} {row.constraint_definition}"
+            )
+
+    for row in session.execute(text(QUERY_FOR_TABLE_INDEXES), parameters):
+        drop_statements.append(f"DROP INDEX {row.index_name}")
+        create_statements.append(row.index_definition)
+
+    return drop_statements, create_statements
@@ -2,4 +2,45 @@ ROW_ESTIMATE_METRIC_NAME = "row_estimate"
 METRICS_RAW_SIZES_ALL = ["total_bytes", "index_bytes", "toast_bytes", "table_bytes"]
 METRICS_RAW_ALL = [ROW_ESTIMATE_METRIC_NAME] + METRICS_RAW_SIZES_ALL
 
-PG_STAT_STATEMENTS = "CREATE EXTENSION IF NOT EXISTS pg_stat_statements"
\ No newline at end of file
+PG_STAT_STATEMENTS = "CREATE EXTENSION IF NOT EXISTS pg_stat_statements"
+
+# How many permutations are generated and created at once
+PERMUTATIONS_CHUNK_SIZE = 100
+
+# Code of the permutation representing the original table
+BASELINE_PERMUTATION_CODE = "-1"
+
+# Size of the reads and writes of a COPY stream
+COPY_BUFFER_SIZE = 1024 * 1024
+# Characters of INSERT statements of the data file sent to the server at once
+DATA_BATCH_SIZE = 8 * 1024 * 1024
+# Referenced rows, at most, the generated values of a foreign key are drawn from
+FOREIGN_KEY_VALUES_LIMIT = 100_000
+
+# Parallel workers and memory of every index build after an unlogged load
+INDEX_BUILD_WORKERS = 4
+INDEX_BUILD_MEMORY = "256MB"
+
+# How many times every query of the read-only workload runs on every table, in every trial,
+# after running the warmup iterations, which are not measured
+RO_WORKLOAD_ITERATIONS = 50
+DEFAULT_WARMUP_ITERATIONS = 5
+# Independent trials of the read-only workload, to tell the differences from the noise
+DEFAULT_TRIALS = 5
+
+# Concurrent clients of the load benchmark, and how long they run against every table, in seconds
+DEFAULT_LOAD_CLIENTS = 64
+DEFAULT_LOAD_DURATION = 10.0
+THROUGHPUT_METRIC_NAME = "queries_per_second"
+
+# Transactions of every type of the read-write workload run on every table
+RW_WORKLOAD_TRANSACTIONS = 200
+# Seconds for the statistics of the writes to reach pg_stat_user_tables
+STATS_FLUSH_DELAY = 2.0
+BLOAT_GROWTH_METRIC_NAME = "bloat_growth_bytes"
+HOT_UPDATE_METRIC_NAME = "hot_update_percentage"
+
+# Share of reads, and operations per second, of the mixed workload
+DEFAULT_MIX_READ_RATIO = 0.8
+DEFAULT_MIX_RATE = 200.0
+ACHIEVED_RATE_METRIC_NAME = "achieved_rate_per_second"
@@ -0,0 +1,158 @@
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import DBAPIError
+
+from src.emm.engine.data import LatencySummary, OpenLoopResult, ScheduledOperation
+from src.emm.engine.latency import summarize_latencies
+from src.emm.models.database_base import autocommit_connection
+
+log = logging.getLogger(__name__)
+
+
+def _run_client(
+    queries: list[str], start: threading.Barrier, duration: float, first_query: int
+) -> list[float]:
+    """
+    Run the queries one after the other, in a loop, on a connection of its own, for duration seconds,
+    and return the latency of every query, in ms, as seen by the client.
+    The clients wait for each other to be connected, so that they all run at the same time.
+    """
+    latencies: list[float] = []
+    try:
+        with autocommit_connection() as connection:
+            # The queries are sent as they are, with no bind parameters to interpret
+            cursor = connection.connection.cursor()
+            start.wait()
+
+            deadline = time.perf_counter() + duration
+            index = first_query
+            while (started := time.perf_counter()) < deadline:
+                cursor.execute(queries[index % len(queries)])
+                cursor.fetchall()
+                latencies.append((time.perf_counter() - started) * 1000)
+                index += 1
+    except Exception:
+        log.exception("A client of the load failed")
+        # Do not leave the other clients waiting
+        start.abort()
+        raise
+    return latencies
+
+
+def run_concurrent_load(
+    queries: list[str], clients: int, duration: float
+) -> LatencySummary:
+    """
+    Drive clients concurrent clients, each with its own connection, running the queries in a loop
+    for duration seconds, and summarize the latencies of all their queries.
+    Every client starts from a different query, so that the queries run concurrently with each other.
+    """
+    start = threading.Barrier(clients)
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        futures = [
+            executor.submit(_run_client, queries, start, duration, client)
+            for client in range(clients)
+        ]
+        latencies = [latency for future in futures for latency in future.result()]
+
+    summary = summarize_latencies(latencies, duration)
+    log.debug(f"{summary.count} queries by {clients} clients, p99 {summary.p99:.2f} ms")
+    return summary
+
+
+def run_transactions(statements: list[str]) -> list[float]:
+    """
+    Run the statements one after the other on a connection of its own, each one in a transaction
+    of its own, and return the latency of every one, in ms, as seen by the client.
+    """
+    latencies: list[float] = []
+    with autocommit_connection() as connection:
+        # The statements are sent as they are, with no bind parameters to interpret
+        connection = connection.execution_options(no_parameters=True)
+        for statement in statements:
+            started = time.perf_counter()
+            connection.exec_driver_sql(statement)
+            latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def _serve_operations(
+    operations: queue.Queue, ready: threading.Barrier
+) -> tuple[dict[str, list[float]], int]:
+    """
+    Run the operations of the queue as they come, on a connection of its own, until it gets None.
+    Return the latencies of the operations, in ms, by operation, and how many failed.
+    """
+    latencies: dict[str, list[float]] = defaultdict(list)
+    failures = 0
+    try:
+        with autocommit_connection() as connection:
+            # The statements are sent as they are, with no bind parameters to interpret
+            connection = connection.execution_options(no_parameters=True)
+            ready.wait()
+
+            while (item := operations.get()) is not None:
+                scheduled, operation, statement = item
+                try:
+                    connection.exec_driver_sql(statement)
+                except DBAPIError:
+                    failures += 1
+                    continue
+                # From the scheduled time: the wait for a free client is part of the latency
+                latencies[operation].append((time.perf_counter() - scheduled) * 1000)
+    except Exception:
+        log.exception("A client of the load failed")
+        # Do not leave the scheduler waiting
+        ready.abort()
+        raise
+    return latencies, failures
+
+
+def run_open_loop(schedule: list[ScheduledOperation], clients: int) -> OpenLoopResult:
+    """
+    Issue the operations at their scheduled time, whether the previous ones completed or not, to a pool
+    of clients concurrent clients, each with its own connection.
+    Latencies are measured from the scheduled time, not from the time the operation is sent, so that
+    the queueing delays are not hidden when the clients cannot keep up (coordinated omission).
+    """
+    operations: queue.Queue = queue.Queue()
+    ready = threading.Barrier(clients + 1)
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        futures = [
+            executor.submit(_serve_operations, operations, ready)
+            for _ in range(clients)
+        ]
+        try:
+            ready.wait()
+            started = time.perf_counter()
+            for scheduled_operation in schedule:
+                scheduled = started + scheduled_operation.at
+                if (delay := scheduled - time.perf_counter()) > 0:
+                    time.sleep(delay)
+                operations.put(
+                    (
+                        scheduled,
+                        scheduled_operation.operation,
+                        scheduled_operation.statement,
+                    )
+                )
+        finally:
+            for _ in range(clients):
+                operations.put(None)
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+
+    latencies_by_operation: dict[str, list[float]] = defaultdict(list)
+    for client_latencies, _ in results:
+        for operation, latencies in client_latencies.items():
+            latencies_by_operation[operation].extend(latencies)
+    failures = sum(client_failures for _, client_failures in results)
+    if failures:
+        log.warning(f"{failures} operations of {len(schedule)} failed")
+
+    return OpenLoopResult(dict(latencies_by_operation), elapsed, failures)
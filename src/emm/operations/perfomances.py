@@ -1,23 +1,66 @@
 import logging
+import math
+import time
 from collections import defaultdict
 from decimal import Decimal
+from statistics import fmean
 
 from sqlalchemy import select, text
-
-from src.emm.engine.data import BenchmarkRequest, ReadOnlyWorkloadType
-from src.emm.models.database_base import context_session
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from src.emm.engine.data import (
+    BenchmarkRequest,
+    DDLTableContext,
+    ReadOnlyWorkloadType,
+    ScheduledOperation,
+    WriteWorkloadType,
+)
+from src.emm.engine.latency import summarize_latencies
+from src.emm.engine.schedule import make_mixed_schedule
+from src.emm.engine.significance import (
+    improvement_percentage,
+    is_significant,
+    remove_outliers,
+    simultaneous_improvement_intervals,
+)
+from src.emm.engine.workload import (
+    DEFAULT_SELECTIVITY,
+    find_primary_key_column,
+    find_range_column,
+    find_text_column,
+    generate_ro_workload,
+    generate_rw_workload,
+    get_range_quantiles,
+)
+from src.emm.models.database_base import autocommit_connection, context_session
 from src.emm.models.performance import (
     Analysis,
     AnalysisReport,
     EmmAnalysisType,
     RawPerformanceRecord,
 )
-from src.emm.models.schema import Schema
+from src.emm.models.schema import Permutation, Schema
 from src.emm.operations.constants import (
+    ACHIEVED_RATE_METRIC_NAME,
+    BLOAT_GROWTH_METRIC_NAME,
+    DEFAULT_LOAD_CLIENTS,
+    DEFAULT_LOAD_DURATION,
+    DEFAULT_MIX_RATE,
+    DEFAULT_MIX_READ_RATIO,
+    DEFAULT_TRIALS,
+    DEFAULT_WARMUP_ITERATIONS,
+    HOT_UPDATE_METRIC_NAME,
     METRICS_RAW_ALL,
     PG_STAT_STATEMENTS,
+    RO_WORKLOAD_ITERATIONS,
     ROW_ESTIMATE_METRIC_NAME,
+    RW_WORKLOAD_TRANSACTIONS,
+    STATS_FLUSH_DELAY,
+    THROUGHPUT_METRIC_NAME,
 )
+from src.emm.operations.load import run_concurrent_load, run_open_loop, run_transactions
+from src.emm.operations.permutations import load_contexts_for_project
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +88,59 @@ FROM (
 ) a ORDER BY total_bytes DESC;
 """
 
+# Values of a column at the given quantiles (a float8[] parameter)
+QUERY_FOR_RANGE_VALUES = """
+SELECT percentile_disc(CAST(:quantiles AS float8[])) WITHIN GROUP (ORDER BY {column_name})
+  FROM {table_name}
+"""
+
+# The first character of the values of a text column matching the closest to the selectivity share of the rows
+QUERY_FOR_LIKE_PREFIX = """
+SELECT left({column_name}, 1) AS prefix
+  FROM {table_name}
+ WHERE {column_name} <> ''
+ GROUP BY 1
+ ORDER BY abs(COUNT(*) - :selectivity * (SELECT COUNT(*) FROM {table_name})), 1
+ LIMIT 1
+"""
+
+# Values of the primary key of count rows, the same whatever the physical order of the rows
+QUERY_FOR_PRIMARY_KEY_SAMPLE = """
+SELECT {column_name}
+  FROM {table_name}
+ ORDER BY md5(CAST({column_name} AS text))
+ LIMIT :count
+"""
+
+QUERY_FOR_WRITE_STATISTICS = """
+SELECT n_tup_upd, n_tup_hot_upd, pg_table_size(relid) AS table_bytes
+  FROM pg_stat_user_tables
+ WHERE schemaname = :schema_name
+   AND relname = :table_name
+"""
+
+QUERY_FOR_STATEMENT_STATISTICS = """
+SELECT query, calls, total_exec_time, mean_exec_time, rows
+     , 100.0 * shared_blks_hit / nullif(shared_blks_hit + shared_blks_read, 0) AS hit_percent
+  FROM pg_stat_statements
+"""
+
+
+def fetch_table_sizes(schema: Schema) -> dict[str, dict[str, float]]:
+    """
+    Current size metrics of every table in the schema, by table name, without storing them.
+    """
+    with context_session() as session:
+        return {
+            measure.table_name: {
+                metric_name: getattr(measure, metric_name)
+                for metric_name in METRICS_RAW_ALL
+            }
+            for measure in session.execute(
+                text(QUERY_FOR_TABLE_SIZES), {"schema_name": schema.name}
+            )
+        }
+
 
 def check_permutations_sizes(schema: Schema) -> None:
     # Fetch the table sizes information
@@ -92,87 +188,104 @@ def check_permutations_sizes(schema: Schema) -> None:
                 session.add(raw_performance)
         session.commit()
 
-        # Build results
-        performance_baseline_name = schema.original_table_name
-        baseline_raw_performances = {
-            raf_performance.metric: raf_performance
-            for raf_performance in raw_performance_list
-            if raf_performance.permutation.name == performance_baseline_name
-        }
-
-        baseline_size = _get_row_estimation_for_baseline(baseline_raw_performances)
-
-        raw_performances_by_metric_name: dict[
-            str, dict[int, RawPerformanceRecord]
-        ] = defaultdict(dict)
-        for raw_performance in raw_performance_list:
-            # Skip baseline
-            if raw_performance.permutation.name == performance_baseline_name:
-                continue
-            # Skip row_estimate
-            if raw_performance.metric == ROW_ESTIMATE_METRIC_NAME:
-                continue
-            if raw_performance.metric not in raw_performances_by_metric_name:
-                raw_performances_by_metric_name[raw_performance.metric] = {}
-            raw_performances_by_metric_name[raw_performance.metric][
-                raw_performance.permutation.id
-            ] = raw_performance
-
-        # Build reports per permutation
-        for (
-            metric_name,
-            metrics_by_permutation_id,
-        ) in raw_performances_by_metric_name.items():
-            base_permutation_metric_value = baseline_raw_performances.get(
-                metric_name
-            ).value  # type: ignore
-
-            computed_metric_by_permutation_id: list[tuple[int, Decimal]] = []
-
-            for permutation_id, raw_metric in metrics_by_permutation_id.items():
-                analysis = raw_metric.analysis
-                permutation_metric_value = raw_metric.value
-                if base_permutation_metric_value != 0:
-                    improvement_percentage = (
-                        Decimal(
-                            base_permutation_metric_value - permutation_metric_value
+        # Build results, for every table of the project against its own baseline
+        for table_name, table_raw_performances in _group_by_original_table(
+            raw_performance_list
+        ).items():
+            performance_baseline_name = table_name
+            baseline_raw_performances = {
+                raf_performance.metric: raf_performance
+                for raf_performance in table_raw_performances
+                if raf_performance.permutation.name == performance_baseline_name
+            }
+
+            baseline_size = _get_row_estimation_for_baseline(baseline_raw_performances)
+
+            raw_performances_by_metric_name: dict[
+                str, dict[int, RawPerformanceRecord]
+            ] = defaultdict(dict)
+            for raw_performance in table_raw_performances:
+                # Skip baseline
+                if raw_performance.permutation.name == performance_baseline_name:
+                    continue
+                # Skip row_estimate
+                if raw_performance.metric == ROW_ESTIMATE_METRIC_NAME:
+                    continue
+                if raw_performance.metric not in raw_performances_by_metric_name:
+                    raw_performances_by_metric_name[raw_performance.metric] = {}
+                raw_performances_by_metric_name[raw_performance.metric][
+                    raw_performance.permutation.id
+                ] = raw_performance
+
+            # Build reports per permutation
+            for (
+                metric_name,
+                metrics_by_permutation_id,
+            ) in raw_performances_by_metric_name.items():
+                base_permutation_metric_value = baseline_raw_performances.get(
+                    metric_name
+                ).value  # type: ignore
+
+                computed_metric_by_permutation_id: list[tuple[int, Decimal]] = []
+
+                for permutation_id, raw_metric in metrics_by_permutation_id.items():
+                    analysis = raw_metric.analysis
+                    permutation_metric_value = raw_metric.value
+                    if base_permutation_metric_value != 0:
+                        improvement_percentage = (
+                            Decimal(
+                                base_permutation_metric_value - permutation_metric_value
+                            )
+                            / Decimal(base_permutation_metric_value)
+                            * Decimal(100)
                         )
-                        / Decimal(base_permutation_metric_value)
-                        * Decimal(100)
-                    )
-                    improvement_percentage = improvement_percentage.quantize(
-                        Decimal("0.01")
+                        improvement_percentage = improvement_percentage.quantize(
+                            Decimal("0.01")
+                        )
+                    else:
+                        improvement_percentage = Decimal(0)
+
+                    computed_metric_by_permutation_id.append(
+                        (permutation_id, improvement_percentage)
                     )
-                else:
-                    improvement_percentage = Decimal(0)
 
-                computed_metric_by_permutation_id.append(
-                    (permutation_id, improvement_percentage)
-                )
+                # Choose the best by storing first the permutation id and the improvement percentage.
+                # Later, sort them by improvement percentage descending and choose the best first element
+                best_option = sorted(
+                    computed_metric_by_permutation_id, key=lambda x: x[1], reverse=True
+                )[0]
 
-            # Choose the best by storing first the permutation id and the improvement percentage.
-            # Later, sort them by improvement percentage descending and choose the best first element
-            best_option = sorted(
-                computed_metric_by_permutation_id, key=lambda x: x[1], reverse=True
-            )[0]
-
-            report = AnalysisReport(
-                analysis=analysis,
-                analysis_id=analysis.id,
-                metric=metric_name,
-                best_permutation_name=[
-                    a for a in schema.permutations if a.id == best_option[0]
-                ][0].name,
-                improvement_percentage_over_baseline=best_option[1],
-                original_metric_value=baseline_size,
-                permutation_metric_value=metrics_by_permutation_id[
-                    best_option[0]
-                ].value,
-            )
-            session.add(report)
+                report = AnalysisReport(
+                    analysis=analysis,
+                    analysis_id=analysis.id,
+                    metric=metric_name,
+                    best_permutation_name=[
+                        a for a in schema.permutations if a.id == best_option[0]
+                    ][0].name,
+                    improvement_percentage_over_baseline=best_option[1],
+                    original_metric_value=baseline_size,
+                    permutation_metric_value=metrics_by_permutation_id[
+                        best_option[0]
+                    ].value,
+                )
+                session.add(report)
         session.commit()
 
 
+def _group_by_original_table(
+    raw_performances: list[RawPerformanceRecord],
+) -> dict[str, list[RawPerformanceRecord]]:
+    """
+    Split the raw performances by the table of the project they measure: each table has its own baseline.
+    """
+    raw_performances_by_table: dict[str, list[RawPerformanceRecord]] = defaultdict(list)
+    for raw_performance in raw_performances:
+        raw_performances_by_table[
+            raw_performance.permutation.original_table_name
+        ].append(raw_performance)
+    return raw_performances_by_table
+
+
 def _get_row_estimation_for_baseline(
     baseline_raw_performances: dict[str, RawPerformanceRecord]
 ) -> int:
@@ -185,77 +298,96 @@ def _get_row_estimation_for_baseline(
     return baseline_size
 
 
-def generate_ro_workload_for_schema(schema: Schema):
+def generate_ro_workload_for_table(
+    session: Session,
+    schema_name: str,
+    context: DDLTableContext,
+    table_name: str,
+    selectivity: float,
+) -> dict[ReadOnlyWorkloadType, str]:
     """
-    Generate a read-only workload for the schema.
-    This is a placeholder function. The actual implementation should generate
-    a workload based on the schema.
+    Generate the read-only workload of a table of the project, from its definition and its data.
+    The constants of the filters are read from the given table, so that every filter reads about the
+    selectivity share of the rows (see src.emm.engine.workload).
     """
-    # FIXME They should not be hardcoded but generated based on the schema
-
-    return {
-        ReadOnlyWorkloadType.READ_ALL: "SELECT * FROM {}",
-        ReadOnlyWorkloadType.READ_PRIMARY_KEY_FILTER: "SELECT * FROM {} WHERE :priamry_key_column < 100;",
-        ReadOnlyWorkloadType.READ_AGGREGATION: "SELECT COUNT(*) FROM {};",
-        ReadOnlyWorkloadType.READ_AGGREGATION_FILTER: "SELECT COUNT(*) FROM {} WHERE :priamry_key_column < 100;",
-        ReadOnlyWorkloadType.READ_LIKE: "SELECT name FROM {} WHERE original_table_name LIKE "
-        "'original_schema_name_value%';",
-        ReadOnlyWorkloadType.READ_ORDER_BY: "SELECT * FROM {} ORDER BY created DESC LIMIT 50;",
-        ReadOnlyWorkloadType.READ_RANGE_FILTER: "SELECT * FROM {} WHERE :priamry_key_column BETWEEN 500 AND 1000;",
-        ReadOnlyWorkloadType.READ_PAGINATION: "SELECT * FROM {} LIMIT 100 OFFSET 200;",
-    }
+    qualified_table_name = f"{schema_name}.{table_name}"
+
+    range_values = None
+    if (range_column := find_range_column(context)) is not None:
+        range_values = session.execute(
+            text(
+                QUERY_FOR_RANGE_VALUES.format(
+                    column_name=range_column.name, table_name=qualified_table_name
+                )
+            ),
+            {"quantiles": get_range_quantiles(selectivity)},
+        ).scalar()
+
+    like_prefix = None
+    if (text_column := find_text_column(context)) is not None:
+        like_prefix = session.execute(
+            text(
+                QUERY_FOR_LIKE_PREFIX.format(
+                    column_name=text_column.name, table_name=qualified_table_name
+                )
+            ),
+            {"selectivity": selectivity},
+        ).scalar()
+
+    return generate_ro_workload(context, range_values, like_prefix)
+
+
+def _measure_query(
+    session: Session, query: str, table_name: str, iterations: int, warmup: int
+) -> tuple[float, int]:
+    """
+    Run the query warmup times, so that the plan and the pages are cached, then iterations times,
+    and return its mean execution time in ms, as recorded by pg_stat_statements for the latter,
+    and the number of calls it is computed on.
+    """
+    for _ in range(warmup):
+        session.execute(text(query)).fetchall()
+    session.execute(text("SELECT pg_stat_statements_reset()"))
+    for _ in range(iterations):
+        session.execute(text(query)).fetchall()
+
+    calls, total_exec_time = 0, 0.0
+    for statement in session.execute(text(QUERY_FOR_STATEMENT_STATISTICS)):
+        if table_name in statement.query:
+            calls += statement.calls
+            total_exec_time += statement.total_exec_time
+    return (total_exec_time / calls if calls else 0.0), calls
 
 
 def check_permutation_requests_performance(
-    schema: Schema, benchmark_request: BenchmarkRequest
+    schema: Schema,
+    benchmark_request: BenchmarkRequest,
+    selectivity: float = DEFAULT_SELECTIVITY,
+    trials: int = DEFAULT_TRIALS,
+    warmup: int = DEFAULT_WARMUP_ITERATIONS,
 ):
     """
-    Create a workload and start a sequence of requests to flask, accordingly to the benchmark request.
-    First, we generate some queries.
-    * Standard select * - Expect maximum gain
-    * Standard select where primary_key = <XXX> - Expect minimum gain
-    * Standard select * non_primary_key = <XXX> - Do not know what to expect
-
-    ADD https://www.postgresql.org/docs/current/pgstatstatements.html later on
+    Run the read-only workload of every table of the project on the table and on each of its permutations,
+    and store the mean execution time of every query, as recorded by pg_stat_statements.
+    The workload is generated from the definition of the table (see generate_ro_workload_for_table):
+    * Full scans and aggregations - Expect maximum gain
+    * Lookups and filters on the primary key - Expect minimum gain
+    * LIKE, ORDER BY and pagination on the columns of the table - Do not know what to expect
+    In each of the trials, every query runs warmup times, then RO_WORKLOAD_ITERATIONS times measured.
+    The trials go over all the tables in turn, so that a drift of the server weighs on all of them alike.
+    The reports hold, for every table and workload type, the fastest permutation against the baseline of
+    the table, with the confidence interval of the improvement (see _save_best_permutation_reports).
     """
+    contexts_by_table = {
+        context.table_name: context
+        for context in load_contexts_for_project(schema.name)
+    }
 
-    ro_workload = generate_ro_workload_for_schema(schema)
-
-    # Proceed with the tests
     with context_session() as session:
-        # Set the search path to the new schema
-        session.execute(text(f"SET search_path TO {schema.name}"))
-
         # Enable stats collection for statements
         session.execute(text(PG_STAT_STATEMENTS))
         session.commit()
 
-        times_by_permutation_id: dict[int, list[float]] = defaultdict(list)
-        for permutation in schema.permutations:
-            # Make sure to reset the pg_stat_statements records
-            reset_pg_stat_statement_records()
-
-            for _ in range(1, 50):
-                # Generate the workload
-                query = ro_workload.get(ReadOnlyWorkloadType.READ_ALL)
-
-                # Execute the workload
-                session.execute(text(query.format(permutation.name))).fetchall()
-
-            session.commit()
-            times_by_permutation_id[permutation.id] = [
-                a
-                for a in session.execute(
-                    text(
-                        "select query, calls, total_exec_time, mean_exec_time, rows, 100.0 * shared_blks_hit/nullif("
-                        "shared_blks_hit + shared_blks_read, 0) AS hit_percent from pg_stat_statements"
-                    )
-                )
-                if permutation.name in a.query
-            ]
-
-        session.execute(text("SET search_path TO public"))
-
         # Analysis
         analysis = Analysis(
             name=f"{schema.name}_{benchmark_request.value}",
@@ -266,130 +398,529 @@ def check_permutation_requests_performance(
         )
         session.add(analysis)
 
-        # Get stats from pg_stats_statements
+        ro_workloads: list[
+            tuple[list[Permutation], dict[ReadOnlyWorkloadType, str]]
+        ] = []
+        for table_name, permutations in _group_permutations_by_original_table(
+            schema.permutations
+        ).items():
+            context = contexts_by_table.get(table_name)
+            baseline = next((p for p in permutations if not p.is_permutation), None)
+            if context is None or baseline is None:
+                logger.warning(
+                    f"No definition or baseline found for table {table_name}. Skipping it"
+                )
+                continue
+
+            ro_workload = generate_ro_workload_for_table(
+                session, schema.name, context, baseline.name, selectivity
+            )
+            logger.debug(
+                f"Read-only workload of {table_name}: {list(ro_workload.values())}"
+            )
+            ro_workloads.append((permutations, ro_workload))
 
-        # Save raw results
-        permutations_by_id = {
-            permutation.id: permutation for permutation in schema.permutations
-        }
         raw_performance_list: list[RawPerformanceRecord] = []
-        for permutation_id, times in times_by_permutation_id.items():
-            # metric_value = getattr(measure, metric_name)
-            metric_name = f"{ReadOnlyWorkloadType.READ_ALL.value}"
-            metric_value = times[0].mean_exec_time  # type: ignore
-            permutation = permutations_by_id.get(permutation_id, None)
+        for trial in range(trials):
+            for permutations, ro_workload in ro_workloads:
+                for permutation in permutations:
+                    qualified_table_name = f"{schema.name}.{permutation.name}"
+                    for workload_type, query in ro_workload.items():
+                        mean_exec_time, calls = _measure_query(
+                            session,
+                            query.format(qualified_table_name),
+                            qualified_table_name,
+                            RO_WORKLOAD_ITERATIONS,
+                            warmup,
+                        )
+                        raw_performance = RawPerformanceRecord(
+                            analysis=analysis,
+                            analysis_id=analysis.id,
+                            permutation_id=permutation.id,
+                            permutation=permutation,
+                            metric=workload_type.value,
+                            notes=f"Trial {trial + 1} of {trials}: mean execution time over {calls} iterations",
+                            value=mean_exec_time,
+                        )
+                        raw_performance_list.append(raw_performance)
+                        session.add(raw_performance)
+        session.commit()
 
-            if permutation is None:
+        _save_best_permutation_reports(session, analysis, raw_performance_list)
+        session.commit()
+
+
+def check_permutations_under_load(
+    schema: Schema,
+    benchmark_request: BenchmarkRequest,
+    clients: int = DEFAULT_LOAD_CLIENTS,
+    duration: float = DEFAULT_LOAD_DURATION,
+    selectivity: float = DEFAULT_SELECTIVITY,
+):
+    """
+    Drive clients concurrent clients against the table and each of its permutations, for duration seconds
+    each, and store the latency percentiles and the throughput the clients saw.
+    The clients run the read-only workload of the table in a loop (see generate_ro_workload_for_table),
+    without the full scan: returning every row to every client would measure the client and the network,
+    rather than the table.
+    """
+    contexts_by_table = {
+        context.table_name: context
+        for context in load_contexts_for_project(schema.name)
+    }
+
+    with context_session() as session:
+        analysis = Analysis(
+            name=f"{schema.name}_{benchmark_request.value}",
+            description=f"Analysis of the performance under {clients} concurrent clients",
+            type=EmmAnalysisType.PERFORMANCE_RO,
+            schema_id=schema.id,
+            schema=schema,
+        )
+        session.add(analysis)
+
+        raw_performance_list: list[RawPerformanceRecord] = []
+        for table_name, permutations in _group_permutations_by_original_table(
+            schema.permutations
+        ).items():
+            context = contexts_by_table.get(table_name)
+            baseline = next((p for p in permutations if not p.is_permutation), None)
+            if context is None or baseline is None:
                 logger.warning(
-                    f"Permutation with id {permutation_id} not found. Skipping it"
+                    f"No definition or baseline found for table {table_name}. Skipping it"
                 )
                 continue
 
-            raw_performance = RawPerformanceRecord(
-                analysis=analysis,
-                analysis_id=analysis.id,
-                permutation_id=permutation.id,
-                permutation=permutation,
-                metric=metric_name,
-                notes=f"Mean execution time over {times[0].calls} iterations",  # type: ignore
-                value=metric_value,
+            ro_workload = generate_ro_workload_for_table(
+                session, schema.name, context, baseline.name, selectivity
             )
-            raw_performance_list.append(raw_performance)
-            session.add(raw_performance)
+            ro_workload.pop(ReadOnlyWorkloadType.READ_ALL, None)
+
+            for permutation in permutations:
+                qualified_table_name = f"{schema.name}.{permutation.name}"
+                summary = run_concurrent_load(
+                    [
+                        query.format(qualified_table_name)
+                        for query in ro_workload.values()
+                    ],
+                    clients,
+                    duration,
+                )
+                for metric_name, metric_value in summary.as_metrics().items():
+                    raw_performance = RawPerformanceRecord(
+                        analysis=analysis,
+                        analysis_id=analysis.id,
+                        permutation_id=permutation.id,
+                        permutation=permutation,
+                        metric=metric_name,
+                        notes=f"{summary.count} queries by {clients} clients in {duration}s",
+                        value=metric_value,
+                    )
+                    raw_performance_list.append(raw_performance)
+                    session.add(raw_performance)
         session.commit()
 
-        # Build results
-        performance_baseline_name = schema.original_table_name
-        baseline_raw_performances = {
-            raw_performance.metric: raw_performance
-            for raw_performance in raw_performance_list
-            if raw_performance.permutation.name == performance_baseline_name
-        }
+        _save_best_permutation_reports(
+            session,
+            analysis,
+            raw_performance_list,
+            higher_is_better_metrics=frozenset({THROUGHPUT_METRIC_NAME}),
+        )
+        session.commit()
 
-        def _average(param: list[float]) -> float:
-            return sum(param) / len(param)
 
-        baseline_performance = _average(
-            [
-                raw_performance.value
-                for raw_performance in baseline_raw_performances.values()
-            ]
+def generate_rw_workload_for_table(
+    session: Session,
+    schema_name: str,
+    context: DDLTableContext,
+    table_name: str,
+    transactions: int,
+) -> dict[WriteWorkloadType, list[str]]:
+    """
+    Generate the read-write workload of a table of the project, from its definition and its data.
+    The rows to update and delete are sampled from the given table, the inserted rows follow its rows
+    (see src.emm.engine.workload).
+    """
+    qualified_table_name = f"{schema_name}.{table_name}"
+
+    keys = []
+    if (primary_key_column := find_primary_key_column(context)) is not None:
+        keys = session.scalars(
+            text(
+                QUERY_FOR_PRIMARY_KEY_SAMPLE.format(
+                    column_name=primary_key_column.name,
+                    table_name=qualified_table_name,
+                )
+            ),
+            {"count": 2 * transactions},
+        ).all()
+    row_count = session.execute(
+        text(f"SELECT COUNT(*) FROM {qualified_table_name}")
+    ).scalar()
+
+    return generate_rw_workload(context, list(keys), row_count, transactions, seed=0)
+
+
+def _fetch_write_statistics(schema_name: str, table_name: str):
+    """
+    Updates, HOT updates and size of the table. They are read outside of any transaction, since the
+    statistics are not refreshed within one.
+    """
+    with autocommit_connection() as connection:
+        return connection.execute(
+            text(QUERY_FOR_WRITE_STATISTICS),
+            {"schema_name": schema_name, "table_name": table_name},
+        ).one()
+
+
+def check_permutations_write_performance(
+    schema: Schema,
+    benchmark_request: BenchmarkRequest,
+    transactions: int = RW_WORKLOAD_TRANSACTIONS,
+):
+    """
+    Run the read-write workload of every table of the project on the table and on each of its permutations,
+    and store what it costs with each column order:
+    * the mean latency of every type of transaction: batches of inserts, updates of a fixed width column,
+      updates of a varlena column and deletes, by primary key
+    * the latency percentiles and the transactions per second over the whole workload
+    * the growth of the table, and the share of the updates that were HOT, from pg_stat_user_tables
+    Every table gets the very same transactions (see generate_rw_workload_for_table), one at a time.
+    Types of transactions the table rejects, e.g. inserts breaking a foreign key, are skipped.
+    The workload changes the tables: re-populate them to start over.
+    """
+    contexts_by_table = {
+        context.table_name: context
+        for context in load_contexts_for_project(schema.name)
+    }
+
+    with context_session() as session:
+        analysis = Analysis(
+            name=f"{schema.name}_{benchmark_request.value}",
+            description="Analysis of the write performance",
+            type=EmmAnalysisType.PERFORMANCE_RW,
+            schema_id=schema.id,
+            schema=schema,
         )
+        session.add(analysis)
 
-        raw_performances_by_metric_name: dict[
-            str, dict[int, RawPerformanceRecord]
-        ] = defaultdict(dict)
-        for raw_performance in raw_performance_list:
-            # Skip baseline
-            if raw_performance.permutation.name == performance_baseline_name:
-                continue
-            # Skip row_estimate
-            if raw_performance.metric == ROW_ESTIMATE_METRIC_NAME:
+        raw_performance_list: list[RawPerformanceRecord] = []
+        for table_name, permutations in _group_permutations_by_original_table(
+            schema.permutations
+        ).items():
+            context = contexts_by_table.get(table_name)
+            baseline = next((p for p in permutations if not p.is_permutation), None)
+            if context is None or baseline is None:
+                logger.warning(
+                    f"No definition or baseline found for table {table_name}. Skipping it"
+                )
                 continue
-            if raw_performance.metric not in raw_performances_by_metric_name:
-                raw_performances_by_metric_name[raw_performance.metric] = {}
-            raw_performances_by_metric_name[raw_performance.metric][
-                raw_performance.permutation.id
-            ] = raw_performance
-
-        # Build reports per permutation
-        for (
-            metric_name,
-            metrics_by_permutation_id,
-        ) in raw_performances_by_metric_name.items():
-            base_permutation_metric_value = baseline_raw_performances.get(
-                metric_name
-            ).value  # type: ignore
-
-            computed_metric_by_permutation_id: list[tuple[int, Decimal, float]] = []
-
-            for permutation_id, raw_metric in metrics_by_permutation_id.items():
-                analysis = raw_metric.analysis
-                permutation_metric_value = raw_metric.value
-                if base_permutation_metric_value != 0:
-                    improvement_percentage = (
-                        Decimal(
-                            base_permutation_metric_value - permutation_metric_value
+
+            rw_workload = generate_rw_workload_for_table(
+                session, schema.name, context, baseline.name, transactions
+            )
+
+            for permutation in permutations:
+                qualified_table_name = f"{schema.name}.{permutation.name}"
+                before = _fetch_write_statistics(schema.name, permutation.name)
+
+                metrics: dict[str, float] = {}
+                latencies: list[float] = []
+                for workload_type, statements in rw_workload.items():
+                    try:
+                        type_latencies = run_transactions(
+                            [
+                                statement.format(qualified_table_name)
+                                for statement in statements
+                            ]
                         )
-                        / Decimal(base_permutation_metric_value)
-                        * Decimal(100)
+                    except DBAPIError as e:
+                        logger.warning(
+                            f"Workload {workload_type.value} failed on {permutation.name}. Skipping it: {e.orig}"
+                        )
+                        continue
+                    metrics[workload_type.value] = sum(type_latencies) / len(
+                        type_latencies
                     )
-                    improvement_percentage = improvement_percentage.quantize(
-                        Decimal("0.01")
+                    latencies.extend(type_latencies)
+                if not latencies:
+                    continue
+
+                time.sleep(STATS_FLUSH_DELAY)
+                after = _fetch_write_statistics(schema.name, permutation.name)
+                updates = after.n_tup_upd - before.n_tup_upd
+                hot_updates = after.n_tup_hot_upd - before.n_tup_hot_upd
+
+                # One client running one transaction at a time: the elapsed time is the sum of the latencies
+                summary = summarize_latencies(latencies, sum(latencies) / 1000)
+                metrics.update(summary.as_metrics())
+                metrics[BLOAT_GROWTH_METRIC_NAME] = (
+                    after.table_bytes - before.table_bytes
+                )
+                metrics[HOT_UPDATE_METRIC_NAME] = (
+                    100 * hot_updates / updates if updates else 0.0
+                )
+
+                for metric_name, metric_value in metrics.items():
+                    raw_performance = RawPerformanceRecord(
+                        analysis=analysis,
+                        analysis_id=analysis.id,
+                        permutation_id=permutation.id,
+                        permutation=permutation,
+                        metric=metric_name,
+                        notes=f"{summary.count} transactions of one statement each",
+                        value=metric_value,
                     )
-                else:
-                    improvement_percentage = Decimal(0)
+                    raw_performance_list.append(raw_performance)
+                    session.add(raw_performance)
+        session.commit()
+
+        _save_best_permutation_reports(
+            session,
+            analysis,
+            raw_performance_list,
+            higher_is_better_metrics=frozenset(
+                {THROUGHPUT_METRIC_NAME, HOT_UPDATE_METRIC_NAME}
+            ),
+        )
+        session.commit()
+
+
+def check_permutations_mixed_load(
+    schema: Schema,
+    benchmark_request: BenchmarkRequest,
+    read_ratio: float = DEFAULT_MIX_READ_RATIO,
+    rate: float = DEFAULT_MIX_RATE,
+    clients: int = DEFAULT_LOAD_CLIENTS,
+    duration: float = DEFAULT_LOAD_DURATION,
+    selectivity: float = DEFAULT_SELECTIVITY,
+):
+    """
+    Run a mixed workload on the table and on each of its permutations, on an open-loop schedule: operations
+    arrive at rate per second on average (Poisson arrivals) for duration seconds, whether the previous ones
+    completed or not, and are served by up to clients concurrent clients. read_ratio of them are reads of
+    the read-only workload, without the full scan, the others are writes of the read-write workload.
+    Every table gets the very same schedule (see make_mixed_schedule). The achieved rate is stored, along
+    with the latency percentiles of every type of operation, measured from the scheduled time, so that
+    the time spent waiting for a client counts.
+    The writes change the tables: re-populate them to start over.
+    """
+    contexts_by_table = {
+        context.table_name: context
+        for context in load_contexts_for_project(schema.name)
+    }
+    # Writes of every type the schedule needs, on average
+    write_transactions = math.ceil(
+        rate * duration * (1 - read_ratio) / len(WriteWorkloadType)
+    )
 
-                computed_metric_by_permutation_id.append(
-                    (permutation_id, improvement_percentage, permutation_metric_value)
+    with context_session() as session:
+        analysis = Analysis(
+            name=f"{schema.name}_{benchmark_request.value}",
+            description=f"Analysis of the performance of {read_ratio:.0%} reads at {rate} operations per second",
+            type=EmmAnalysisType.PERFORMANCE_RW,
+            schema_id=schema.id,
+            schema=schema,
+        )
+        session.add(analysis)
+
+        raw_performance_list: list[RawPerformanceRecord] = []
+        for table_name, permutations in _group_permutations_by_original_table(
+            schema.permutations
+        ).items():
+            context = contexts_by_table.get(table_name)
+            baseline = next((p for p in permutations if not p.is_permutation), None)
+            if context is None or baseline is None:
+                logger.warning(
+                    f"No definition or baseline found for table {table_name}. Skipping it"
                 )
+                continue
 
-            # Choose the best by storing first the permutation id and the improvement percentage.
-            # Later, sort them by improvement percentage descending and choose the best first element
-            best_option = sorted(
-                computed_metric_by_permutation_id, key=lambda x: x[1], reverse=True
-            )[0]
-        best_performance_by_metric: dict[str, tuple[int, float]] = {}
-        for metric_name in [ReadOnlyWorkloadType.READ_ALL.value]:
-            best_performance_by_metric[metric_name] = (1, 0)
-
-        for metric_name in [ReadOnlyWorkloadType.READ_ALL.value]:
-            report = AnalysisReport(
-                analysis=analysis,
-                analysis_id=analysis.id,
-                metric=metric_name,
-                best_permutation_name=[
-                    a for a in schema.permutations if a.id == best_option[0]
-                ][0].name,
-                improvement_percentage_over_baseline=best_option[1],
-                original_metric_value=baseline_performance,
-                permutation_metric_value=best_option[2],
+            ro_workload = generate_ro_workload_for_table(
+                session, schema.name, context, baseline.name, selectivity
+            )
+            ro_workload.pop(ReadOnlyWorkloadType.READ_ALL, None)
+            rw_workload = generate_rw_workload_for_table(
+                session, schema.name, context, baseline.name, write_transactions
             )
-            session.add(report)
+            schedule = make_mixed_schedule(
+                ro_workload, rw_workload, read_ratio, rate, duration, seed=0
+            )
+
+            for permutation in permutations:
+                qualified_table_name = f"{schema.name}.{permutation.name}"
+                result = run_open_loop(
+                    [
+                        ScheduledOperation(
+                            operation.at,
+                            operation.operation,
+                            operation.statement.format(qualified_table_name),
+                        )
+                        for operation in schedule
+                    ],
+                    clients,
+                )
+
+                metrics = {ACHIEVED_RATE_METRIC_NAME: result.completed / result.elapsed}
+                for operation, latencies in result.latencies_by_operation.items():
+                    summary = summarize_latencies(latencies, result.elapsed)
+                    for metric_name, metric_value in summary.as_metrics().items():
+                        if metric_name != THROUGHPUT_METRIC_NAME:
+                            metrics[f"{operation}_{metric_name}"] = metric_value
+
+                for metric_name, metric_value in metrics.items():
+                    raw_performance = RawPerformanceRecord(
+                        analysis=analysis,
+                        analysis_id=analysis.id,
+                        permutation_id=permutation.id,
+                        permutation=permutation,
+                        metric=metric_name,
+                        notes=(
+                            f"{result.completed} of {len(schedule)} operations completed, "
+                            f"{result.failures} failed, target rate {rate} per second"
+                        ),
+                        value=metric_value,
+                    )
+                    raw_performance_list.append(raw_performance)
+                    session.add(raw_performance)
         session.commit()
 
+        _save_best_permutation_reports(
+            session,
+            analysis,
+            raw_performance_list,
+            higher_is_better_metrics=frozenset({ACHIEVED_RATE_METRIC_NAME}),
+        )
+        session.commit()
+
+
+def _group_permutations_by_original_table(
+    permutations: list[Permutation],
+) -> dict[str, list[Permutation]]:
+    permutations_by_table: dict[str, list[Permutation]] = defaultdict(list)
+    for permutation in permutations:
+        permutations_by_table[permutation.original_table_name].append(permutation)
+    return permutations_by_table
+
 
-def benchmark_schema(schema: Schema, benchmark_request: BenchmarkRequest):
+def _improvement_percentage(
+    baseline_value: float, value: float, higher_is_better: bool = False
+) -> Decimal:
+    return _to_percentage(
+        improvement_percentage(baseline_value, value, higher_is_better)
+    )
+
+
+def _to_percentage(value: float) -> Decimal:
+    return Decimal(value).quantize(Decimal("0.01"))
+
+
+def _save_best_permutation_reports(
+    session: Session,
+    analysis: Analysis,
+    raw_performances: list[RawPerformanceRecord],
+    higher_is_better_metrics: frozenset[str] = frozenset(),
+) -> None:
+    """
+    Store, for every table of the project and every metric, the permutation with the best value, against
+    the baseline of the table. The best is the lowest value, or the highest for higher_is_better_metrics.
+    Metrics measured over repeated trials are compared on the mean of the trials, once the outliers are
+    removed, and the report holds the bootstrap confidence interval of the improvement: an improvement
+    whose interval includes 0 is flagged as not significant, since it cannot be told from the noise.
+    The intervals are corrected for the number of permutations the best one is picked from
+    (see simultaneous_improvement_intervals).
+    """
+    for table_raw_performances in _group_by_original_table(raw_performances).values():
+        raw_performances_by_metric: dict[str, list[RawPerformanceRecord]] = defaultdict(
+            list
+        )
+        for raw_performance in table_raw_performances:
+            raw_performances_by_metric[raw_performance.metric].append(raw_performance)
+
+        for metric_name, metric_raw_performances in raw_performances_by_metric.items():
+            permutations_by_id: dict[int, Permutation] = {}
+            values_by_permutation_id: dict[int, list[float]] = defaultdict(list)
+            for raw_performance in metric_raw_performances:
+                permutations_by_id[
+                    raw_performance.permutation.id
+                ] = raw_performance.permutation
+                values_by_permutation_id[raw_performance.permutation.id].append(
+                    raw_performance.value
+                )
+            values_by_permutation_id = {
+                permutation_id: remove_outliers(values)
+                for permutation_id, values in values_by_permutation_id.items()
+            }
+            means_by_permutation_id = {
+                permutation_id: fmean(values)
+                for permutation_id, values in values_by_permutation_id.items()
+            }
+
+            baseline_id = next(
+                (
+                    permutation_id
+                    for permutation_id, permutation in permutations_by_id.items()
+                    if not permutation.is_permutation
+                ),
+                None,
+            )
+            candidate_ids = [
+                permutation_id
+                for permutation_id, permutation in permutations_by_id.items()
+                if permutation.is_permutation
+            ]
+            if baseline_id is None or not candidate_ids:
+                continue
+
+            higher_is_better = metric_name in higher_is_better_metrics
+            choose = max if higher_is_better else min
+            best_id = choose(candidate_ids, key=means_by_permutation_id.__getitem__)
+            interval = simultaneous_improvement_intervals(
+                values_by_permutation_id[baseline_id],
+                {
+                    permutation_id: values_by_permutation_id[permutation_id]
+                    for permutation_id in candidate_ids
+                },
+                higher_is_better,
+                seed=0,
+            )[best_id]
+            session.add(
+                AnalysisReport(
+                    analysis=analysis,
+                    analysis_id=analysis.id,
+                    metric=metric_name,
+                    best_permutation_name=permutations_by_id[best_id].name,
+                    improvement_percentage_over_baseline=_improvement_percentage(
+                        means_by_permutation_id[baseline_id],
+                        means_by_permutation_id[best_id],
+                        higher_is_better,
+                    ),
+                    original_metric_value=means_by_permutation_id[baseline_id],
+                    permutation_metric_value=means_by_permutation_id[best_id],
+                    confidence_interval_low=(
+                        None if interval is None else _to_percentage(interval[0])
+                    ),
+                    confidence_interval_high=(
+                        None if interval is None else _to_percentage(interval[1])
+                    ),
+                    is_significant=None
+                    if interval is None
+                    else is_significant(interval),
+                )
+            )
+
+
+def benchmark_schema(
+    schema: Schema,
+    benchmark_request: BenchmarkRequest,
+    selectivity: float = DEFAULT_SELECTIVITY,
+    clients: int = DEFAULT_LOAD_CLIENTS,
+    duration: float = DEFAULT_LOAD_DURATION,
+    read_ratio: float = DEFAULT_MIX_READ_RATIO,
+    rate: float = DEFAULT_MIX_RATE,
+    trials: int = DEFAULT_TRIALS,
+    warmup: int = DEFAULT_WARMUP_ITERATIONS,
+):
     """
     Check size of the different permutation tables and store them in the permutation performance table.
     Additionally, it starts the analysis of the reading and writing performance of the tables.
@@ -398,13 +929,27 @@ def benchmark_schema(schema: Schema, benchmark_request: BenchmarkRequest):
     """
     if benchmark_request in [BenchmarkRequest.ALL, BenchmarkRequest.TABLE_SIZE]:
         check_permutations_sizes(schema)
-    if benchmark_request in [
-        BenchmarkRequest.ALL,
-        BenchmarkRequest.FLASK_RO,
-        BenchmarkRequest.FLASK_RW,
-        BenchmarkRequest.FLASK_MIX,
-    ]:
-        check_permutation_requests_performance(schema, benchmark_request)
+    if benchmark_request in [BenchmarkRequest.ALL, BenchmarkRequest.FLASK_RO]:
+        check_permutation_requests_performance(
+            schema, benchmark_request, selectivity, trials, warmup
+        )
+    if benchmark_request in [BenchmarkRequest.ALL, BenchmarkRequest.LOAD]:
+        check_permutations_under_load(
+            schema, benchmark_request, clients, duration, selectivity
+        )
+    # Last, since they change the tables
+    if benchmark_request in [BenchmarkRequest.ALL, BenchmarkRequest.FLASK_MIX]:
+        check_permutations_mixed_load(
+            schema,
+            benchmark_request,
+            read_ratio,
+            rate,
+            clients,
+            duration,
+            selectivity,
+        )
+    if benchmark_request in [BenchmarkRequest.ALL, BenchmarkRequest.FLASK_RW]:
+        check_permutations_write_performance(schema, benchmark_request)
 
 
 def load_analysis_for_schema(schema: Schema) -> list[Analysis]:
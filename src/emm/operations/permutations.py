@@ -1,24 +1,48 @@
+import heapq
 import itertools
-from collections import defaultdict
-from typing import Iterable
-
-from sqlalchemy import text
-
+import logging
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, TypeVar
+
+from sqlalchemy import exists, insert, text
+
+from src.emm.engine.codes import (
+    decode_permutation,
+    encode_permutation,
+    make_permutation_table_name,
+)
 from src.emm.engine.data import (
     DDLTableColumn,
     DDLTableContext,
     PermutationRequest,
+    PermutationSampling,
     PermutationSettings,
 )
-from src.emm.engine.parser import (
-    extract_create_statement,
-    parse_create_statement,
-    read_ddl_for_project,
+from src.emm.engine.ddl import (
+    is_foreign_key_constraint,
+    rename_constraints,
+    rewrite_index_statement,
+    strip_column_references,
+)
+from src.emm.engine.layout import estimate_tuple_width, layout_signature
+from src.emm.engine.optimizer import find_optimal_permutations
+from src.emm.engine.parser import parse_project_ddl, read_ddl_for_project
+from src.emm.engine.sampling import sample_permutations
+from src.emm.models.database_base import context_session, in_worker_session
+from src.emm.models.schema import Permutation, PermutationEquivalence, Schema
+from src.emm.operations.catalog import load_context_from_catalog
+from src.emm.operations.constants import (
+    BASELINE_PERMUTATION_CODE,
+    PERMUTATIONS_CHUNK_SIZE,
 )
-from src.emm.models.database_base import context_session
-from src.emm.models.schema import Permutation, Schema
 from src.emm.operations.schemas import find_schema_by_name
 
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
 """
 ⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⣠⣤⠶⠶⠾⠿⠛⠛⠛⠛⠓⠒⠲⠶⠤⣤⣀⣀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
 ⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣠⡴⠟⠋⣁⣤⣴⣶⣶⡶⠶⠖⠒⠂⠀⠀⠀⠀⠀⠀⠈⠉⠛⠷⣦⣄⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
@@ -63,7 +87,9 @@ def sort_columns(columns, by="name"):
         raise ValueError("Unknown sorting criteria")
 
 
-def _get_permutations_by_type(context: DDLTableContext) -> list[tuple[DDLTableColumn]]:
+def _get_permutations_by_type(
+    context: DDLTableContext,
+) -> Iterator[tuple[DDLTableColumn, ...]]:
     # Group columns by their type
     columns_by_type = defaultdict(list)
     for column in context.columns:
@@ -72,12 +98,8 @@ def _get_permutations_by_type(context: DDLTableContext) -> list[tuple[DDLTableCo
     # Get all unique types
     unique_types = list(columns_by_type.keys())
 
-    # Generate all permutations of the types
-    type_permutations = list(itertools.permutations(unique_types))
-
     # Generate permutations of columns based on type permutations
-    column_permutations = []
-    for type_permutation in type_permutations:
+    for type_permutation in itertools.permutations(unique_types):
         # skip neutral permutation
         if list(type_permutation) == unique_types:
             continue
@@ -85,86 +107,187 @@ def _get_permutations_by_type(context: DDLTableContext) -> list[tuple[DDLTableCo
         perm = []
         for column_type in type_permutation:
             perm.extend(columns_by_type[column_type])
-        column_permutations.append(tuple(perm))
-
-    return column_permutations
+        yield tuple(perm)
 
 
-def compute_permutations(
-    context: DDLTableContext, request: PermutationRequest
-) -> PermutationSettings:
+def iter_permutations(
+    context: DDLTableContext,
+    request: PermutationRequest,
+    sampling: PermutationSampling | None = None,
+    sample_size: int | None = None,
+    seed: int | None = None,
+) -> Iterator[tuple[str, list[DDLTableColumn]]]:
     """
-    Build a mapping of shuffled indexes of the columns and their permutation.
-    The permutation is expressed as the sorted list of columns.
-    TODO I can just permute the indexes
+    Lazily yield the permutations as (permutation key, shuffled columns).
+    When a sampling is requested, only a subset of all the permutations is drawn.
     """
-    permutation_dict = {}
     original_indices = {item: index for index, item in enumerate(context.columns)}
 
-    permutations: Iterable[tuple[DDLTableColumn]]
+    permutations: Iterable[tuple[DDLTableColumn, ...]]
 
-    if request == PermutationRequest.ALL:
-        permutations = itertools.permutations(context.columns)  # type: ignore
+    if sampling is not None:
+        if request != PermutationRequest.ALL:
+            raise ValueError(
+                f"Sampling is only supported when computing {PermutationRequest.ALL.value} the permutations"
+            )
+        permutations = sample_permutations(
+            context.columns, sampling, sample_size=sample_size, seed=seed
+        )
+    elif request == PermutationRequest.ALL:
+        permutations = itertools.permutations(context.columns)
     elif request == PermutationRequest.CLUSTER_BY_TYPE:
         permutations = _get_permutations_by_type(context)
     elif request == PermutationRequest.MAGIC:
-        raise ValueError("Magic permutations are nto yet implemented")
+        permutations = find_optimal_permutations(context.columns)
+    elif request == PermutationRequest.GENETIC:
+        raise ValueError(
+            "Genetic permutations depend on measures: use search_permutations_for_project"
+        )
     else:
         raise ValueError(f"Permutation request {request} not valid")
 
     for perm in permutations:
-        key = "".join(str(original_indices[item]) for item in perm)
-        permutation_dict[key] = list(perm)
+        key = encode_permutation([original_indices[item] for item in perm])
+        yield key, list(perm)
+
+
+def compute_permutations(
+    context: DDLTableContext, request: PermutationRequest
+) -> PermutationSettings:
+    """
+    Build a mapping of shuffled indexes of the columns and their permutation.
+    The permutation is expressed as the sorted list of columns.
+    It holds all the permutations in memory: prefer iter_permutations for wide tables.
+    """
+    return PermutationSettings(
+        context=context, permutation_dict=dict(iter_permutations(context, request))
+    )
+
+
+def filter_permutations(
+    permutations: Iterable[tuple[str, list[DDLTableColumn]]],
+    top_k: int | None = None,
+    max_padding: int | None = None,
+) -> Iterable[tuple[str, list[DDLTableColumn]]]:
+    """
+    Keep only the most promising permutations, before creating any table.
+    Those wasting more than max_padding bytes per row are discarded on the fly.
+    If top_k is set, only the k permutations with the narrowest predicted row width are kept,
+    which needs memory for k permutations only.
+    """
+    if max_padding is not None:
+        permutations = (
+            (key, permutation)
+            for key, permutation in permutations
+            if estimate_tuple_width(permutation).padding <= max_padding
+        )
 
-    return PermutationSettings(context=context, permutation_dict=permutation_dict)
+    if top_k is None:
+        return permutations
+
+    def _rank(item: tuple[str, list[DDLTableColumn]]) -> tuple[int, int]:
+        estimate = estimate_tuple_width(item[1])
+        return estimate.width, estimate.padding
+
+    ranked_permutations = heapq.nsmallest(top_k, permutations, key=_rank)
+    log.info(
+        f"Kept the {len(ranked_permutations)} narrowest permutations "
+        f"(top_k={top_k}, max_padding={max_padding})"
+    )
+
+    return ranked_permutations
+
+
+def chunked(iterable: Iterable[T], size: int) -> Iterator[list[T]]:
+    """
+    Split the iterable in lists of at most size elements, without consuming it all.
+    """
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
 
 
 def make_permutation_ddl(
-    project_name: str,
     permutation_key: str,
     context: DDLTableContext,
     permutation: list[DDLTableColumn],
 ) -> str:
     """
-    Generate the DDL for the permutation
+    Generate the DDL for the permutation: the table, with the constraints of the original one, and its indexes.
+    Named constraints and indexes get a name of their own, since they must be unique in the schema.
+    Foreign keys, inline ones included, are not replicated: they would tie the load of every permutation
+    to the referenced tables.
     """
-    columns = []
+    definitions = []
     for column in permutation:
-        columns.append(column.original_definition)
+        definitions.append(
+            rename_constraints(
+                strip_column_references(column.original_definition), permutation_key
+            )
+        )
+    for constraint in context.constraints:
+        if is_foreign_key_constraint(constraint):
+            log.debug(f"Skipping foreign key {constraint} of {context.table_name}")
+            continue
+        definitions.append(rename_constraints(constraint, permutation_key))
 
+    table_name = make_permutation_table_name(context.table_name, permutation_key)
     TEMPLATE = f"""
-CREATE TABLE IF NOT EXISTS {project_name}_{permutation_key} (
-{",".join(columns)}
+CREATE TABLE IF NOT EXISTS {table_name} (
+{",".join(definitions)}
 );
 """
-    return TEMPLATE
+    return TEMPLATE + "".join(
+        f"{index_ddl};\n"
+        for index_ddl in make_permutation_index_ddls(permutation_key, context)
+    )
 
 
-def validate_no_permutations_exists_for_project(
-    project_name: str, permutations_settings: PermutationSettings
-) -> None:
-    schema = find_schema_by_name(project_name)
-    if schema is None:
-        raise ValueError(f"Schema {project_name} not found")
+def make_permutation_index_ddls(
+    permutation_key: str, context: DDLTableContext
+) -> list[str]:
+    """
+    The CREATE INDEX statements of the original table, rewritten for the table of the permutation.
+    """
+    table_name = make_permutation_table_name(context.table_name, permutation_key)
+    return [
+        rewrite_index_statement(index, table_name, permutation_key)
+        for index in context.indexes
+    ]
+
 
-    # Check for existing permutations and avoid re-generating them
+def find_existing_permutation_codes(
+    schema_id: int, table_name: str, permutation_codes: list[str]
+) -> set[str]:
+    """
+    Returns the codes, among the ones given, of the permutations of the table already present for the schema.
+    Meant to be called on a chunk of permutations at a time, to keep the query small.
+    """
     with context_session() as session:
-        existing_permutations = {
+        return {
             p.permutation_code
             for p in session.query(Permutation)
             .filter(
-                Permutation.schema_id == schema.id,
-                Permutation.permutation_code.in_(
-                    permutations_settings.permutation_dict.keys()
-                ),
+                Permutation.schema_id == schema_id,
+                Permutation.original_table_name == table_name,
+                Permutation.permutation_code.in_(permutation_codes),
             )
             .all()
         }
-        if existing_permutations:
-            raise ValueError("Permutations already exists. Use the clean command first")
 
 
-def save_baseline_permutation(schema: Schema) -> None:
+def has_baseline_permutation(schema: Schema, table_name: str) -> bool:
+    with context_session() as session:
+        return session.query(
+            exists().where(
+                Permutation.schema_id == schema.id,
+                Permutation.original_table_name == table_name,
+                Permutation.is_permutation.is_(False),
+            )
+        ).scalar()
+
+
+def save_baseline_permutation(schema: Schema, table_name: str) -> None:
     # Write create statement
     with context_session() as session:
         # Create the object
@@ -174,72 +297,326 @@ def save_baseline_permutation(schema: Schema) -> None:
                 is_populated=False,
                 schema_id=schema.id,
                 schema=schema,
-                permutation_code=-1,
-                name=schema.original_table_name,
+                permutation_code=BASELINE_PERMUTATION_CODE,
+                original_table_name=table_name,
+                name=table_name,
             )
         )
 
 
-def save_permutation(
-    permutation_key: str, permutation_ddl: str, schema: Schema
+@in_worker_session
+def save_permutations(
+    schema_id: int,
+    schema_name: str,
+    table_name: str,
+    permutation_ddls: list[tuple[str, str]],
+) -> int:
+    """
+    Create a chunk of permutation tables of a table, given as (permutation key, DDL), in a single transaction.
+    All the DDLs are sent in one batch and the permutations are recorded with one bulk insert.
+    If anything fails, the whole chunk is rolled back.
+    Returns the number of permutations created.
+    """
+    if not permutation_ddls:
+        return 0
+
+    with context_session() as session:
+        # Only for the current transaction, reset at commit or rollback
+        session.execute(text(f"SET LOCAL search_path TO {schema_name}"))
+
+        # Execute the DDLs
+        session.execute(text("".join(ddl for _, ddl in permutation_ddls)))
+
+        # Create the objects
+        session.execute(
+            insert(Permutation),
+            [
+                {
+                    "is_permutation": True,
+                    "is_populated": False,
+                    "schema_id": schema_id,
+                    "permutation_code": permutation_key,
+                    "original_table_name": table_name,
+                    "name": make_permutation_table_name(table_name, permutation_key),
+                }
+                for permutation_key, _ in permutation_ddls
+            ],
+        )
+
+    return len(permutation_ddls)
+
+
+def save_permutation_equivalences(
+    schema_id: int, table_name: str, equivalences: list[tuple[str, str]]
 ) -> None:
-    # Write create statement
+    """
+    Record, in bulk, the permutations of the table not created because physically identical to another one.
+    Equivalences are given as (code of the permutation created, code of the equivalent permutation).
+    """
     with context_session() as session:
-        session.execute(text(f"SET search_path TO {schema.name}"))
+        permutation_ids_by_code = dict(
+            session.query(Permutation.permutation_code, Permutation.id).filter(
+                Permutation.schema_id == schema_id,
+                Permutation.original_table_name == table_name,
+                Permutation.permutation_code.in_(
+                    {representative_code for representative_code, _ in equivalences}
+                ),
+            )
+        )
+        session.execute(
+            insert(PermutationEquivalence),
+            [
+                {
+                    "permutation_id": permutation_ids_by_code[representative_code],
+                    "permutation_code": permutation_code,
+                }
+                for representative_code, permutation_code in equivalences
+            ],
+        )
 
-        # Execute the DDL
-        session.execute(text(permutation_ddl))
+    log.info(
+        f"Recorded {len(equivalences)} permutations of {table_name} with an already existing layout"
+    )
 
-        session.execute(text("SET search_path TO public"))
 
-        # Create the object
-        session.add(
-            Permutation(
-                is_permutation=True,
-                is_populated=False,
-                schema_id=schema.id,
-                schema=schema,
-                permutation_code=permutation_key,
-                name=f"{schema.name}_{permutation_key}",
+@in_worker_session
+def _generate_permutations_for_table(
+    schema_id: int,
+    schema_name: str,
+    context: DDLTableContext,
+    executor: ThreadPoolExecutor,
+    jobs: int,
+    permutation_request: PermutationRequest,
+    top_k: int | None,
+    max_padding: int | None,
+    sampling: PermutationSampling | None,
+    sample_size: int | None,
+    seed: int | None,
+    dedupe_layouts: bool,
+    on_chunk_created: Callable[[int], None],
+) -> None:
+    """
+    Compute the permutations of one table and hand their creation, chunk by chunk, to the executor.
+    At most jobs chunks are kept in memory. It runs in a worker thread, hence it only takes plain values.
+    """
+    table_name = context.table_name
+
+    # Generate the possible permutations, lazily
+    permutations = iter_permutations(
+        context,
+        permutation_request,
+        sampling=sampling,
+        sample_size=sample_size,
+        seed=seed,
+    )
+
+    # Only the most promising ones become real tables
+    permutations = filter_permutations(
+        permutations, top_k=top_k, max_padding=max_padding
+    )
+
+    # The permutation code created for every layout signature met so far
+    representative_codes: dict[tuple[tuple[int, str], ...], str] = {
+        layout_signature(context.columns): BASELINE_PERMUTATION_CODE
+    }
+
+    # Chunks being created, with the equivalences to record once they are done
+    pending_chunks: deque[tuple[Future[int], list[tuple[str, str]]]] = deque()
+
+    def _complete_oldest_chunk() -> None:
+        future, equivalences = pending_chunks.popleft()
+        on_chunk_created(future.result())
+
+        # Their representatives were created by this chunk or by the previous ones
+        if equivalences:
+            save_permutation_equivalences(schema_id, table_name, equivalences)
+
+    for chunk in chunked(permutations, PERMUTATIONS_CHUNK_SIZE):
+        # Should avoid re-generating existing permutations
+        existing_permutation_codes = find_existing_permutation_codes(
+            schema_id, table_name, [permutation_key for permutation_key, _ in chunk]
+        )
+        equivalences: list[tuple[str, str]] = []
+        permutation_ddls: list[tuple[str, str]] = []
+
+        for permutation_key, permutation in chunk:
+            if permutation_key in existing_permutation_codes:
+                log.info(
+                    f"Permutation {permutation_key} of {table_name} already exists. Skipping it"
+                )
+                continue
+
+            if dedupe_layouts:
+                signature = layout_signature(permutation)
+                if signature in representative_codes:
+                    equivalences.append(
+                        (representative_codes[signature], permutation_key)
+                    )
+                    continue
+                representative_codes[signature] = permutation_key
+
+            # Generate DDL
+            permutation_ddls.append(
+                (
+                    permutation_key,
+                    make_permutation_ddl(permutation_key, context, permutation),
+                )
+            )
+
+        # Write them to the DB and to the permutation table, in a worker
+        pending_chunks.append(
+            (
+                executor.submit(
+                    save_permutations,
+                    schema_id,
+                    schema_name,
+                    table_name,
+                    permutation_ddls,
+                ),
+                equivalences,
             )
         )
 
+        # Keep a bounded number of chunks in memory
+        while len(pending_chunks) > jobs:
+            _complete_oldest_chunk()
+
+    while pending_chunks:
+        _complete_oldest_chunk()
+
 
 def generate_permutations_for_project(
-    project_name: str, permutation_request: PermutationRequest
+    project_name: str,
+    permutation_request: PermutationRequest,
+    top_k: int | None = None,
+    max_padding: int | None = None,
+    sampling: PermutationSampling | None = None,
+    sample_size: int | None = None,
+    seed: int | None = None,
+    dedupe_layouts: bool = False,
+    progress: Callable[[int], None] | None = None,
+    jobs: int = 1,
 ) -> None:
+    """
+    Compute the permutations of every table of the project and create a table for each one of them.
+    With dedupe_layouts, only one table is created per distinct on-disk layout: the other
+    column orders leading to the same layout are recorded as equivalences of the one created.
+    Tables of the project are processed concurrently. Their permutations are created chunk by chunk,
+    each chunk in its own transaction, by up to jobs workers in parallel, shared by all the tables.
+    Progress, if given, is called with the number of permutations created so far after every chunk.
+    """
     schema = find_schema_by_name(project_name)
     if schema is None:
         raise ValueError(f"Schema {project_name} not found")
 
-    # Extract the DDL
-    ddl = read_ddl_for_project(project_name=project_name)
+    # Get the contexts, so that we can easily create permutations
+    contexts = load_contexts_for_project(project_name)
+
+    for context in contexts:
+        if not has_baseline_permutation(schema, context.table_name):
+            save_baseline_permutation(schema=schema, table_name=context.table_name)
+
+    # Workers only get plain values, not the ORM object
+    schema_id, schema_name = schema.id, schema.name
+
+    created_permutations = 0
+    progress_lock = threading.Lock()
+
+    def _on_chunk_created(created_in_chunk: int) -> None:
+        nonlocal created_permutations
+        with progress_lock:
+            created_permutations += created_in_chunk
+            log.info(f"Created {created_permutations} permutations so far")
+            if progress is not None:
+                progress(created_permutations)
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        # Drivers of the tables only compute the permutations and wait for their chunks
+        with ThreadPoolExecutor(max_workers=jobs) as table_executor:
+            futures = [
+                table_executor.submit(
+                    _generate_permutations_for_table,
+                    schema_id,
+                    schema_name,
+                    context,
+                    executor,
+                    jobs,
+                    permutation_request,
+                    top_k,
+                    max_padding,
+                    sampling,
+                    sample_size,
+                    seed,
+                    dedupe_layouts,
+                    _on_chunk_created,
+                )
+                for context in contexts
+            ]
+            for future in futures:
+                # Raise the first error, if any
+                future.result()
 
-    # Parse the DDL into a statement object
-    create_statement = extract_create_statement(ddl)
 
-    # Get the context, so that we can easily create permutations
-    context: DDLTableContext = parse_create_statement(
-        project_name=project_name, statement=create_statement
+def load_contexts_for_project(project_name: str) -> list[DDLTableContext]:
+    """
+    Describe every table of the project, in the order of its DDL file. Once the project is initialized,
+    the definitions are read from the catalog, which gives the exact storage of every type.
+    Tables not found in the catalog are described by parsing the DDL.
+    """
+    contexts = parse_project_ddl(
+        project_name=project_name, ddl=read_ddl_for_project(project_name=project_name)
     )
 
-    # Generate the possible permutations
-    permutations_settings: PermutationSettings = compute_permutations(
-        context, permutation_request
-    )
+    schema = find_schema_by_name(project_name)
+    if schema is None:
+        return contexts
+
+    catalog_contexts: list[DDLTableContext] = []
+    for context in contexts:
+        catalog_context = load_context_from_catalog(
+            project_name=project_name,
+            namespace=schema.name,
+            table_name=context.table_name,
+        )
+        if not catalog_context.columns:
+            log.info(
+                f"Table {context.table_name} not found in the catalog. Parsing the DDL"
+            )
+            catalog_context = context
+        catalog_contexts.append(catalog_context)
 
-    # Should avoid re-generating existing permutations
-    validate_no_permutations_exists_for_project(project_name, permutations_settings)
+    return catalog_contexts
+
+
+def load_context_for_project(
+    project_name: str, table_name: str | None = None
+) -> DDLTableContext:
+    """
+    Describe one table of the project, by default the first one of its DDL file.
+    """
+    contexts = load_contexts_for_project(project_name)
+    if table_name is None:
+        return contexts[0]
+
+    for context in contexts:
+        if context.table_name == table_name:
+            return context
+    raise ValueError(f"Table {table_name} not found in project {project_name}")
 
-    save_baseline_permutation(schema=schema)
-    for permutation_key, permutation in permutations_settings.permutation_dict.items():
-        # Generate DDL
-        permutation_ddl: str = make_permutation_ddl(
-            project_name, permutation_key, context, permutation
-        )
 
-        # Write them to the DB and to the permutation table
-        save_permutation(permutation_key=permutation_key, permutation_ddl=permutation_ddl, schema=schema)  # type: ignore
+def get_permutation_column_names(
+    context: DDLTableContext, permutation_code: str
+) -> list[str]:
+    """
+    Map a permutation code back to the names of the columns, in the order of the permutation.
+    """
+    if permutation_code == BASELINE_PERMUTATION_CODE:
+        return [column.name for column in context.columns]
+
+    return [
+        context.columns[index].name
+        for index in decode_permutation(permutation_code, len(context.columns))
+    ]
 
 
 def load_permutations(schema: Schema, only_origin: bool) -> list[Permutation]:
@@ -249,13 +626,16 @@ def load_permutations(schema: Schema, only_origin: bool) -> list[Permutation]:
     """
     with context_session() as session:
         if only_origin:
-            # FIXME Should be loading them all and filter later, perhaps.
-            return [
+            # One original table per table of the project
+            return (
                 session.query(Permutation)
-                .filter(Permutation.schema_id == schema.id)
+                .filter(
+                    Permutation.schema_id == schema.id,
+                    Permutation.is_permutation.is_(False),
+                )
                 .order_by(Permutation.id.asc())
-                .one()
-            ]
+                .all()
+            )
         else:
             return (
                 session.query(Permutation)
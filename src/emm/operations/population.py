@@ -1,40 +1,277 @@
-import re
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Callable, Iterator
 
-from sqlalchemy import text
+from sqlalchemy import func, text, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
 
-from src.emm.engine.parser import read_data_for_project
-from src.emm.models.database_base import context_session
+from src.emm.engine.data import (
+    DataGenerationSettings,
+    DDLTableContext,
+    PopulationMethod,
+    PopulationStatus,
+)
+from src.emm.engine.dependencies import order_by_dependencies
+from src.emm.engine.generator import (
+    CopyDataReader,
+    get_generated_columns,
+    is_computed_by_the_database,
+    is_foreign_key_unique,
+    iter_copy_data,
+)
+from src.emm.engine.parser import (
+    find_tables_with_data,
+    iter_data_for_project,
+    rewrite_insert_table_name,
+)
+from src.emm.models.database_base import (
+    autocommit_connection,
+    context_session,
+    in_worker_session,
+)
 from src.emm.models.schema import Permutation, Schema
-from src.emm.operations.permutations import load_permutations
+from src.emm.operations.catalog import (
+    has_foreign_keys,
+    is_referenced_by_foreign_key,
+    load_foreign_key_references,
+    load_foreign_key_values,
+    load_index_statements,
+)
+from src.emm.operations.constants import (
+    COPY_BUFFER_SIZE,
+    DATA_BATCH_SIZE,
+    FOREIGN_KEY_VALUES_LIMIT,
+    INDEX_BUILD_MEMORY,
+    INDEX_BUILD_WORKERS,
+)
+from src.emm.operations.permutations import load_contexts_for_project, load_permutations
 
+log = logging.getLogger(__name__)
 
+
+@contextmanager
+def _loading_table(
+    session: Session,
+    schema_name: str,
+    permutation_id: int,
+    permutation_name: str,
+    unlogged: bool,
+) -> Iterator[None]:
+    """
+    Empty the table before a load, and save the fact that it got populated after it, in the same transaction.
+    With unlogged, the table is switched to UNLOGGED, so that the load writes no WAL, and its indexes are
+    dropped before the load and built once after it, by parallel workers, rather than maintained row by row.
+    Tables tied to others by a foreign key stay LOGGED and keep their constraints: PostgreSQL requires it.
+    """
+    session.execute(text(f"SET LOCAL search_path TO {schema_name}"))
+    # Whatever a previous run left in the table is replaced. A table referenced by a foreign key cannot be
+    # truncated without the tables referencing it: it has been emptied along with them (see _empty_tables)
+    if is_referenced_by_foreign_key(session, schema_name, permutation_name):
+        session.execute(text(f"DELETE FROM {permutation_name}"))
+    else:
+        session.execute(text(f"TRUNCATE {permutation_name}"))
+
+    create_statements: list[str] = []
+    is_logged = None
+    if unlogged:
+        is_switchable = not has_foreign_keys(session, schema_name, permutation_name)
+        if is_switchable:
+            session.execute(text(f"ALTER TABLE {permutation_name} SET UNLOGGED"))
+            is_logged = False
+        else:
+            log.warning(
+                f"Table {permutation_name} is tied to others by a foreign key. It is left LOGGED"
+            )
+        drop_statements, create_statements = load_index_statements(
+            session, schema_name, permutation_name, with_constraints=is_switchable
+        )
+        for statement in drop_statements:
+            session.execute(text(statement))
+
+    yield
+
+    if create_statements:
+        session.execute(
+            text(f"SET LOCAL max_parallel_maintenance_workers = {INDEX_BUILD_WORKERS}")
+        )
+        session.execute(
+            text(f"SET LOCAL maintenance_work_mem = '{INDEX_BUILD_MEMORY}'")
+        )
+        for statement in create_statements:
+            session.execute(text(statement))
+
+    values: dict[str, bool] = {"is_populated": True}
+    if is_logged is not None:
+        values["is_logged"] = is_logged
+    session.execute(
+        update(Permutation).where(Permutation.id == permutation_id).values(**values)
+    )
+
+
+@in_worker_session
 def populate_table_with_data(
-    schema: Schema, permutation: Permutation, insert_data: str
+    schema_name: str,
+    permutation_id: int,
+    permutation_name: str,
+    project_name: str,
+    table_name: str,
+    unlogged: bool = False,
 ):
     """
-    Execute the insert on the table specified in permutation.
-    Replace all instances of `INSERT INTO xxx` into `INSERT INTO schema.permutation.name`.
-    Then execute the sql str.
+    Replay the INSERT statements of the data file for the table into the permutation table.
+    The file is streamed: every statement is pointed to the permutation as it is read, and statements are
+    sent in batches of about DATA_BATCH_SIZE characters, so memory does not grow with the file.
+    All the batches run in the same transaction.
+    It can run in a worker thread, hence it only takes plain values.
     """
-    # Replace the table name
-    insert_data = re.sub(
-        r"INSERT INTO [a-zA-Z0-9_]+", f"INSERT INTO {permutation.name}", insert_data
-    )
+    with context_session() as session, _loading_table(
+        session, schema_name, permutation_id, permutation_name, unlogged
+    ):
+        # The statements are sent as they are, with no bind parameters to interpret
+        cursor = session.connection().connection.cursor()
+
+        batch: list[str] = []
+        batch_size = 0
+        for statement_table_name, statement in iter_data_for_project(project_name):
+            if statement_table_name != table_name.lower():
+                continue
+            batch.append(rewrite_insert_table_name(statement, permutation_name))
+            batch_size += len(statement)
+            if batch_size >= DATA_BATCH_SIZE:
+                cursor.execute("".join(batch))
+                batch, batch_size = [], 0
+        if batch:
+            cursor.execute("".join(batch))
 
-    # Execute the insert
+
+@in_worker_session
+def generate_table_data(
+    schema_name: str,
+    permutation_id: int,
+    permutation_name: str,
+    context: DDLTableContext,
+    settings: DataGenerationSettings,
+    unlogged: bool = False,
+):
+    """
+    Fill the table with synthetic rows, streamed into a COPY as they are generated.
+    Foreign key columns take the values of rows of the referenced tables, which are loaded first:
+    up to FOREIGN_KEY_VALUES_LIMIT of them, or one per generated row when the key has to be unique.
+    It can run in a worker thread, hence it only takes plain values.
+    """
+    column_names = [column.name for column in get_generated_columns(context)]
+    with context_session() as session, _loading_table(
+        session, schema_name, permutation_id, permutation_name, unlogged
+    ):
+        foreign_keys = load_foreign_key_values(
+            session,
+            schema_name,
+            permutation_name,
+            lambda foreign_key: (
+                settings.rows
+                if is_foreign_key_unique(context, foreign_key)
+                else min(settings.rows, FOREIGN_KEY_VALUES_LIMIT)
+            ),
+        )
+        cursor = session.connection().connection.cursor()
+        cursor.copy_expert(
+            f"COPY {permutation_name} ({', '.join(column_names)}) FROM STDIN",
+            CopyDataReader(
+                iter_copy_data(context, settings, foreign_keys=foreign_keys)
+            ),
+            size=COPY_BUFFER_SIZE,
+        )
+
+
+@in_worker_session
+def export_table_data(
+    schema_name: str, table_name: str, column_names: list[str], file_path: str
+) -> None:
+    """
+    Write the rows of the table to the file, as a binary COPY stream of the given columns.
+    It can run in a worker thread, hence it only takes plain values.
+    """
     with context_session() as session:
-        # Set the search path to the new schema
-        session.execute(text(f"SET search_path TO {schema.name}"))
+        session.execute(text(f"SET LOCAL search_path TO {schema_name}"))
+        cursor = session.connection().connection.cursor()
+        with open(file_path, "wb") as file:
+            cursor.copy_expert(
+                f"COPY {table_name} ({', '.join(column_names)}) TO STDOUT WITH (FORMAT binary)",
+                file,
+                size=COPY_BUFFER_SIZE,
+            )
 
-        # Execute the DDL
-        session.execute(text(insert_data))
 
-        session.execute(text("SET search_path TO public"))
+@in_worker_session
+def copy_table_data(
+    schema_name: str,
+    permutation_id: int,
+    permutation_name: str,
+    column_names: list[str],
+    file_path: str,
+    unlogged: bool = False,
+):
+    """
+    Load a binary COPY stream of the given columns into the permutation table. The column list maps
+    the stream onto the columns of the permutation, whatever their order, so the stream is the same for all.
+    It can run in a worker thread, hence it only takes plain values.
+    """
+    with context_session() as session, _loading_table(
+        session, schema_name, permutation_id, permutation_name, unlogged
+    ):
+        cursor = session.connection().connection.cursor()
+        with open(file_path, "rb") as file:
+            cursor.copy_expert(
+                f"COPY {permutation_name} ({', '.join(column_names)}) FROM STDIN WITH (FORMAT binary)",
+                file,
+                size=COPY_BUFFER_SIZE,
+            )
 
-        # Lastly, save the fact that the permutation ot populated.
-        permutation.is_populated = True
-        session.add(permutation)
-        session.commit()
+
+@in_worker_session
+def fan_out_table_data(
+    schema_name: str,
+    permutation_id: int,
+    permutation_name: str,
+    original_table_name: str,
+    column_names: list[str],
+    unlogged: bool = False,
+):
+    """
+    Fill the permutation table with the rows of its original table, on the server side.
+    Identity columns keep the values of the original table, as they do with COPY.
+    It can run in a worker thread, hence it only takes plain values.
+    """
+    columns = ", ".join(column_names)
+    with context_session() as session, _loading_table(
+        session, schema_name, permutation_id, permutation_name, unlogged
+    ):
+        session.execute(
+            text(
+                f"INSERT INTO {permutation_name} ({columns}) OVERRIDING SYSTEM VALUE "
+                f"SELECT {columns} FROM {original_table_name}"
+            )
+        )
+
+
+@in_worker_session
+def set_table_logged(schema_name: str, permutation_id: int, permutation_name: str):
+    """
+    Switch an UNLOGGED table back to LOGGED. The whole table is written to the WAL.
+    It can run in a worker thread, hence it only takes plain values.
+    """
+    with context_session() as session:
+        session.execute(text(f"SET LOCAL search_path TO {schema_name}"))
+        session.execute(text(f"ALTER TABLE {permutation_name} SET LOGGED"))
+        session.execute(
+            update(Permutation)
+            .where(Permutation.id == permutation_id)
+            .values(is_logged=True)
+        )
 
 
 def populate_permutation(permutation_key: str, schema: Schema) -> None:
@@ -97,18 +334,362 @@ def save_permutation(
         )
 
 
-def populate_schema(schema: Schema, only_original: bool) -> None:
+def _run_in_parallel(jobs: int, function: Callable[..., None], calls: list[tuple]):
+    """
+    Run the function once per tuple of arguments, by up to jobs workers, and raise the first error, if any.
+    """
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(function, *arguments) for arguments in calls]
+        for future in as_completed(futures):
+            future.result()
+
+
+def _run_in_dependency_order(
+    schema_name: str,
+    jobs: int,
+    function: Callable[..., None],
+    calls_by_table: dict[str, tuple],
+):
+    """
+    Run the function once per table, by up to jobs workers, the tables referenced by a foreign key
+    before the tables referencing them.
+    """
+    references = load_foreign_key_references(schema_name)
+    for table_names in order_by_dependencies(list(calls_by_table), references):
+        _run_in_parallel(
+            jobs, function, [calls_by_table[table_name] for table_name in table_names]
+        )
+
+
+def _empty_tables(schema_name: str, permutations: list[Permutation]) -> None:
+    """
+    Truncate the tables in a single statement, since a table referenced by a foreign key can only be
+    truncated along with the tables referencing it, and mark them as not populated, in the same transaction:
+    a run dying before they are loaded again resumes with them.
+    """
+    if not permutations:
+        return
+    with context_session() as session:
+        session.execute(text(f"SET LOCAL search_path TO {schema_name}"))
+        session.execute(
+            text(
+                f"TRUNCATE {', '.join(permutation.name for permutation in permutations)}"
+            )
+        )
+        session.execute(
+            update(Permutation)
+            .where(Permutation.id.in_([permutation.id for permutation in permutations]))
+            .values(is_populated=False)
+        )
+
+
+def populate_schema(
+    schema: Schema,
+    only_original: bool,
+    jobs: int = 1,
+    method: PopulationMethod = PopulationMethod.COPY,
+    generation: DataGenerationSettings | None = None,
+    force: bool = False,
+    unlogged: bool = False,
+) -> None:
     """
     Load the sql file with data and import it in the original table.
     If only_original is False, populate the permutations too.
-    The first operation done is t truncate all the table. All the table,
-    according to only_original.
 
-    # FIXME We should parse the insert statements and change the order
-    before executing it.
-    # TODO We should not need a file. We could generate the data on the fly.
+    The data file is streamed, never read into memory as a whole.
+    With the INSERT method, the data file is executed again for every table.
+    With the COPY method, only the original tables are loaded from the data file (unless already populated).
+    Each one is then exported once as a binary COPY stream, which is copied into its permutations.
+    With the FAN_OUT method, the original tables are loaded the same way, then every permutation is filled
+    on the server side from its original table: nothing goes through the client and the data is identical.
+
+    With generation settings, the data file is not used: the original tables are filled with synthetic rows
+    generated from the column types, then copied into the permutations with the COPY or FAN_OUT method.
+    Tables are populated by up to jobs workers in parallel, each with its own connection.
+    Every permutation gets the rows of the table it is a permutation of.
+
+    Population can be resumed: every table is truncated and loaded in a single transaction, which also
+    marks it as populated. A run that dies halfway loses the tables being loaded only, and the next run
+    skips the tables already populated. With force, every table is loaded again: the populated ones are
+    first truncated together, so that tables tied by a foreign key can be emptied.
+    Tables referenced by a foreign key are loaded before the tables referencing them.
+
+    With unlogged, tables are switched to UNLOGGED and loaded without their indexes, which are built after
+    the load (see _loading_table). They can be switched back to LOGGED with set_schema_logged.
     """
-    insert_data: str = read_data_for_project(schema.name)
+    if generation is not None and method == PopulationMethod.INSERT:
+        raise ValueError("Generated data can only be loaded with copy or fanout")
+
     permutations = load_permutations(schema, only_original)
-    for permutation in permutations:
-        populate_table_with_data(schema, permutation, insert_data)
+    schema_name = schema.name
+    contexts_by_table = {
+        context.table_name: context
+        for context in load_contexts_for_project(schema.name)
+    }
+
+    if generation is None:
+        tables_with_data = find_tables_with_data(schema.name)
+        for table_name in {
+            permutation.original_table_name for permutation in permutations
+        }:
+            if table_name.lower() not in tables_with_data:
+                log.warning(
+                    f"No data found for table {table_name}. Skipping its permutations"
+                )
+        permutations = [
+            permutation
+            for permutation in permutations
+            if permutation.original_table_name.lower() in tables_with_data
+        ]
+
+    pending = [
+        permutation
+        for permutation in permutations
+        if force or not permutation.is_populated
+    ]
+    if len(pending) < len(permutations):
+        log.info(
+            f"Skipping {len(permutations) - len(pending)} tables already populated. "
+            "Use force to load them again"
+        )
+
+    _empty_tables(
+        schema_name,
+        [permutation for permutation in pending if permutation.is_populated],
+    )
+
+    if generation is None and (method == PopulationMethod.INSERT or only_original):
+        _run_in_dependency_order(
+            schema_name,
+            jobs,
+            populate_table_with_data,
+            {
+                permutation.name: (
+                    schema_name,
+                    permutation.id,
+                    permutation.name,
+                    schema_name,
+                    permutation.original_table_name,
+                    unlogged,
+                )
+                for permutation in pending
+            },
+        )
+        return
+
+    pending_baselines = [
+        permutation for permutation in pending if not permutation.is_permutation
+    ]
+    if generation is not None:
+        _run_in_dependency_order(
+            schema_name,
+            jobs,
+            generate_table_data,
+            {
+                baseline.name: (
+                    schema_name,
+                    baseline.id,
+                    baseline.name,
+                    contexts_by_table[baseline.original_table_name],
+                    generation,
+                    unlogged,
+                )
+                for baseline in pending_baselines
+            },
+        )
+    else:
+        _run_in_dependency_order(
+            schema_name,
+            jobs,
+            populate_table_with_data,
+            {
+                baseline.name: (
+                    schema_name,
+                    baseline.id,
+                    baseline.name,
+                    schema_name,
+                    baseline.original_table_name,
+                    unlogged,
+                )
+                for baseline in pending_baselines
+            },
+        )
+    if only_original:
+        return
+
+    baselines_by_table = {
+        permutation.original_table_name: permutation
+        for permutation in permutations
+        if not permutation.is_permutation
+    }
+    pending_permutations = [
+        permutation
+        for permutation in pending
+        if permutation.is_permutation
+        and permutation.original_table_name in baselines_by_table
+    ]
+    column_names_by_table = {
+        table_name: [
+            column.name
+            for column in context.columns
+            if not is_computed_by_the_database(column)
+        ]
+        for table_name, context in contexts_by_table.items()
+    }
+
+    if method == PopulationMethod.FAN_OUT:
+        _run_in_parallel(
+            jobs,
+            fan_out_table_data,
+            [
+                (
+                    schema_name,
+                    permutation.id,
+                    permutation.name,
+                    baselines_by_table[permutation.original_table_name].name,
+                    column_names_by_table[permutation.original_table_name],
+                    unlogged,
+                )
+                for permutation in pending_permutations
+            ],
+        )
+        return
+
+    # Only the tables with permutations left to load are exported
+    baselines = [
+        baselines_by_table[table_name]
+        for table_name in {
+            permutation.original_table_name for permutation in pending_permutations
+        }
+    ]
+    with tempfile.TemporaryDirectory(prefix="emm_copy_") as copy_dir:
+        file_paths_by_table = {
+            baseline.original_table_name: os.path.join(copy_dir, f"{baseline.id}.copy")
+            for baseline in baselines
+        }
+        _run_in_parallel(
+            jobs,
+            export_table_data,
+            [
+                (
+                    schema_name,
+                    baseline.name,
+                    column_names_by_table[baseline.original_table_name],
+                    file_paths_by_table[baseline.original_table_name],
+                )
+                for baseline in baselines
+            ],
+        )
+        _run_in_parallel(
+            jobs,
+            copy_table_data,
+            [
+                (
+                    schema_name,
+                    permutation.id,
+                    permutation.name,
+                    column_names_by_table[permutation.original_table_name],
+                    file_paths_by_table[permutation.original_table_name],
+                    unlogged,
+                )
+                for permutation in pending_permutations
+            ],
+        )
+
+
+def set_schema_logged(schema: Schema, jobs: int = 1) -> None:
+    """
+    Switch the UNLOGGED tables of the schema back to LOGGED, by up to jobs workers in parallel.
+    Meant to run before the benchmarks, for results matching a regular setup.
+    """
+    _run_in_parallel(
+        jobs,
+        set_table_logged,
+        [
+            (schema.name, permutation.id, permutation.name)
+            for permutation in load_permutations(schema, False)
+            if not permutation.is_logged
+        ],
+    )
+
+
+def normalize_table(schema_name: str, table_name: str) -> None:
+    """
+    Vacuum, freeze and analyze the table: hint bits get set, the visibility map and the free space map
+    get written, and the statistics get updated, whatever the load order and the autovacuum timing.
+    It can run in a worker thread, hence it only takes plain values.
+    """
+    with autocommit_connection() as connection:
+        connection.execute(text(f"VACUUM (FREEZE, ANALYZE) {schema_name}.{table_name}"))
+
+
+def normalize_schema(schema: Schema, jobs: int = 1) -> None:
+    """
+    Bring every populated table of the schema to the same state before the measurements, by up to
+    jobs workers in parallel, each with its own connection. A checkpoint follows, so that no table
+    starts the benchmarks with dirty pages left to write.
+    """
+    _run_in_parallel(
+        jobs,
+        normalize_table,
+        [
+            (schema.name, permutation.name)
+            for permutation in load_permutations(schema, False)
+            if permutation.is_populated
+        ],
+    )
+
+    with autocommit_connection() as connection:
+        try:
+            connection.execute(text("CHECKPOINT"))
+        except DBAPIError as e:
+            # CHECKPOINT needs a superuser, or the pg_checkpoint role
+            log.warning(f"Could not run a checkpoint: {e}")
+
+
+def load_population_status(schema: Schema) -> list[PopulationStatus]:
+    """
+    How far the population of every table of the schema went, in the order of the tables of the project.
+    """
+    with context_session() as session:
+        counts = (
+            session.query(
+                Permutation.original_table_name,
+                Permutation.is_permutation,
+                Permutation.is_populated,
+                Permutation.is_logged,
+                func.count(),
+            )
+            .filter(Permutation.schema_id == schema.id)
+            .group_by(
+                Permutation.original_table_name,
+                Permutation.is_permutation,
+                Permutation.is_populated,
+                Permutation.is_logged,
+            )
+            .all()
+        )
+
+    statuses_by_table: dict[str, PopulationStatus] = {}
+    for table_name, is_permutation, is_populated, is_logged, count in counts:
+        status = statuses_by_table.setdefault(table_name, PopulationStatus(table_name))
+        if not is_logged:
+            status.unlogged_tables += count
+        if not is_permutation:
+            status.is_baseline_populated = bool(is_populated)
+        elif is_populated:
+            status.populated_permutations += count
+        else:
+            status.pending_permutations += count
+
+    table_names = [
+        context.table_name for context in load_contexts_for_project(schema.name)
+    ]
+    return sorted(
+        statuses_by_table.values(),
+        key=lambda status: (
+            table_names.index(status.table_name)
+            if status.table_name in table_names
+            else len(table_names)
+        ),
+    )
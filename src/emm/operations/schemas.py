@@ -1,11 +1,7 @@
 from sqlalchemy import exists, select, text
 
 from src.emm.engine.data import DDLTableContext
-from src.emm.engine.parser import (
-    extract_create_statement,
-    parse_create_statement,
-    read_ddl_for_project,
-)
+from src.emm.engine.parser import parse_project_ddl, read_ddl_for_project
 from src.emm.models.database_base import context_session
 from src.emm.models.schema import Schema
 from src.emm.operations.constants import PG_STAT_STATEMENTS
@@ -19,16 +15,14 @@ def load_schemas() -> list[Schema]:
 
 def initialize_schema(project_name: str):
     """
-    This is called after validation, no need to double check that the file exists
+    This is called after validation, no need to double check that the file exists.
+    Every table of the DDL is created, the first one is recorded as the project table.
     """
     ddl = read_ddl_for_project(project_name=project_name)
 
-    # Parse the DDL into a statement object
-    create_statement = extract_create_statement(ddl)
-
-    # Get the context, so that we can easily create permutations
-    context: DDLTableContext = parse_create_statement(
-        project_name=project_name, statement=create_statement
+    # Get the contexts, so that we can easily create permutations
+    contexts: list[DDLTableContext] = parse_project_ddl(
+        project_name=project_name, ddl=ddl
     )
 
     with context_session() as session:
@@ -57,7 +51,7 @@ def initialize_schema(project_name: str):
         session.add(
             Schema(
                 name=project_name,
-                original_table_name=context.table_name,
+                original_table_name=contexts[0].table_name,
             )
         )
 
@@ -0,0 +1,267 @@
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from src.emm.engine.codes import (
+    decode_permutation,
+    encode_permutation,
+    make_permutation_table_name,
+)
+from src.emm.engine.data import DDLTableContext
+from src.emm.engine.optimizer import find_optimal_permutations
+from src.emm.engine.parser import find_tables_with_data
+from src.emm.engine.search import breed_generation, random_generation
+from src.emm.models.database_base import context_session
+from src.emm.models.schema import Permutation, Schema
+from src.emm.operations.constants import PERMUTATIONS_CHUNK_SIZE
+from src.emm.operations.perfomances import check_permutations_sizes, fetch_table_sizes
+from src.emm.operations.permutations import (
+    chunked,
+    find_existing_permutation_codes,
+    has_baseline_permutation,
+    load_contexts_for_project,
+    make_permutation_ddl,
+    save_baseline_permutation,
+    save_permutations,
+)
+from src.emm.operations.population import (
+    fan_out_table_data,
+    normalize_schema,
+    populate_table_with_data,
+)
+from src.emm.operations.schemas import find_schema_by_name
+
+log = logging.getLogger(__name__)
+
+# The metric to minimize
+FITNESS_METRIC = "table_bytes"
+
+
+def _seed_generation(
+    context: DDLTableContext, generation_size: int, rng: random.Random
+) -> list[list[int]]:
+    """
+    The first generation: the layouts with the least padding, completed with random ones.
+    """
+    original_indices = {column: index for index, column in enumerate(context.columns)}
+    generation = [
+        [original_indices[column] for column in permutation]
+        for permutation in find_optimal_permutations(
+            context.columns, candidates=max(1, generation_size // 2)
+        )
+    ]
+    excluded = {tuple(indices) for indices in generation}
+    excluded.add(tuple(range(len(context.columns))))
+
+    return generation + random_generation(
+        len(context.columns), generation_size - len(generation), rng, excluded
+    )
+
+
+def _load_unpopulated_permutations(
+    schema: Schema, table_name: str, permutation_codes: list[str] | None
+) -> list[tuple[int, str]]:
+    """
+    (id, name) of the permutations of the table not populated yet, among the given codes.
+    With no codes, only the baseline is considered.
+    """
+    with context_session() as session:
+        query = session.query(Permutation.id, Permutation.name).filter(
+            Permutation.schema_id == schema.id,
+            Permutation.original_table_name == table_name,
+            Permutation.is_populated.is_not(True),
+        )
+        if permutation_codes is None:
+            query = query.filter(Permutation.is_permutation.is_(False))
+        else:
+            query = query.filter(Permutation.permutation_code.in_(permutation_codes))
+        return [(permutation_id, name) for permutation_id, name in query]
+
+
+def _create_and_populate(
+    schema: Schema,
+    context: DDLTableContext,
+    permutation_codes: list[str] | None,
+    jobs: int,
+) -> None:
+    """
+    Create the tables of the permutations, then populate them from the baseline.
+    With no codes, the baseline itself is populated from the data file, if needed.
+    """
+    schema_id, schema_name = schema.id, schema.name
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        if permutation_codes:
+            chunks = [
+                [
+                    (
+                        code,
+                        make_permutation_ddl(
+                            code,
+                            context,
+                            [
+                                context.columns[index]
+                                for index in decode_permutation(
+                                    code, len(context.columns)
+                                )
+                            ],
+                        ),
+                    )
+                    for code in chunk
+                ]
+                for chunk in chunked(permutation_codes, PERMUTATIONS_CHUNK_SIZE)
+            ]
+            for future in [
+                executor.submit(
+                    save_permutations,
+                    schema_id,
+                    schema_name,
+                    context.table_name,
+                    chunk,
+                )
+                for chunk in chunks
+            ]:
+                future.result()
+
+        unpopulated_permutations = _load_unpopulated_permutations(
+            schema, context.table_name, permutation_codes
+        )
+        if permutation_codes is None:
+            futures = [
+                executor.submit(
+                    populate_table_with_data,
+                    schema_name,
+                    permutation_id,
+                    permutation_name,
+                    schema_name,
+                    context.table_name,
+                )
+                for permutation_id, permutation_name in unpopulated_permutations
+            ]
+        else:
+            # Permutations are filled from the baseline on the server, with the very same rows
+            futures = [
+                executor.submit(
+                    fan_out_table_data,
+                    schema_name,
+                    permutation_id,
+                    permutation_name,
+                    context.table_name,
+                    [column.name for column in context.columns],
+                )
+                for permutation_id, permutation_name in unpopulated_permutations
+            ]
+        for future in futures:
+            future.result()
+
+
+def _search_permutations_for_table(
+    schema: Schema,
+    context: DDLTableContext,
+    generation_size: int,
+    max_tables: int,
+    max_seconds: float,
+    rng: random.Random,
+    jobs: int,
+    progress: Callable[[int, float], None] | None,
+) -> None:
+    """
+    Genetic search of the best column order of one table of the project.
+    """
+    started = time.monotonic()
+    table_name = context.table_name
+
+    if not has_baseline_permutation(schema, table_name):
+        save_baseline_permutation(schema=schema, table_name=table_name)
+    # The baseline is needed for the final analysis
+    _create_and_populate(schema, context, None, jobs)
+
+    fitness_by_code: dict[str, float] = {}
+    excluded: set[tuple[int, ...]] = {tuple(range(len(context.columns)))}
+    generation = _seed_generation(context, generation_size, rng)
+    created_tables = 0
+
+    while generation and created_tables < max_tables:
+        if time.monotonic() - started > max_seconds:
+            log.info(f"Time budget of {max_seconds} seconds exhausted for {table_name}")
+            break
+
+        excluded.update(tuple(indices) for indices in generation)
+        codes = [encode_permutation(indices) for indices in generation]
+        # Permutations left over by other runs have not been measured by this search
+        existing_codes = find_existing_permutation_codes(schema.id, table_name, codes)
+        codes = [code for code in codes if code not in existing_codes]
+        codes = codes[: max_tables - created_tables]
+
+        _create_and_populate(schema, context, codes, jobs)
+        created_tables += len(codes)
+
+        table_sizes = fetch_table_sizes(schema)
+        for code in codes:
+            permutation_table_name = make_permutation_table_name(table_name, code)
+            fitness_by_code[code] = table_sizes[permutation_table_name][FITNESS_METRIC]
+
+        ranked_codes = sorted(fitness_by_code, key=lambda code: fitness_by_code[code])
+        if ranked_codes:
+            best_fitness = fitness_by_code[ranked_codes[0]]
+            log.info(
+                f"{created_tables} tables created for {table_name}, best {FITNESS_METRIC} so far "
+                f"{best_fitness} with permutation {ranked_codes[0]}"
+            )
+            if progress is not None:
+                progress(created_tables, best_fitness)
+
+        generation = breed_generation(
+            [decode_permutation(code, len(context.columns)) for code in ranked_codes],
+            generation_size,
+            rng,
+            excluded,
+        )
+
+
+def search_permutations_for_project(
+    project_name: str,
+    generation_size: int = 10,
+    max_tables: int = 100,
+    max_seconds: float = 3600,
+    seed: int | None = None,
+    jobs: int = 1,
+    progress: Callable[[int, float], None] | None = None,
+) -> None:
+    """
+    Feedback-driven search of the best column order, for tables too wide to enumerate the permutations.
+    Every generation of layouts is created, populated and measured, then the next generation is bred
+    from the smallest tables found so far (order crossover and swap mutation).
+    The tables of the project are searched one after the other, since every generation is measured
+    against the whole schema. For each table, the search stops once max_tables permutations have been
+    created or max_seconds have elapsed, whichever comes first.
+    The size analysis is stored at the end, as for the size benchmark, once the tables are normalized.
+    Progress, if given, is called with the number of tables created and the best size so far.
+    """
+    schema = find_schema_by_name(project_name)
+    if schema is None:
+        raise ValueError(f"Schema {project_name} not found")
+
+    rng = random.Random(seed)
+    tables_with_data = find_tables_with_data(project_name)
+
+    for context in load_contexts_for_project(project_name):
+        if context.table_name.lower() not in tables_with_data:
+            log.warning(f"No data found for table {context.table_name}. Skipping it")
+            continue
+
+        _search_permutations_for_table(
+            schema,
+            context,
+            generation_size,
+            max_tables,
+            max_seconds,
+            rng,
+            jobs,
+            progress,
+        )
+
+    normalize_schema(schema, jobs)
+    check_permutations_sizes(schema)